@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Startup time benchmark for the rollama CLI
+
+Runs CLI commands in fresh interpreters against a throwaway home directory
+and reports the best and median wall time of each, next to a bare
+`python -c pass` for reference. Fails when the best `rollama --help` run is
+slower than the target, so it can guard against imports creeping back into
+startup. The best run is used because it is the least affected by noise.
+
+Usage: python benchmarks/startup_bench.py [--runs N] [--target-ms MS]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+COMMANDS = [
+    ["--help"],
+    ["remote", "list"],
+    ["run", "--help"],
+]
+
+# Runs the CLI, then reports whether the HTTP stack was imported
+CLI = (
+    "import sys\n"
+    "from rollama.cli import main\n"
+    "sys.argv = ['rollama'] + sys.argv[1:]\n"
+    "try:\n"
+    "    main()\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    "sys.stderr.write('requests imported\\n' if 'requests' in sys.modules else '')\n"
+)
+
+
+def time_command(argv, runs, env):
+    timings = []
+    imported_requests = False
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(argv, env=env, cwd=ROOT, capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        imported_requests = imported_requests or "requests imported" in result.stderr
+    return min(timings), statistics.median(timings), imported_requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rollama CLI startup time")
+    parser.add_argument("--runs", type=int, default=20, help="Runs per command")
+    parser.add_argument("--target-ms", type=float, default=80.0, help="Best time allowed for --help")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, PYTHONPATH=ROOT)
+
+        best, median, _ = time_command([sys.executable, "-c", "pass"], args.runs, env)
+        print(f"{'python -c pass':<22} best {best * 1000:6.1f} ms  median {median * 1000:6.1f} ms")
+
+        help_best = None
+        for command in COMMANDS:
+            best, median, imported_requests = time_command(
+                [sys.executable, "-c", CLI] + command, args.runs, env
+            )
+            note = "  (imports requests)" if imported_requests else ""
+            print(f"{'rollama ' + ' '.join(command):<22} best {best * 1000:6.1f} ms  "
+                  f"median {median * 1000:6.1f} ms{note}")
+            if command == ["--help"]:
+                help_best = best
+
+    if help_best * 1000 > args.target_ms:
+        print(f"FAIL: --help took {help_best * 1000:.1f} ms, target is {args.target_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
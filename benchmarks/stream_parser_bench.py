@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for rollama.stream_parser
+
+Builds synthetic SSE and NDJSON bodies, feeds them to the parsers in
+network-sized reads and reports tokens per second. The line-at-a-time
+decode/strip/json.loads loop the API client used before is measured
+alongside for comparison.
+
+Usage: python benchmarks/stream_parser_bench.py [--tokens N] [--read-size BYTES]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rollama.stream_parser import iter_sse_chunks, iter_ndjson_chunks
+
+
+def build_sse_body(tokens):
+    events = []
+    for i in range(tokens):
+        data = {
+            "id": "chatcmpl-1", "object": "chat.completion.chunk", "model": "llama2",
+            "choices": [{"index": 0, "delta": {"content": f" tok{i}"}, "finish_reason": None}],
+        }
+        events.append(b"data: " + json.dumps(data).encode() + b"\n\n")
+    events.append(b"data: [DONE]\n\n")
+    return b"".join(events)
+
+
+def build_ndjson_body(tokens):
+    records = []
+    for i in range(tokens):
+        data = {"model": "llama2", "message": {"role": "assistant", "content": f" tok{i}"}, "done": False}
+        records.append(json.dumps(data).encode() + b"\n")
+    records.append(json.dumps({"model": "llama2", "done": True, "eval_count": tokens}).encode() + b"\n")
+    return b"".join(records)
+
+
+def split_reads(body, read_size):
+    return [body[i:i + read_size] for i in range(0, len(body), read_size)]
+
+
+def legacy_sse(reads):
+    """The per-line parsing loop previously inlined in ApiClient._run_remote_stream"""
+    buffer = b"".join(reads)
+    for line in buffer.split(b"\n"):
+        if not line:
+            continue
+        line = line.decode("utf-8")
+        if line.startswith("data:"):
+            line = line[5:].strip()
+        if line == "[DONE]":
+            continue
+        try:
+            data = json.loads(line)
+            content = data["choices"][0]["delta"].get("content", "")
+            if content:
+                yield {"response": content}
+        except Exception:
+            if line.strip():
+                yield {"response": line.strip()}
+
+
+def measure(name, func, reads, tokens, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in func(reads))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<22} {count:>8} chunks  {best * 1000:8.1f} ms  {tokens / best:12,.0f} tokens/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming response parsers")
+    parser.add_argument("--tokens", type=int, default=100000, help="Tokens per synthetic stream")
+    parser.add_argument("--read-size", type=int, default=1024, help="Bytes per simulated socket read")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per parser (best is reported)")
+    args = parser.parse_args()
+
+    sse_reads = split_reads(build_sse_body(args.tokens), args.read_size)
+    ndjson_reads = split_reads(build_ndjson_body(args.tokens), args.read_size)
+
+    print(f"{args.tokens} tokens, {args.read_size}-byte reads")
+    measure("legacy line loop", legacy_sse, sse_reads, args.tokens, args.repeat)
+    measure("SSE parser", iter_sse_chunks, sse_reads, args.tokens, args.repeat)
+    measure("NDJSON parser", iter_ndjson_chunks, ndjson_reads, args.tokens, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
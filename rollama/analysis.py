@@ -0,0 +1,292 @@
+"""Map-reduce analysis of a whole workspace.
+
+A prompt holding every file of a large workspace does not fit in a context
+window, and a single generation runs on a single server however many are
+configured. Instead the files are packed into chunks that each fit a prompt,
+the chunks are reviewed concurrently across the configured remotes (map),
+and the partial findings are merged in a final pass (reduce). Findings too
+long for one merge prompt are merged in rounds, several merges at a time.
+
+Wall time then grows with the number of chunks divided by the number of
+servers rather than with the size of the workspace, and chunks whose files
+have not changed are answered from the response cache.
+"""
+import asyncio
+
+from .batch import BatchRunner
+from .errors import RollamaError
+from .tokens import trim_text
+
+# Requests in flight per server; a second one keeps the server busy while
+# the first one's reply is on its way back
+REQUESTS_PER_SERVER = 2
+
+# Files larger than this are left out; they are more often generated code or data than source
+MAX_ANALYZE_BYTES = 1024 * 1024
+
+# Reviews should not vary from run to run; this also lets the replies of
+# parts whose files have not changed come from the response cache
+ANALYSIS_OPTIONS = {"temperature": 0}
+
+MAP_PROMPT = """You are reviewing {scope}
+
+{files}
+List the bugs, risks and possible improvements you find in these files, most important first.
+Name the file (and the function or line) each one concerns and keep each to a sentence or two.
+If nothing needs changing, say so in one line.
+"""
+
+REDUCE_PROMPT = """These are findings from separate reviews of parts of the code in workspace {workspace}:
+
+{findings}
+Merge them into one list: combine duplicates, keep the file names, and order them by importance.
+{closing}
+"""
+
+MERGE_CLOSING = "Reply with the merged list only."
+
+FINAL_CLOSING = "Then suggest the few changes that would help most, in the order you would make them."
+
+
+def _sections(path, text, max_tokens, counter):
+    """A file as one section, or as consecutive line ranges that each fit max_tokens; (section, cost) pairs"""
+    section = f"=== {path} ===\n{text.rstrip()}\n"
+    cost = counter.count(section)
+    if cost <= max_tokens:
+        return [(section, cost)]
+
+    lines = text.rstrip().split("\n")
+    total = len(lines)
+    room = max_tokens - counter.count(f"=== {path} (lines {total}-{total} of {total}) ===\n") - 1
+    sections = []
+    start = 0
+    while start < total:
+        end, used = start, 0
+        while end < total:
+            line_cost = counter.count(lines[end]) + 1
+            if end > start and used + line_cost > room:
+                break
+            used += line_cost
+            end += 1
+        body = "\n".join(lines[start:end])
+        if used > room:
+            # A single line longer than a chunk
+            body = trim_text(body, room, counter).rstrip() if room > 0 else ""
+        section = f"=== {path} (lines {start + 1}-{end} of {total}) ===\n{body}\n"
+        sections.append((section, counter.count(section)))
+        start = end
+    return sections
+
+
+def chunk_files(files, max_tokens, counter):
+    """
+    Pack files into chunks of at most max_tokens each
+
+    Files keep their order, so files from the same directory tend to share
+    a chunk. A file too large for a chunk of its own is split into line
+    ranges.
+
+    Args:
+        files (list): (path, text) pairs
+        max_tokens (int): Token budget of one chunk
+        counter: Token counter (see tokens.get_counter)
+
+    Returns:
+        list: Chunks, dicts with 'paths' (the files in the chunk, in order) and 'text'
+    """
+    chunks = []
+    sections, paths, used = [], [], 0
+    for path, text in files:
+        for section, cost in _sections(path, text, max_tokens, counter):
+            if sections and used + cost + 1 > max_tokens:
+                chunks.append({"paths": paths, "text": "\n".join(sections)})
+                sections, paths, used = [], [], 0
+            sections.append(section)
+            if path not in paths:
+                paths.append(path)
+            used += cost + 1
+    if sections:
+        chunks.append({"paths": paths, "text": "\n".join(sections)})
+    return chunks
+
+
+def _label(paths):
+    """Short description of a chunk's files for progress messages"""
+    if len(paths) <= 2:
+        return ", ".join(paths)
+    return f"{paths[0]} and {len(paths) - 1} more files"
+
+
+class WorkspaceAnalyzer:
+    """Reviews a workspace's files in concurrent chunks and merges the findings"""
+
+    def __init__(self, model_manager, index, model=None, remotes=None, concurrency=None, use_cache=None):
+        """
+        Initialize the analyzer
+
+        Args:
+            model_manager (ModelManager): Source of clients, token counts and the response cache
+            index (WorkspaceIndex): Index of the workspace to analyze
+            model (str, optional): Model to use, the default model by default
+            remotes (list, optional): Remote or group names the chunks are
+                spread across round-robin; the default remote by default
+            concurrency (int, optional): Most requests in flight; by default
+                REQUESTS_PER_SERVER for each server the remotes stand for
+            use_cache (bool, optional): Look up and store responses in the response
+                cache; None (the default) leaves it to the sampling settings,
+                which are deterministic
+        """
+        self.model_manager = model_manager
+        self.index = index
+        self.model = model or model_manager.config.get_default_model()
+        self.remotes = list(remotes) if remotes else [None]
+        self.concurrency = max(1, concurrency or REQUESTS_PER_SERVER * self.server_count())
+        self.use_cache = use_cache
+        self.counter = model_manager.get_token_counter(self.model)
+
+    def server_count(self):
+        """Servers the remotes stand for, counting each member of a remote group"""
+        count = 0
+        for remote in self.remotes:
+            group = self.model_manager.config.get_remote_group(remote)
+            count += len(group.get("members", [])) if group else 1
+        return max(count, 1)
+
+    def _read_files(self, path):
+        files = []
+        for file_path in self.index.paths(path, text_only=True):
+            entry = self.index.get(file_path)
+            if not entry or entry["size"] > MAX_ANALYZE_BYTES:
+                continue
+            try:
+                with open(self.index.root / file_path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            if text.strip():
+                files.append((file_path, text))
+        return files
+
+    def _room(self, prompt):
+        """Tokens left in the prompt budget after the rest of a prompt"""
+        return self.model_manager.prompt_budget() - self.counter.count(prompt)
+
+    def _map_prompt(self, chunk, number, total):
+        workspace = self.index.root.name
+        if total == 1:
+            scope = f"the code in workspace {workspace}."
+        else:
+            scope = (f"part {number} of {total} of the code in workspace {workspace}. "
+                     f"The other parts are reviewed separately and the findings merged afterwards.")
+        return MAP_PROMPT.format(scope=scope, files=chunk["text"])
+
+    def _reduce_prompt(self, findings, closing):
+        text = "".join(f"--- {label} ---\n{finding}\n\n" for label, finding in findings)
+        return REDUCE_PROMPT.format(workspace=self.index.root.name, findings=text, closing=closing)
+
+    def _group(self, findings):
+        """Pack findings into groups that each fit one merge prompt"""
+        room = self._room(self._reduce_prompt([], FINAL_CLOSING))
+        # Any two findings fit together, so every round at least halves their number
+        limit = max(room // 2, 1)
+        groups, group, used = [], [], 0
+        for label, finding in findings:
+            finding = trim_text(finding, limit - self.counter.count(label) - 2, self.counter).rstrip()
+            cost = self.counter.count(f"--- {label} ---\n{finding}\n\n")
+            if group and used + cost > room:
+                groups.append(group)
+                group, used = [], 0
+            group.append((label, finding))
+            used += cost
+        if group:
+            groups.append(group)
+        return groups
+
+    async def _run(self, runner, prompts, labels, progress):
+        """Run prompts concurrently, reporting each as it completes; returns the (label, reply) pairs"""
+        done = [0]
+
+        def report(result):
+            done[0] += 1
+            label = labels[result["index"]]
+            if "error" in result:
+                progress(f"[{done[0]}/{len(prompts)}] {label}: failed: {result['error']}")
+                return
+            if result.get("cached"):
+                how = "cached"
+            else:
+                how = f"{result['elapsed']:.1f}s" + (f" on {result['remote']}" if result.get("remote") else "")
+            progress(f"[{done[0]}/{len(prompts)}] {label} ({how})")
+
+        results = await runner.map_async(prompts, report)
+        replies = [(labels[result["index"]], result["response"].strip()) for result in results
+                   if "error" not in result and result.get("response", "").strip()]
+        if not replies:
+            errors = [result["error"] for result in results if "error" in result]
+            raise RollamaError(f"Analysis failed: {errors[0] if errors else 'the model returned nothing'}")
+        return replies
+
+    async def _map_reduce(self, chunks, progress):
+        """Review the chunks, then merge their findings until one prompt holds them all"""
+        runner = BatchRunner(self.model_manager, self.model, self.remotes, self.concurrency,
+                             options=ANALYSIS_OPTIONS, use_cache=self.use_cache)
+        try:
+            prompts = [self._map_prompt(chunk, number, len(chunks)) for number, chunk in enumerate(chunks, 1)]
+            labels = [f"part {number}: {_label(chunk['paths'])}" for number, chunk in enumerate(chunks, 1)]
+            # The parts each set of findings covers, for naming merges
+            spans = {label: (number, number) for number, label in enumerate(labels, 1)}
+            findings = await self._run(runner, prompts, labels, progress)
+            if len(findings) < len(chunks):
+                progress(f"Leaving out {len(chunks) - len(findings)} of {len(chunks)} parts that failed")
+
+            groups = self._group(findings)
+            while len(groups) > 1:
+                progress(f"Merging {len(findings)} sets of findings in {len(groups)} requests")
+                prompts = [self._reduce_prompt(group, MERGE_CLOSING) for group in groups]
+                labels = []
+                for group in groups:
+                    first, last = spans[group[0][0]][0], spans[group[-1][0]][1]
+                    label = f"parts {first}-{last}" if first != last else group[0][0]
+                    spans[label] = (first, last)
+                    labels.append(label)
+                findings = await self._run(runner, prompts, labels, progress)
+                groups = self._group(findings)
+            return groups[0]
+        finally:
+            from .async_client import close_pools
+            await close_pools()
+
+    def run(self, path=".", progress=None, out=None):
+        """
+        Analyze the files under a directory and suggest improvements
+
+        Args:
+            path (str, optional): Workspace-relative directory, the root by default
+            progress (callable, optional): Called with a message as each part is reviewed
+            out (file, optional): Where the final report is streamed, stdout by default
+
+        Returns:
+            str: The final report
+
+        Raises:
+            ValueError: If there are no files to analyze
+            RollamaError: If every part failed, or the final request did
+        """
+        progress = progress or (lambda message: None)
+        files = self._read_files(path)
+        if not files:
+            raise ValueError("No files found to analyze")
+
+        # Part numbers take a token or two; leave room for the longest
+        room = self._room(self._map_prompt({"text": ""}, 99999, 99999))
+        chunks = chunk_files(files, max(room, 1), self.counter)
+        if len(chunks) == 1:
+            progress(f"Analyzing {len(files)} files in one request")
+            prompt = self._map_prompt(chunks[0], 1, 1)
+        else:
+            progress(f"Analyzing {len(files)} files in {len(chunks)} parts, {self.concurrency} at a time")
+            findings = asyncio.run(self._map_reduce(chunks, progress))
+            progress("Writing the report")
+            prompt = self._reduce_prompt(findings, FINAL_CLOSING)
+        return self.model_manager.run_model(self.model, prompt, remote=self.remotes[0], options=ANALYSIS_OPTIONS,
+                                            use_cache=self.use_cache, out=out)
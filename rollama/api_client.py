@@ -4,30 +4,210 @@ import subprocess
 import re
 import time
 import shlex
+import os
+from contextlib import nullcontext
+from . import http_pool
+from .compression import compress_threshold, encode_json
+from .errors import (
+    Cancelled, ConnectError, HTTPStatusError, RemoteError, RequestTimeout, RollamaError, StreamError, error_chunk
+)
+from .rate_limit import get_limiter, count_tokens
+from .retry import RetryPolicy, call_with_retry, get_breaker
+from .stream_parser import iter_ndjson_chunks, iter_sse_chunks
+
+DEFAULT_LOCAL_URL = "http://localhost:11434"
+
+# Connecting to the local daemon either works immediately or not at all, so
+# keep this short to fall back to the ollama CLI quickly
+LOCAL_CONNECT_TIMEOUT = 3
+
+# Remote timeouts. The read timeout is the longest silence tolerated between
+# bytes of a stream, so it bounds a hung server without cutting off long
+# generations. A non-streaming reply arrives only once it is complete, so
+# waiting for it is bounded by the much longer generation timeout instead.
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 300
+DEFAULT_GENERATION_TIMEOUT = 12000
+
+def default_local_url():
+    """Local Ollama daemon URL, honouring OLLAMA_HOST like the ollama CLI does"""
+    host = os.environ.get("OLLAMA_HOST")
+    if not host:
+        return DEFAULT_LOCAL_URL
+    if "://" not in host:
+        host = f"http://{host}"
+    return host.rstrip("/")
+
+
+def as_messages(prompt):
+    """Chat messages for a prompt that is either a string or already a messages list"""
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return list(prompt)
+
+
+def flatten_messages(prompt):
+    """
+    Render a prompt as plain text, for backends that only take a single string
+    
+    Args:
+        prompt (str or list): Prompt, or chat messages ({'role', 'content'} dicts)
+        
+    Returns:
+        str: The prompt itself, or the conversation as a role-tagged transcript
+    """
+    if isinstance(prompt, str):
+        return prompt
+    if len(prompt) == 1 and prompt[0]["role"] == "user":
+        return prompt[0]["content"]
+    lines = [f"[{message['role'].upper()}]: {message['content']}" for message in prompt]
+    lines.append("[ASSISTANT]: ")
+    return "\n".join(lines)
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header, or None if absent or an HTTP date"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
 
 class ApiClient:
-    def __init__(self, remote=None):
+    def __init__(self, remote=None, local_url=None, keep_alive=None):
         """
         Initialize the API client
         
         Args:
-            remote (dict): Remote server details (url, api_key)
+            remote (dict): Remote server details (url, api_key, pool_size and
+                optional max_concurrency, requests_per_second, tokens_per_second)
+            local_url (str, optional): URL of the local Ollama daemon
+            keep_alive (str or int, optional): How long Ollama keeps a model
+                loaded after a request ("30m", seconds, or -1 for indefinitely)
         """
         self.remote = remote
+        self.local_url = (local_url or default_local_url()).rstrip("/")
+        self.keep_alive = keep_alive
+        self.limiter = get_limiter(remote)
+        self.cancelled = False
+        self._in_flight = http_pool.InFlight()
+        self._response = None
+    
+    def _limit(self):
+        """Wait for the remote's concurrency and rate limits, if any"""
+        return self.limiter.slot() if self.limiter else nullcontext()
+
+    def cancel(self):
+        """
+        Abort the request or stream in progress from another thread
+        
+        A request still waiting for its response headers has its socket shut
+        down, as does an open response, so a thread blocked on either returns
+        immediately; the request is not retried and the generator stops at
+        its next step.
+        """
+        self.cancelled = True
+        self._in_flight.abort()
+        response = self._response
+        if response is not None:
+            shutdown = getattr(response.raw, "shutdown", None)
+            try:
+                if shutdown:
+                    shutdown()
+                response.close()
+            except Exception:
+                pass
+
+    @property
+    def server_id(self):
+        """Identifier of the server this client talks to"""
+        return self.remote["url"] if self.remote else f"local:{self.local_url}"
+
+    @property
+    def local_session(self):
+        """Keep-alive session for the local Ollama daemon"""
+        return http_pool.get_session(self.local_url)
+
+    @property
+    def session(self):
+        """Keep-alive session shared by all clients for this remote"""
+        return http_pool.get_session(self.remote["url"], self.remote.get("pool_size"))
+
+    def preconnect(self, background=True):
+        """
+        Warm up a pooled connection to the remote server
+        
+        Args:
+            background (bool): Connect on a background thread
+        """
+        if not self.remote:
+            return None
+        headers = {}
+        if self.remote.get("api_key"):
+            headers["Authorization"] = f"Bearer {self.remote['api_key']}"
+        return http_pool.preconnect(
+            self.remote["url"],
+            pool_size=self.remote.get("pool_size"),
+            headers=headers,
+            background=background
+        )
 
-    def run_local_model(self, model, prompt):
+    def run_local_model(self, model, prompt, options=None):
         """
         Run a query against a local Ollama model
         
+        Uses the Ollama daemon's HTTP API, falling back to the ollama CLI
+        when the daemon is not reachable.
+        
         Args:
             model (str): Model name
-            prompt (str): Prompt to send to the model
+            prompt (str or list): Prompt, or chat messages ({'role', 'content'} dicts)
+            options (dict, optional): Sampling parameters (temperature, top_p, seed, ...)
             
         Returns:
             str: Model response
+            
+        Raises:
+            RollamaError: If the model could not be run or its reply was not JSON
         """
+        chat = not isinstance(prompt, str)
+        payload = {"model": model, "stream": False}
+        if chat:
+            payload["messages"] = as_messages(prompt)
+        else:
+            payload["prompt"] = prompt
+        if options:
+            payload["options"] = options
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        
+        try:
+            response = self.local_session.post(
+                f"{self.local_url}/api/chat" if chat else f"{self.local_url}/api/generate",
+                json=payload,
+                timeout=(LOCAL_CONNECT_TIMEOUT, 12000)
+            )
+        except requests.exceptions.ConnectionError:
+            return self._run_local_subprocess(model, flatten_messages(prompt))
+        except requests.exceptions.Timeout as e:
+            raise RequestTimeout(f"Local Ollama timed out: {e}", self.local_url) from e
+        except requests.exceptions.RequestException as e:
+            raise RemoteError(f"Request to local Ollama failed: {e}", self.local_url) from e
+        
+        if response.status_code != 200:
+            raise HTTPStatusError(response.status_code, response.text[:500], remote=self.local_url)
+        try:
+            result = response.json()
+        except ValueError as e:
+            # Something other than Ollama answering on the port, or a truncated body
+            raise StreamError(f"Invalid reply from local Ollama: {e}", self.local_url) from e
+        if chat:
+            return (result.get("message") or {}).get("content", "")
+        return result.get("response", "")
+
+    def _run_local_subprocess(self, model, prompt):
+        """Run a local model through the ollama CLI"""
         try:
-            # Use subprocess to call local Ollama
             result = subprocess.run(
                 ["ollama", "run", model, prompt],
                 capture_output=True,
@@ -36,75 +216,249 @@ class ApiClient:
             )
             return result.stdout
         except subprocess.CalledProcessError as e:
-            return f"Error running local model: {e.stderr}"
-        except FileNotFoundError:
-            return "Error: Ollama not found. Make sure it's installed and in your PATH."
+            raise RollamaError(f"Local model failed: {e.stderr}") from e
+        except FileNotFoundError as e:
+            raise RollamaError("Ollama not found. Make sure it's installed and in your PATH.") from e
 
-    def run_remote_model(self, model, prompt):
+    def _remote_headers(self, stream=False):
+        headers = {}
+        if stream:
+            headers["Accept"] = "application/json, text/event-stream"
+            # A compressing proxy would buffer the stream; ask for it raw
+            headers["Accept-Encoding"] = "identity"
+        else:
+            headers["Accept-Encoding"] = "gzip, deflate"
+        if self.remote.get("api_key"):
+            headers["Authorization"] = f"Bearer {self.remote['api_key']}"
+        return headers
+
+    def _remote_timeout(self, stream=False):
+        """
+        (connect, read) timeouts for a remote request
+        
+        Streams are read with the read timeout, which bounds the gap between
+        chunks. Otherwise the whole reply is generated before its first byte
+        is sent, so the generation timeout applies.
+        """
+        if stream:
+            read = self.remote.get("read_timeout", DEFAULT_READ_TIMEOUT)
+        else:
+            read = self.remote.get("generation_timeout", DEFAULT_GENERATION_TIMEOUT)
+        return (self.remote.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT), read)
+
+    def _post_remote(self, path, payload, stream=False):
+        """
+        POST to the remote, retrying connection failures and 429/5xx responses
+        
+        Args:
+            path (str): Endpoint path, e.g. /v1/chat/completions
+            payload (dict): JSON body
+            stream (bool): Leave the body unread for streaming
+            
+        Returns:
+            requests.Response: A 200 response
+            
+        Raises:
+            RemoteError: If the request failed after any retries, or the
+                remote's circuit breaker is open
+        """
+        url = self.remote["url"]
+        headers = self._remote_headers(stream)
+        # Encode once up front; retries resend the same bytes
+        body, body_headers = encode_json(payload, compress_threshold(self.remote))
+        headers.update(body_headers)
+
+        def send():
+            if self.cancelled:
+                raise Cancelled("Request cancelled")
+            try:
+                with self._in_flight:
+                    response = self.session.post(
+                        f"{url}{path}",
+                        headers=headers,
+                        data=body,
+                        stream=stream,
+                        timeout=self._remote_timeout(stream)
+                    )
+            except requests.exceptions.RequestException as e:
+                if self.cancelled:
+                    # cancel() shut the socket down; not the server's fault, and not worth a retry
+                    raise Cancelled("Request cancelled") from e
+                if isinstance(e, requests.exceptions.ConnectionError):
+                    # Includes connect timeouts: nothing reached the server
+                    raise ConnectError(f"Could not connect to remote server: {e}", url) from e
+                if isinstance(e, requests.exceptions.Timeout):
+                    raise RequestTimeout(f"Remote server timed out: {e}", url) from e
+                raise RemoteError(f"Request to remote server failed: {e}", url) from e
+            
+            if response.status_code != 200:
+                with response:
+                    raise HTTPStatusError(
+                        response.status_code,
+                        response.text[:500],
+                        remote=url,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                    )
+            return response
+
+        return call_with_retry(send, RetryPolicy.from_remote(self.remote), get_breaker(self.remote))
+
+    def run_remote_model(self, model, prompt, options=None):
         """
         Run a query against a remote Ollama server
         
         Args:
             model (str): Model name
-            prompt (str): Prompt to send to the model
+            prompt (str or list): Prompt, or chat messages ({'role', 'content'} dicts)
+            options (dict, optional): Sampling parameters (temperature, top_p, seed, ...)
             
         Returns:
             str: Model response
+            
+        Raises:
+            RemoteError: If the request failed
         """
         if not self.remote:
-            return "Error: No remote server configured"
-            
+            raise RemoteError("No remote server configured")
+        
+        # Using OpenAI API compatible format
+        payload = {
+            "model": model,
+            "messages": as_messages(prompt),
+            "stream": False
+        }
+        if options:
+            payload.update(options)
+        
+        with self._limit():
+            response = self._post_remote("/v1/chat/completions", payload)
+        
         try:
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            if self.remote.get("api_key"):
-                headers["Authorization"] = f"Bearer {self.remote['api_key']}"
-                
-            # Using OpenAI API compatible format
-            payload = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "stream": False
-            }
-            
-            response = requests.post(
-                f"{self.remote['url']}/v1/chat/completions", 
-                headers=headers,
-                json=payload,
-                timeout=12000
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            else:
-                return f"Error: API returned status code {response.status_code}: {response.text}"
-                
-        except requests.exceptions.RequestException as e:
-            return f"Error connecting to remote server: {str(e)}"
+            result = response.json()
+            content = result["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise RemoteError(f"Unexpected response from remote server: {e}", self.remote["url"]) from e
+        if self.limiter:
+            self.limiter.record_tokens(count_tokens(0, result.get("usage"), content or ""))
+        return content
     
-    def run_stream(self, model, prompt):
+    def run_stream(self, model, prompt, options=None):
         """
         Run a query against an Ollama model with streaming output
         
         Args:
             model (str): Model name
-            prompt (str): Prompt to send to the model
+            prompt (str or list): Prompt, or chat messages ({'role', 'content'} dicts)
+            options (dict, optional): Sampling parameters (temperature, top_p, seed, ...)
             
         Yields:
             dict: Response chunks with 'response' key containing text
         """
         if self.remote:
-            yield from self._run_remote_stream(model, prompt)
+            yield from self._run_remote_stream(model, prompt, options)
         else:
-            yield from self._run_local_stream(model, prompt)
+            yield from self._run_local_stream(model, prompt, options)
     
-    def _run_local_stream(self, model, prompt):
-        """Stream responses from local Ollama model"""
+    def _run_local_stream(self, model, prompt, options=None):
+        """Stream responses from the local Ollama daemon's /api/chat endpoint"""
+        payload = {
+            "model": model,
+            "messages": as_messages(prompt),
+            "stream": True
+        }
+        if options:
+            payload["options"] = options
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        
+        yield from self._stream_local("/api/chat", payload, model, flatten_messages(prompt))
+
+    def _stream_local(self, path, payload, model, cli_prompt):
+        """
+        POST a streaming request to the local daemon and yield its NDJSON chunks
+        
+        Args:
+            path (str): Endpoint path, /api/chat or /api/generate
+            payload (dict): JSON body
+            model (str): Model name, for the ollama CLI fallback
+            cli_prompt (str): Prompt for the ollama CLI fallback, used when the
+                daemon is not reachable
+        """
+        try:
+            with self._in_flight:
+                response = self.local_session.post(
+                    f"{self.local_url}{path}",
+                    json=payload,
+                    stream=True,
+                    timeout=(LOCAL_CONNECT_TIMEOUT, 12000)
+                )
+        except requests.exceptions.ConnectionError:
+            if self.cancelled:
+                return
+            # Daemon not running; the CLI can still start it on demand
+            yield from self._run_local_subprocess_stream(model, cli_prompt)
+            return
+        except Exception as e:
+            if not self.cancelled:
+                yield error_chunk(RemoteError(str(e), self.local_url), "Error streaming from local model")
+            return
+        
+        self._response = response
         try:
-            cmd = ["ollama", "run", model, "--format", "json"]
+            with response:
+                if self.cancelled:
+                    return
+                if response.status_code != 200:
+                    yield error_chunk(HTTPStatusError(response.status_code, response.text, remote=self.local_url), "\nError")
+                    return
+                
+                try:
+                    for chunk in iter_ndjson_chunks(response.iter_content(chunk_size=None)):
+                        if chunk.get("error"):
+                            yield error_chunk(StreamError(chunk["error"], self.local_url), "\nError")
+                            return
+                        yield chunk
+                except Exception as e:
+                    if not self.cancelled:
+                        yield error_chunk(StreamError(str(e), self.local_url), "Error streaming from local model")
+        finally:
+            self._response = None
+
+    def generate_stream(self, model, prompt, context=None, options=None):
+        """
+        Stream a reply from the local daemon's /api/generate, continuing from a previous context
+        
+        Ollama returns the token state of the prompt and reply in the final
+        chunk's 'context'. Passing it back with the next prompt continues the
+        conversation without the server re-reading the earlier turns.
+        
+        Args:
+            model (str): Model name
+            prompt (str): New user input only
+            context (list, optional): 'context' from the previous reply
+            options (dict, optional): Sampling parameters (temperature, top_p, seed, ...)
+            
+        Yields:
+            dict: Response chunks; the final one carries 'done' and 'context'
+        """
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True
+        }
+        if context:
+            payload["context"] = context
+        if options:
+            payload["options"] = options
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        
+        yield from self._stream_local("/api/generate", payload, model, prompt)
+
+    def _run_local_subprocess_stream(self, model, prompt):
+        """Stream responses from the ollama CLI"""
+        try:
+            cmd = ["ollama", "run", model]
             process = subprocess.Popen(
                 cmd,
                 stdin=subprocess.PIPE,
@@ -119,105 +473,159 @@ class ApiClient:
             process.stdin.close()
             
             for line in process.stdout:
-                if not line.strip():
-                    continue
-                    
-                try:
-                    data = json.loads(line)
-                    if 'response' in data:
-                        content = data['response']
-                        if content:
-                            yield {"response": content}
-                except json.JSONDecodeError:
-                    clean_text = re.sub(r'^\s+', '', line)
-                    if clean_text.strip():
-                        yield {"response": clean_text.strip()}
+                if line:
+                    yield {"response": line}
             
             process.wait()
             if process.returncode != 0:
                 stderr = process.stderr.read()
                 if stderr:
-                    yield {"response": f"\nError: {stderr.strip()}"}
+                    yield error_chunk(RollamaError(stderr.strip()), "\nError")
                     
         except FileNotFoundError:
-            yield {"response": "Error: Ollama not found. Make sure it's installed and in your PATH."}
+            yield error_chunk(RollamaError("Ollama not found. Make sure it's installed and in your PATH."))
         except Exception as e:
-            yield {"response": f"Error streaming from local model: {str(e)}"}
+            yield error_chunk(RollamaError(str(e)), "Error streaming from local model")
 
-    def _run_remote_stream(self, model, prompt):
+    def _run_remote_stream(self, model, prompt, options=None):
         """Stream responses from remote Ollama server"""
         if not self.remote:
-            yield {"response": "Error: No remote server configured"}
+            yield error_chunk(RemoteError("No remote server configured"))
             return
-            
+        
+        payload = {
+            "model": model,
+            "messages": as_messages(prompt),
+            "stream": True
+        }
+        if options:
+            payload.update(options)
+        
+        tokens = 0
+        usage = None
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json, text/event-stream"  
-            }
-            
-            if self.remote.get("api_key"):
-                headers["Authorization"] = f"Bearer {self.remote['api_key']}"
-            
-            payload = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "stream": True
-            }
-            
-            with requests.post(
-                f"{self.remote['url']}/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                stream=True,
-                timeout=12000
-            ) as response:
-                if response.status_code != 200:
-                    yield {"response": f"\nError: API returned status code {response.status_code}"}
-                    return
-                
-                for line in response.iter_lines():
-                    if not line:
-                        continue
-                        
-                    line = line.decode('utf-8')
-                    if line.startswith('data:'):
-                        line = line[5:].strip()
-                    if line == '[DONE]':
-                        continue
-                        
-                    try:
-                        data = json.loads(line)
-                        if 'choices' in data and len(data['choices']) > 0:
-                            choice = data['choices'][0]
-                            content = ''
-                            if 'delta' in choice:
-                                content = choice['delta'].get('content', '')
-                            elif 'message' in choice:
-                                content = choice['message'].get('content', '')
-                            else:
-                                content = data.get('response', '')
-                                
-                            if content:
-                                yield {"response": content}
-                    except:
-                        if line.strip():
-                            yield {"response": line.strip()}
+            # The slot is held for the whole stream so max_concurrency bounds
+            # generations in progress, not just requests being sent
+            with self._limit():
+                response = self._post_remote("/v1/chat/completions", payload, stream=True)
+                with response:
+                    self._response = response
+                    if self.cancelled:
+                        return
+                    
+                    for chunk in iter_sse_chunks(response.iter_content(chunk_size=None)):
+                        if chunk.get("error"):
+                            yield error_chunk(StreamError(chunk["error"], self.remote["url"]), "\nError")
+                            return
+                        if chunk["response"]:
+                            tokens += 1
+                        if chunk.get("usage"):
+                            usage = chunk["usage"]
+                        if chunk["response"] or chunk.get("finish_reason") or chunk.get("usage"):
+                            yield chunk
                         
+        except RemoteError as e:
+            if not self.cancelled:
+                yield error_chunk(e)
         except Exception as e:
-            yield {"response": f"Error: {str(e)}"}
+            if not self.cancelled:
+                yield error_chunk(StreamError(str(e), self.remote["url"]))
+        finally:
+            self._response = None
+            if self.limiter:
+                self.limiter.record_tokens(count_tokens(tokens, usage))
     
-    def chat_stream(self, model, prompt):
+    def chat_stream(self, model, prompt, options=None):
         """Alias for run_stream to maintain API compatibility"""
-        return self.run_stream(model, prompt)
+        return self.run_stream(model, prompt, options)
     
+    def warm_model(self, model, keep_alive=None):
+        """
+        Load a model into memory ahead of the first prompt
+        
+        Sends Ollama an empty generate request, which loads the model and
+        returns without generating anything. Servers without the Ollama API
+        get a one-token completion instead.
+        
+        Args:
+            model (str): Model name
+            keep_alive (str or int, optional): How long to keep the model loaded
+                afterwards; defaults to the client's keep_alive
+            
+        Returns:
+            float: Seconds the load took
+            
+        Raises:
+            RollamaError: If the server could not load the model
+        """
+        payload = {"model": model}
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        started = time.monotonic()
+        
+        if self.remote:
+            with self._limit():
+                try:
+                    self._post_remote("/api/generate", payload).close()
+                except HTTPStatusError as e:
+                    if e.status_code not in (404, 405):
+                        raise
+                    self._post_remote("/v1/chat/completions", {
+                        "model": model,
+                        "messages": [{"role": "user", "content": ""}],
+                        "max_tokens": 1,
+                        "stream": False
+                    }).close()
+            return time.monotonic() - started
+        
+        try:
+            response = self.local_session.post(
+                f"{self.local_url}/api/generate",
+                json=payload,
+                timeout=(LOCAL_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+            )
+        except requests.exceptions.ConnectionError as e:
+            # Without the daemon, `ollama run` loads the model on every call anyway
+            raise ConnectError("Local Ollama daemon is not running", self.local_url) from e
+        except requests.exceptions.RequestException as e:
+            raise RemoteError(f"Request to local Ollama failed: {e}", self.local_url) from e
+        with response:
+            if response.status_code != 200:
+                raise HTTPStatusError(response.status_code, response.text[:500], remote=self.local_url)
+        return time.monotonic() - started
+
     def list_local_models(self):
         """
         List models available locally
         
         Returns:
             list: List of available models
+            
+        Raises:
+            StreamError: If the daemon's reply is not JSON
         """
+        try:
+            response = self.local_session.get(
+                f"{self.local_url}/api/tags",
+                timeout=(LOCAL_CONNECT_TIMEOUT, 10)
+            )
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                except ValueError as e:
+                    raise StreamError(f"Invalid reply from local Ollama: {e}", self.local_url) from e
+                return [model["name"] for model in data.get("models", [])]
+            print(f"Error: Ollama returned status code {response.status_code}")
+            return []
+        except requests.exceptions.ConnectionError:
+            return self._list_local_models_subprocess()
+        except requests.exceptions.RequestException as e:
+            print(f"Error listing local models: {str(e)}")
+            return []
+    
+    def _list_local_models_subprocess(self):
+        """List local models by parsing `ollama list` output"""
         try:
             result = subprocess.run(
                 ["ollama", "list"],
@@ -259,7 +667,7 @@ class ApiClient:
             if self.remote.get("api_key"):
                 headers["Authorization"] = f"Bearer {self.remote['api_key']}"
                 
-            response = requests.get(
+            response = self.session.get(
                 f"{self.remote['url']}/v1/models", 
                 headers=headers,
                 timeout=10
@@ -275,3 +683,76 @@ class ApiClient:
         except requests.exceptions.RequestException as e:
             print(f"Error connecting to remote server: {str(e)}")
             return []
+
+    def _get_catalog_json(self, session, url, headers, timeout):
+        """GET a catalog endpoint, returning None if the server does not provide it"""
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except requests.exceptions.ConnectionError as e:
+            raise ConnectError(f"Could not connect to {url}: {e}", url) from e
+        except requests.exceptions.RequestException as e:
+            raise RemoteError(f"Request to {url} failed: {e}", url) from e
+        if response.status_code != 200:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    def fetch_model_catalog(self):
+        """
+        Collect everything the server reports about its models
+        
+        Merges the installed models from /api/tags, the OpenAI-compatible
+        list from /v1/models (remotes only) and the models currently loaded
+        in memory from /api/ps. Endpoints a server does not implement are
+        skipped.
+        
+        Returns:
+            list: Model dicts with 'name', 'loaded' and, where known, 'size'
+                and 'modified_at', sorted by name
+            
+        Raises:
+            RollamaError: If the server could not be queried at all
+        """
+        if self.remote:
+            base_url, session = self.remote["url"], self.session
+            headers = {}
+            if self.remote.get("api_key"):
+                headers["Authorization"] = f"Bearer {self.remote['api_key']}"
+            timeout = (self.remote.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT), 10)
+        else:
+            base_url, session, headers = self.local_url, self.local_session, {}
+            timeout = (LOCAL_CONNECT_TIMEOUT, 10)
+        
+        models = {}
+        
+        def entry(name):
+            return models.setdefault(name, {"name": name, "loaded": False})
+        
+        try:
+            tags = self._get_catalog_json(session, f"{base_url}/api/tags", headers, timeout)
+        except ConnectError:
+            if self.remote:
+                raise
+            # No local daemon; the ollama CLI can still list installed models
+            for name in self._list_local_models_subprocess():
+                entry(name)
+            return sorted(models.values(), key=lambda model: model["name"])
+        
+        for model in (tags or {}).get("models", []):
+            item = entry(model["name"])
+            for field in ("size", "modified_at"):
+                if field in model:
+                    item[field] = model[field]
+        
+        if self.remote:
+            listing = self._get_catalog_json(session, f"{base_url}/v1/models", headers, timeout)
+            for model in (listing or {}).get("data", []):
+                entry(model["id"])
+        
+        running = self._get_catalog_json(session, f"{base_url}/api/ps", headers, timeout)
+        for model in (running or {}).get("models", []):
+            entry(model["name"])["loaded"] = True
+        
+        return sorted(models.values(), key=lambda model: model["name"])
@@ -0,0 +1,511 @@
+import asyncio
+import json
+import ssl
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from .api_client import (
+    as_messages, default_local_url, flatten_messages, parse_retry_after, LOCAL_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+)
+from .compression import compress_threshold, decode_body, encode_json
+from .errors import (
+    ConnectError, HTTPStatusError, RemoteError, RequestTimeout, RollamaError, StreamError, error_chunk
+)
+from .rate_limit import get_limiter, count_tokens
+from .retry import RetryPolicy, async_call_with_retry, get_breaker
+from .stream_parser import aiter_ndjson_chunks, aiter_sse_chunks
+
+DEFAULT_POOL_SIZE = 10
+
+# Idle keep-alive connections, per event loop and per remote origin. Asyncio
+# streams are bound to the loop that opened them, so pools cannot be shared
+# across loops the way http_pool shares requests sessions across threads.
+_loop_pools = weakref.WeakKeyDictionary()
+
+
+class _Origin:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.key = f"{self.scheme}://{self.host}:{self.port}"
+
+
+class _ConnectionPool:
+    """Keep-alive connections to one origin, bounded by pool_size idle sockets"""
+
+    def __init__(self, origin, pool_size=DEFAULT_POOL_SIZE):
+        self.origin = origin
+        self.pool_size = pool_size
+        self._idle = []
+
+    async def acquire(self, connect_timeout, reuse=True):
+        """Return (reader, writer, reused) for an idle or newly opened connection"""
+        while reuse and self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+
+        ssl_context = ssl.create_default_context() if self.origin.scheme == "https" else None
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    self.origin.host,
+                    self.origin.port,
+                    ssl=ssl_context,
+                    server_hostname=self.origin.host if ssl_context else None
+                ),
+                timeout=connect_timeout
+            )
+        except asyncio.TimeoutError as e:
+            # Nothing reached the server, so this is a connection failure (and
+            # safe to retry), not a request that timed out
+            raise ConnectionError(f"Timed out connecting to {self.origin.key}") from e
+        return reader, writer, False
+
+    def release(self, reader, writer):
+        if len(self._idle) < self.pool_size and not writer.is_closing():
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+def _get_pool(url, pool_size=None):
+    loop = asyncio.get_running_loop()
+    origin = _Origin(url)
+    pools = _loop_pools.setdefault(loop, {})
+    pool = pools.get(origin.key)
+    if pool is None:
+        pool = _ConnectionPool(origin, int(pool_size or DEFAULT_POOL_SIZE))
+        pools[origin.key] = pool
+    elif pool_size and int(pool_size) > pool.pool_size:
+        pool.pool_size = int(pool_size)
+    return pool
+
+
+class AsyncResponse:
+    """Streaming HTTP/1.1 response read from a pooled asyncio connection"""
+
+    def __init__(self, status_code, headers, reader, writer, pool, read_timeout=None):
+        self.status_code = status_code
+        self.headers = headers
+        self._reader = reader
+        self._writer = writer
+        self._pool = pool
+        self._read_timeout = read_timeout
+        self._done = False
+
+    def _wait(self, read):
+        # Bound the silence between reads so a hung server cannot stall a stream forever
+        if self._read_timeout:
+            return asyncio.wait_for(read, self._read_timeout)
+        return read
+
+    @property
+    def _keep_alive(self):
+        return self.headers.get("connection", "").lower() != "close"
+
+    async def iter_bytes(self):
+        """Yield the response body as it arrives"""
+        try:
+            if self.headers.get("transfer-encoding", "").lower() == "chunked":
+                while True:
+                    size_line = await self._wait(self._reader.readline())
+                    size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                    if size == 0:
+                        # Skip trailers up to the terminating blank line
+                        while (await self._wait(self._reader.readline())) not in (b"\r\n", b"\n", b""):
+                            pass
+                        break
+                    data = await self._wait(self._reader.readexactly(size))
+                    await self._wait(self._reader.readexactly(2))
+                    yield data
+            elif "content-length" in self.headers:
+                remaining = int(self.headers["content-length"])
+                while remaining > 0:
+                    data = await self._wait(self._reader.read(min(remaining, 65536)))
+                    if not data:
+                        raise ConnectionError("Connection closed before end of response")
+                    remaining -= len(data)
+                    yield data
+            else:
+                while True:
+                    data = await self._wait(self._reader.read(65536))
+                    if not data:
+                        break
+                    yield data
+                self.headers["connection"] = "close"
+            self._done = True
+        finally:
+            self.close()
+
+    async def read(self):
+        """Read the whole response body, undoing any Content-Encoding"""
+        data = b"".join([data async for data in self.iter_bytes()])
+        return decode_body(data, self.headers.get("content-encoding"))
+
+    async def json(self):
+        return json.loads(await self.read())
+
+    def close(self):
+        """Return the connection to the pool, or drop it if the body was not consumed"""
+        if self._writer is None:
+            return
+        if self._done and self._keep_alive:
+            self._pool.release(self._reader, self._writer)
+        else:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+async def _read_head(reader):
+    """Read a response's status line and headers; returns (status_code, headers)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status_code = int(status_line.split(None, 2)[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status_code, headers
+
+
+async def request(method, url, headers=None, json_body=None, pool_size=None,
+                  connect_timeout=10, timeout=12000, read_timeout=None, compress_threshold=None):
+    """
+    Send an HTTP/1.1 request over a pooled keep-alive connection
+
+    Args:
+        method (str): HTTP method
+        url (str): Absolute request URL
+        headers (dict, optional): Extra request headers
+        json_body (object, optional): Body to send as JSON
+        pool_size (int, optional): Idle connection limit for the origin
+        connect_timeout (float): Seconds to wait for the connection
+        timeout (float): Seconds to wait for the response headers
+        read_timeout (float, optional): Seconds to wait for each piece of the body
+        compress_threshold (int, optional): Gzip JSON bodies of at least this many bytes
+
+    Returns:
+        AsyncResponse: Response whose body has not been read yet
+    """
+    pool = _get_pool(url, pool_size)
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += f"?{parts.query}"
+
+    body = b""
+    request_headers = {
+        "Host": parts.netloc,
+        "Accept-Encoding": "identity",
+        "Connection": "keep-alive",
+    }
+    if json_body is not None:
+        body, body_headers = encode_json(json_body, compress_threshold)
+        request_headers.update(body_headers)
+    request_headers.update(headers or {})
+    request_headers["Content-Length"] = str(len(body))
+
+    head = f"{method} {path} HTTP/1.1\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in request_headers.items())
+    head += "\r\n"
+
+    reuse = True
+    while True:
+        reader, writer, reused = await pool.acquire(connect_timeout, reuse=reuse)
+        try:
+            writer.write(head.encode("latin-1") + body)
+            await asyncio.wait_for(writer.drain(), timeout=timeout)
+
+            status_code, response_headers = await asyncio.wait_for(_read_head(reader), timeout=timeout)
+            break
+        except asyncio.TimeoutError:
+            writer.close()
+            raise
+        except (ConnectionError, OSError):
+            writer.close()
+            if not reused:
+                raise
+            # The server dropped an idle keep-alive socket; retry on a fresh one
+            reuse = False
+        except BaseException:
+            writer.close()
+            raise
+
+    return AsyncResponse(status_code, response_headers, reader, writer, pool, read_timeout)
+
+
+class AsyncApiClient:
+    """asyncio counterpart of ApiClient for driving many concurrent streams"""
+
+    def __init__(self, remote=None, local_url=None, keep_alive=None):
+        """
+        Initialize the async API client
+
+        Args:
+            remote (dict): Remote server details (url, api_key, pool_size)
+            local_url (str, optional): URL of the local Ollama daemon
+            keep_alive (str or int, optional): How long Ollama keeps a model loaded
+        """
+        self.remote = remote
+        self.local_url = (local_url or default_local_url()).rstrip("/")
+        self.keep_alive = keep_alive
+        self.limiter = get_limiter(remote)
+
+    @asynccontextmanager
+    async def _limit(self):
+        """Wait for the remote's concurrency and rate limits, if any"""
+        if self.limiter:
+            async with self.limiter.async_slot():
+                yield
+        else:
+            yield
+
+    @property
+    def server_id(self):
+        """Identifier of the server this client talks to"""
+        return self.remote["url"] if self.remote else f"local:{self.local_url}"
+
+    def _remote_headers(self):
+        headers = {}
+        if self.remote.get("api_key"):
+            headers["Authorization"] = f"Bearer {self.remote['api_key']}"
+        return headers
+
+    async def run_stream(self, model, prompt, options=None):
+        """
+        Run a query with streaming output
+
+        Args:
+            model (str): Model name
+            prompt (str or list): Prompt, or chat messages ({'role', 'content'} dicts)
+            options (dict, optional): Sampling parameters (temperature, top_p, seed, ...)
+
+        Yields:
+            dict: Response chunks with 'response' key containing text
+        """
+        if self.remote:
+            stream = self._run_remote_stream(model, prompt, options)
+        else:
+            stream = self._run_local_stream(model, prompt, options)
+        async for chunk in stream:
+            yield chunk
+
+    async def run(self, model, prompt, options=None):
+        """
+        Run a query and return the complete response
+
+        Args:
+            model (str): Model name
+            prompt (str): Prompt to send to the model
+            options (dict, optional): Sampling parameters (temperature, top_p, seed, ...)
+
+        Returns:
+            str: Model response
+
+        Raises:
+            RollamaError: If the request failed
+        """
+        pieces = []
+        async for chunk in self.run_stream(model, prompt, options):
+            if chunk.get("error"):
+                raise chunk.get("exception") or RollamaError(chunk.get("response", "").strip())
+            pieces.append(chunk.get("response", ""))
+        return "".join(pieces)
+
+    async def _run_local_stream(self, model, prompt, options=None):
+        """Stream responses from the local Ollama daemon's /api/chat endpoint"""
+        payload = {
+            "model": model,
+            "messages": as_messages(prompt),
+            "stream": True
+        }
+        if options:
+            payload["options"] = options
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        try:
+            response = await request(
+                "POST", f"{self.local_url}/api/chat",
+                json_body=payload,
+                connect_timeout=LOCAL_CONNECT_TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError):
+            async for chunk in self._run_local_subprocess_stream(model, flatten_messages(prompt)):
+                yield chunk
+            return
+
+        try:
+            if response.status_code != 200:
+                body = (await response.read()).decode("utf-8", "replace")
+                yield error_chunk(HTTPStatusError(response.status_code, body, remote=self.local_url), "\nError")
+                return
+
+            async for chunk in aiter_ndjson_chunks(response.iter_bytes()):
+                if chunk.get("error"):
+                    yield error_chunk(StreamError(chunk["error"], self.local_url), "\nError")
+                    return
+                yield chunk
+        except Exception as e:
+            yield error_chunk(StreamError(str(e), self.local_url), "Error streaming from local model")
+        finally:
+            response.close()
+
+    async def _run_local_subprocess_stream(self, model, prompt):
+        """Stream responses from the ollama CLI"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "ollama", "run", model,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            yield error_chunk(RollamaError("Ollama not found. Make sure it's installed and in your PATH."))
+            return
+
+        process.stdin.write((prompt + "\n").encode("utf-8"))
+        await process.stdin.drain()
+        process.stdin.close()
+
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+            yield {"response": line.decode("utf-8", "replace")}
+
+        await process.wait()
+        if process.returncode != 0:
+            stderr = (await process.stderr.read()).decode("utf-8", "replace")
+            if stderr:
+                yield error_chunk(RollamaError(stderr.strip()), "\nError")
+
+    async def _run_remote_stream(self, model, prompt, options=None):
+        """Stream responses from a remote OpenAI-compatible server"""
+        headers = self._remote_headers()
+        headers["Accept"] = "application/json, text/event-stream"
+        payload = {
+            "model": model,
+            "messages": as_messages(prompt),
+            "stream": True
+        }
+        if options:
+            payload.update(options)
+
+        url = self.remote["url"]
+
+        async def send():
+            try:
+                response = await request(
+                    "POST", f"{url}/v1/chat/completions",
+                    headers=headers,
+                    json_body=payload,
+                    pool_size=self.remote.get("pool_size"),
+                    compress_threshold=compress_threshold(self.remote),
+                    connect_timeout=self.remote.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+                    timeout=self.remote.get("read_timeout", DEFAULT_READ_TIMEOUT),
+                    read_timeout=self.remote.get("read_timeout", DEFAULT_READ_TIMEOUT)
+                )
+            except asyncio.TimeoutError as e:
+                raise RequestTimeout("Remote server timed out", url) from e
+            except OSError as e:
+                # Covers refused and reset connections, DNS failures and connect timeouts
+                raise ConnectError(f"Could not connect to remote server: {e}", url) from e
+            if response.status_code != 200:
+                body = (await response.read()).decode("utf-8", "replace")
+                raise HTTPStatusError(
+                    response.status_code, body[:500], remote=url,
+                    retry_after=parse_retry_after(response.headers.get("retry-after"))
+                )
+            return response
+
+        # Hold the slot for the whole stream, as ApiClient does
+        async with self._limit():
+            tokens = 0
+            usage = None
+            try:
+                response = await async_call_with_retry(
+                    send, RetryPolicy.from_remote(self.remote), get_breaker(self.remote)
+                )
+            except RemoteError as e:
+                yield error_chunk(e)
+                return
+
+            try:
+                async for chunk in aiter_sse_chunks(response.iter_bytes()):
+                    if chunk.get("error"):
+                        yield error_chunk(StreamError(chunk["error"], url), "\nError")
+                        return
+                    if chunk["response"]:
+                        tokens += 1
+                    if chunk.get("usage"):
+                        usage = chunk["usage"]
+                    if chunk["response"] or chunk.get("finish_reason") or chunk.get("usage"):
+                        yield chunk
+            except asyncio.TimeoutError:
+                yield error_chunk(RequestTimeout("Remote server stopped responding", url))
+            except Exception as e:
+                yield error_chunk(StreamError(str(e), url))
+            finally:
+                response.close()
+                if self.limiter:
+                    self.limiter.record_tokens(count_tokens(tokens, usage))
+
+    async def list_models(self):
+        """
+        List models available on the remote server, or locally
+
+        Returns:
+            list: List of available models
+        """
+        try:
+            if self.remote:
+                response = await request(
+                    "GET", f"{self.remote['url']}/v1/models",
+                    headers=dict(self._remote_headers(), **{"Accept-Encoding": "gzip, deflate"}),
+                    pool_size=self.remote.get("pool_size"),
+                    timeout=10
+                )
+                if response.status_code != 200:
+                    response.close()
+                    print(f"Error: API returned status code {response.status_code}")
+                    return []
+                data = await response.json()
+                return [model["id"] for model in data.get("data", [])]
+
+            response = await request(
+                "GET", f"{self.local_url}/api/tags",
+                connect_timeout=LOCAL_CONNECT_TIMEOUT,
+                timeout=10
+            )
+            if response.status_code != 200:
+                response.close()
+                print(f"Error: Ollama returned status code {response.status_code}")
+                return []
+            data = await response.json()
+            return [model["name"] for model in data.get("models", [])]
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            print(f"Error listing models: {str(e)}")
+            return []
+
+
+async def close_pools():
+    """Close idle connections opened by the running event loop"""
+    pools = _loop_pools.pop(asyncio.get_running_loop(), {})
+    for pool in pools.values():
+        pool.close()
@@ -0,0 +1,259 @@
+"""Run many prompts from a JSONL file with bounded concurrency.
+
+Each input line is either a JSON object with a "prompt" (and optionally
+"id", "model", "remote" and "options") or a bare JSON string used as the
+prompt. Results are written as JSONL, one object per prompt, either as
+they complete or in input order. Successfully completed ids are appended
+to a checkpoint file so an interrupted run can be resumed.
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+
+from .response_cache import is_deterministic
+
+DEFAULT_CONCURRENCY = 8
+
+# Stats copied from the final stream chunk into each result
+_RESULT_FIELDS = ("finish_reason", "usage", "prompt_eval_count", "eval_count", "total_duration")
+
+
+def parse_item(line, index):
+    """
+    Parse one input line into a batch item
+
+    Args:
+        line (str): JSONL line
+        index (int): Zero-based position of the line in the input
+
+    Returns:
+        dict or None: Item with 'id', 'index' and 'prompt', or None for a blank line
+
+    Raises:
+        ValueError: If the line is not valid JSON or has no prompt
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        data = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"line {index + 1}: {e}")
+    if isinstance(data, str):
+        data = {"prompt": data}
+    if not isinstance(data, dict) or not isinstance(data.get("prompt"), str):
+        raise ValueError(f"line {index + 1}: expected a JSON object with a 'prompt' string")
+    item = dict(data)
+    item["index"] = index
+    item["id"] = str(data.get("id", index))
+    return item
+
+
+def load_checkpoint(path):
+    """
+    Read the ids completed by an earlier run
+
+    Args:
+        path (str): Checkpoint file, one id per line
+
+    Returns:
+        set: Completed ids (empty if the file does not exist)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {line.rstrip("\n") for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+class BatchRunner:
+    """Drive a stream of prompts through one or more remotes concurrently"""
+
+    def __init__(self, model_manager, model=None, remotes=None, concurrency=DEFAULT_CONCURRENCY,
+                 ordered=False, checkpoint=None, options=None, use_cache=None):
+        """
+        Initialize the batch runner
+
+        Args:
+            model_manager (ModelManager): Source of clients and the response cache
+            model (str, optional): Model for items that do not name one
+            remotes (list, optional): Remote or group names; items are spread
+                across them round-robin. Defaults to the default remote.
+            concurrency (int): Maximum number of prompts in flight
+            ordered (bool): Write results in input order rather than completion order
+            checkpoint (str, optional): File recording completed ids for resuming
+            options (dict, optional): Sampling parameters for items without their own
+            use_cache (bool, optional): Look up and store responses in the response
+                cache: True always, False never, None (the default) only for
+                deterministic items (temperature 0 or a seed)
+        """
+        self.model_manager = model_manager
+        self.model = model or model_manager.config.get_default_model()
+        self.remotes = list(remotes) if remotes else [None]
+        self.concurrency = max(1, concurrency)
+        self.ordered = ordered
+        self.checkpoint = checkpoint
+        self.options = options
+        self.use_cache = use_cache
+        self.cache = model_manager.get_cache() if use_cache is not False else None
+        self._clients = {}
+
+    def _client(self, remote):
+        if remote not in self._clients:
+            self._clients[remote] = self.model_manager._get_async_client(remote)
+        return self._clients[remote]
+
+    async def _run_item(self, item):
+        """Run one prompt and build its result record"""
+        remote = item.get("remote") or self.remotes[item["index"] % len(self.remotes)]
+        model = item.get("model") or self.model
+        options = item.get("options", self.options)
+        result = {"id": item["id"], "index": item["index"], "model": model}
+        if remote:
+            result["remote"] = remote
+        started = time.monotonic()
+
+        try:
+            client = self._client(remote)
+            cache = self.cache if self.use_cache or is_deterministic(options) else None
+            cache_key = None
+            if cache:
+                cache_key = self.model_manager._cache_key(client, model, item["prompt"], options)
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    result.update(response="".join(cached), cached=True)
+                    return result
+
+            pieces = []
+            async for chunk in client.run_stream(model, item["prompt"], options):
+                if chunk.get("error"):
+                    result["error"] = chunk.get("response", "").strip() or str(chunk["error"])
+                    break
+                piece = chunk.get("response", "")
+                if piece:
+                    pieces.append(piece)
+                for field in _RESULT_FIELDS:
+                    if field in chunk:
+                        result[field] = chunk[field]
+            result["response"] = "".join(pieces)
+
+            if cache and "error" not in result and pieces:
+                cache.put(cache_key, pieces, model=model)
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            result["elapsed"] = round(time.monotonic() - started, 3)
+        return result
+
+    async def map_async(self, prompts, on_result=None):
+        """
+        Run a list of prompts, at most `concurrency` of them at a time
+
+        Args:
+            prompts (list): Prompt strings; the i-th is sent to remote i mod len(remotes)
+            on_result (callable, optional): Called with each result record as it completes
+
+        Returns:
+            list: Result records (see run_async) in the order of prompts
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(index, prompt):
+            async with semaphore:
+                result = await self._run_item({"id": str(index), "index": index, "prompt": prompt})
+            if on_result:
+                on_result(result)
+            return result
+
+        return await asyncio.gather(*(run(index, prompt) for index, prompt in enumerate(prompts)))
+
+    async def _read_items(self, source, queue, skip, summary):
+        """Feed parsed items to the workers without blocking the event loop on input"""
+        loop = asyncio.get_running_loop()
+        index = 0
+        while True:
+            line = await loop.run_in_executor(None, source.readline)
+            if not line:
+                break
+            try:
+                item = parse_item(line, index)
+            except ValueError as e:
+                print(f"Skipping invalid input {e}", file=sys.stderr)
+                item = None
+                summary["invalid"] += 1
+            index += 1
+            if item is None:
+                continue
+            if item["id"] in skip:
+                summary["skipped"] += 1
+                continue
+            await queue.put(item)
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def run_async(self, source, output):
+        """
+        Process every item read from source, writing results to output
+
+        Args:
+            source (file): Text stream of JSONL input
+            output (file): Text stream the JSONL results are written to
+
+        Returns:
+            dict: Counts of completed, failed, skipped and invalid items
+        """
+        skip = load_checkpoint(self.checkpoint) if self.checkpoint else set()
+        summary = {"completed": 0, "failed": 0, "skipped": 0, "invalid": 0}
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        checkpoint_file = open(self.checkpoint, "a", encoding="utf-8") if self.checkpoint else None
+
+        # Input-order mode holds finished results until every earlier item is written
+        pending = {}
+        positions = deque()
+
+        def write(result):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            if "error" in result:
+                summary["failed"] += 1
+            else:
+                summary["completed"] += 1
+                if checkpoint_file:
+                    checkpoint_file.write(result["id"] + "\n")
+                    checkpoint_file.flush()
+
+        def flush_ordered():
+            while positions and positions[0] in pending:
+                write(pending.pop(positions.popleft()))
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                if self.ordered:
+                    # The queue is FIFO, so positions are taken in input order
+                    positions.append(item["index"])
+                result = await self._run_item(item)
+                if self.ordered:
+                    pending[item["index"]] = result
+                    flush_ordered()
+                else:
+                    write(result)
+
+        try:
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            await self._read_items(source, queue, skip, summary)
+            await asyncio.gather(*workers)
+        finally:
+            if checkpoint_file:
+                checkpoint_file.close()
+            from .async_client import close_pools
+            await close_pools()
+        return summary
+
+    def run(self, source, output):
+        """Blocking wrapper around run_async"""
+        return asyncio.run(self.run_async(source, output))
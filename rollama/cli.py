@@ -1,8 +1,135 @@
 import argparse
 import sys
-from .config import Config
-from .model_manager import ModelManager
-from .utils import interactive_mode
+import time
+from .config import get_config
+from .errors import RollamaError
+
+# Commands that only read or write the configuration. They skip importing the
+# model manager and with it the HTTP stack, which dominates startup time.
+CONFIG_ONLY_COMMANDS = {
+    ("remote",), ("remote", "group"),
+    ("remote", "add"), ("remote", "limit"), ("remote", "remove"), ("remote", "list"), ("remote", "default"),
+    ("remote", "group", "add"), ("remote", "group", "remove"), ("remote", "group", "list"),
+    ("daemon",), ("daemon", "start"), ("daemon", "stop"), ("daemon", "status"),
+}
+
+
+def _command_path(args):
+    """The subcommand words given, e.g. ("remote", "group", "list")"""
+    path = (args.command,)
+    for attribute in ("remote_command", "group_command", "daemon_command"):
+        value = getattr(args, attribute, None)
+        if value:
+            path += (value,)
+    return path
+
+
+def _sampling_options(args):
+    """Model options from the sampling flags given, or None"""
+    options = {}
+    if args.temperature is not None:
+        options["temperature"] = args.temperature
+    if args.top_p is not None:
+        options["top_p"] = args.top_p
+    if args.seed is not None:
+        options["seed"] = args.seed
+    if getattr(args, "num_ctx", None) is not None:
+        options["num_ctx"] = args.num_ctx
+    return options or None
+
+
+def _use_cache(args):
+    """use_cache for run_model from the cache flags: False, True, or None for deterministic requests only"""
+    if args.no_cache:
+        return False
+    return True if args.cache else None
+
+
+def _daemon_request(args):
+    """The daemon request equivalent to a command, or None if it runs in-process only"""
+    if getattr(args, "no_daemon", False):
+        return None
+    if args.command == "run" and args.prompt and not args.interactive:
+        return {
+            "op": "run",
+            "model": args.model,
+            "prompt": args.prompt,
+            "remote": args.remote,
+            "stream": not args.no_stream,
+            "options": _sampling_options(args),
+            "use_cache": _use_cache(args),
+            "refresh": args.refresh,
+            "hedge": args.hedge,
+        }
+    if args.command == "list":
+        return {"op": "list", "remote": args.remote, "refresh": args.refresh}
+    return None
+
+
+def _forward_to_daemon(args):
+    """
+    Run a command in the rollamad daemon if one is listening
+    
+    Returns:
+        int or None: Exit status, or None if the command should run in-process
+    """
+    payload = _daemon_request(args)
+    if payload is None:
+        return None
+    from . import daemon
+    try:
+        return daemon.request(payload)
+    except daemon.DaemonUnavailable:
+        return None
+    except RollamaError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+def _daemon_command(args):
+    """Start, stop or check the rollamad daemon"""
+    import subprocess
+    from . import daemon
+    
+    if args.daemon_command == "status":
+        if daemon.is_running():
+            print(f"rollamad is running on {daemon.default_socket_path()}")
+            return 0
+        print("rollamad is not running")
+        return 1
+    
+    if args.daemon_command == "stop":
+        try:
+            daemon.request({"op": "shutdown"})
+        except daemon.DaemonUnavailable:
+            print("rollamad is not running")
+            return 1
+        print("Stopped rollamad")
+        return 0
+    
+    # start
+    if daemon.is_running():
+        print("rollamad is already running")
+        return 0
+    log_path = daemon.default_log_path()
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "ab") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "rollama.daemon"],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+            start_new_session=True
+        )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if daemon.is_running():
+            print(f"Started rollamad (pid {process.pid})")
+            return 0
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    print(f"Error: rollamad did not start; see {log_path}")
+    return 1
+
 
 def main():
     parser = argparse.ArgumentParser(description="Rollama - Ollama with remote capabilities")
@@ -15,10 +142,67 @@ def main():
     run_parser.add_argument("--remote", "-r", help="Remote server name to use")
     run_parser.add_argument("--interactive", "-i", action="store_true", help="Start interactive mode")
     run_parser.add_argument("--no-stream", action="store_true", help="Disable response streaming")
+    run_parser.add_argument("--temperature", type=float, help="Sampling temperature")
+    run_parser.add_argument("--top-p", type=float, help="Nucleus sampling probability mass")
+    run_parser.add_argument("--seed", type=int, help="Random seed for reproducible sampling")
+    run_parser.add_argument("--num-ctx", type=int, help="Context window size in tokens")
+    run_parser.add_argument("--no-daemon", action="store_true", help="Run in this process even if rollamad is running")
+    run_cache_group = run_parser.add_mutually_exclusive_group()
+    run_cache_group.add_argument("--cache", action="store_true",
+                                 help="Cache the response even if sampling is random (no --temperature 0 or --seed)")
+    run_cache_group.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
+    run_parser.add_argument("--refresh", action="store_true", help="Ignore any cached response and store a fresh one")
+    hedge_group = run_parser.add_mutually_exclusive_group()
+    hedge_group.add_argument("--hedge", dest="hedge", action="store_true", default=None,
+                             help="Send a backup request to another group member if the first token is late")
+    hedge_group.add_argument("--no-hedge", dest="hedge", action="store_false", help="Disable request hedging")
+    
+    # Warm command
+    warm_parser = subparsers.add_parser("warm", help="Load a model into memory ahead of use")
+    warm_parser.add_argument("model", help="Model to load")
+    warm_parser.add_argument("--remote", "-r", help="Remote server or group to load it on")
+    warm_parser.add_argument("--keep-alive", help='How long to keep it loaded, e.g. "30m", "3600" or "-1" for indefinitely')
+    pin_group = warm_parser.add_mutually_exclusive_group()
+    pin_group.add_argument("--pin", action="store_true", help="Also keep this model loaded during every session")
+    pin_group.add_argument("--unpin", action="store_true", help="Stop keeping this model loaded during sessions")
+    
+    # Batch command
+    batch_parser = subparsers.add_parser("batch", help="Run prompts from a JSONL file concurrently")
+    batch_parser.add_argument("input", nargs="?", default="-", help="JSONL file of prompts (default: stdin)")
+    batch_parser.add_argument("--output", "-o", help="File to write JSONL results to (default: stdout)")
+    batch_parser.add_argument("--model", "-m", help="Model for prompts that do not name one")
+    batch_parser.add_argument("--remote", "-r", action="append",
+                              help="Remote server or group to use; repeat to spread prompts across several")
+    batch_parser.add_argument("--concurrency", "-c", type=int, default=8, help="Maximum prompts in flight")
+    batch_parser.add_argument("--ordered", action="store_true", help="Write results in input order")
+    batch_parser.add_argument("--checkpoint", help="Progress file for resuming (default: <output>.checkpoint)")
+    batch_parser.add_argument("--temperature", type=float, help="Sampling temperature")
+    batch_parser.add_argument("--top-p", type=float, help="Nucleus sampling probability mass")
+    batch_parser.add_argument("--seed", type=int, help="Random seed for reproducible sampling")
+    batch_cache_group = batch_parser.add_mutually_exclusive_group()
+    batch_cache_group.add_argument("--cache", action="store_true",
+                                   help="Cache responses even if sampling is random (no --temperature 0 or --seed)")
+    batch_cache_group.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
+    
+    # Tokens command
+    tokens_parser = subparsers.add_parser("tokens", help="Count the tokens in a prompt")
+    tokens_parser.add_argument("prompt", nargs="?", help="Text to measure (default: stdin)")
+    tokens_parser.add_argument("--file", "-f", help="File to measure instead")
+    tokens_parser.add_argument("--model", "-m", help="Model whose tokenizer to use (default: the default model)")
+    tokens_parser.add_argument("--num-ctx", type=int, help="Context window size in tokens")
     
     # List models command
     list_parser = subparsers.add_parser("list", help="List available models")
     list_parser.add_argument("--remote", "-r", help="Remote server name to show models from")
+    list_parser.add_argument("--refresh", action="store_true", help="Query the server instead of the cached model list")
+    list_parser.add_argument("--no-daemon", action="store_true", help="Run in this process even if rollamad is running")
+    
+    # Daemon
+    daemon_parser = subparsers.add_parser("daemon", help="Manage the rollamad background daemon")
+    daemon_subparsers = daemon_parser.add_subparsers(dest="daemon_command")
+    daemon_subparsers.add_parser("start", help="Start rollamad in the background")
+    daemon_subparsers.add_parser("stop", help="Stop rollamad")
+    daemon_subparsers.add_parser("status", help="Show whether rollamad is running")
     
     # Add remote server
     remote_parser = subparsers.add_parser("remote", help="Manage remote servers")
@@ -29,6 +213,18 @@ def main():
     add_parser.add_argument("url", help="URL of the remote Ollama server")
     add_parser.add_argument("--api-key", help="API key for the remote server (if needed)")
     add_parser.add_argument("--default", "-d", action="store_true", help="Set as default remote")
+    add_parser.add_argument("--pool-size", type=int, help="Maximum pooled keep-alive connections to the server")
+    add_parser.add_argument("--compress", action="store_true", help="Gzip large request bodies (the server must accept them)")
+    add_parser.add_argument("--compress-threshold", type=int, help="Smallest body in bytes to compress (default 32768)")
+    add_parser.add_argument("--max-concurrency", type=int, help="Maximum requests in flight to the server")
+    add_parser.add_argument("--rps", type=float, help="Maximum requests per second")
+    add_parser.add_argument("--tps", type=float, help="Maximum prompt + completion tokens per second")
+    
+    limit_parser = remote_subparsers.add_parser("limit", help="Show or set a remote server's request limits")
+    limit_parser.add_argument("name", help="Name of the remote server")
+    limit_parser.add_argument("--max-concurrency", type=int, help="Maximum requests in flight (0 removes the limit)")
+    limit_parser.add_argument("--rps", type=float, help="Maximum requests per second (0 removes the limit)")
+    limit_parser.add_argument("--tps", type=float, help="Maximum tokens per second (0 removes the limit)")
     
     remove_parser = remote_subparsers.add_parser("remove", help="Remove a remote server")
     remove_parser.add_argument("name", help="Name of the remote server")
@@ -36,16 +232,53 @@ def main():
     list_remote_parser = remote_subparsers.add_parser("list", help="List remote servers")
     
     default_parser = remote_subparsers.add_parser("default", help="Set default remote server")
-    default_parser.add_argument("name", help="Name of the remote server")
+    default_parser.add_argument("name", help="Name of the remote server or remote group")
     
-    args = parser.parse_args()
+    group_parser = remote_subparsers.add_parser("group", help="Manage load-balanced remote groups")
+    group_subparsers = group_parser.add_subparsers(dest="group_command")
     
-    config = Config()
-    model_manager = ModelManager(config)
+    group_add_parser = group_subparsers.add_parser("add", help="Add a remote group")
+    group_add_parser.add_argument("name", help="Name for the remote group")
+    group_add_parser.add_argument("members", nargs="+", help="Names of the remote servers in the group")
+    group_add_parser.add_argument("--health-interval", type=float, help="Seconds between health checks (0 disables them)")
+    group_add_parser.add_argument("--hedge", action="store_true", help="Hedge slow requests to a second member by default")
+    group_add_parser.add_argument("--default", "-d", action="store_true", help="Set as default remote")
+    
+    group_remove_parser = group_subparsers.add_parser("remove", help="Remove a remote group")
+    group_remove_parser.add_argument("name", help="Name of the remote group")
+    
+    group_subparsers.add_parser("list", help="List remote groups")
+    
+    group_status_parser = group_subparsers.add_parser("status", help="Check the health of a group's members")
+    group_status_parser.add_argument("name", help="Name of the remote group")
+    
+    # Response cache
+    cache_parser = subparsers.add_parser("cache", help="Manage the response cache")
+    cache_subparsers = cache_parser.add_subparsers(dest="cache_command")
+    cache_subparsers.add_parser("info", help="Show response cache usage")
+    cache_subparsers.add_parser("clear", help="Remove all cached responses")
+    
+    args = parser.parse_args()
     
     if not args.command:
         parser.print_help()
         return 1
+    
+    if args.command == "daemon":
+        if not args.daemon_command:
+            daemon_parser.print_help()
+            return 1
+        return _daemon_command(args)
+    
+    status = _forward_to_daemon(args)
+    if status is not None:
+        return status
+    
+    config = get_config()
+    model_manager = None
+    if _command_path(args) not in CONFIG_ONLY_COMMANDS:
+        from .model_manager import ModelManager
+        model_manager = ModelManager(config)
         
     if args.command == "run":
         if not args.model:
@@ -53,14 +286,23 @@ def main():
             return 1
             
         if args.interactive:
+            from .utils import interactive_mode
             interactive_mode(model_manager, args.model, args.remote)
         elif args.prompt:
-            response = model_manager.run_model(
-                args.model, 
-                args.prompt, 
-                remote=args.remote,
-                stream=not args.no_stream
-            )
+            try:
+                response = model_manager.run_model(
+                    args.model, 
+                    args.prompt, 
+                    remote=args.remote,
+                    stream=not args.no_stream,
+                    options=_sampling_options(args),
+                    use_cache=_use_cache(args),
+                    refresh=args.refresh,
+                    hedge=args.hedge
+                )
+            except (RollamaError, ValueError) as e:
+                print(f"Error: {e}", file=sys.stderr)
+                return 1
             
             if not args.no_stream:
                 # For streaming mode, run_model will handle printing
@@ -72,20 +314,107 @@ def main():
             run_parser.print_help()
             return 1
             
+    elif args.command == "warm":
+        if args.pin:
+            config.pin_model(args.model)
+            print(f"Pinned '{args.model}' for sessions")
+        elif args.unpin:
+            config.unpin_model(args.model)
+            print(f"Unpinned '{args.model}'")
+            return 0
+        
+        keep_alive = args.keep_alive
+        if keep_alive is not None and keep_alive.lstrip("-").isdigit():
+            # Ollama reads a bare number as seconds
+            keep_alive = int(keep_alive)
+        try:
+            elapsed = model_manager.warm_up(args.model, remote=args.remote, keep_alive=keep_alive)
+        except (RollamaError, ValueError) as e:
+            print(f"Error: {e}")
+            return 1
+        print(f"Loaded {args.model} on {args.remote or 'default server'} in {elapsed:.1f}s")
+        
+    elif args.command == "batch":
+        from .batch import BatchRunner
+        checkpoint = args.checkpoint or (f"{args.output}.checkpoint" if args.output else None)
+        runner = BatchRunner(
+            model_manager,
+            model=args.model,
+            remotes=args.remote,
+            concurrency=args.concurrency,
+            ordered=args.ordered,
+            checkpoint=checkpoint,
+            options=_sampling_options(args),
+            use_cache=_use_cache(args)
+        )
+        
+        source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+        # Resumed runs append to the results already written
+        output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+        started = time.monotonic()
+        try:
+            summary = runner.run(source, output)
+        except KeyboardInterrupt:
+            print("\nInterrupted; rerun the same command to resume", file=sys.stderr)
+            return 130
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if output is not sys.stdout:
+                output.close()
+        
+        print(f"Completed {summary['completed']} prompts in {time.monotonic() - started:.1f}s "
+              f"({summary['failed']} failed, {summary['skipped']} already done, {summary['invalid']} invalid)",
+              file=sys.stderr)
+        return 1 if summary["failed"] else 0
+            
+    elif args.command == "tokens":
+        if args.file:
+            with open(args.file, "r", encoding="utf-8") as f:
+                text = f.read()
+        elif args.prompt is not None:
+            text = args.prompt
+        else:
+            text = sys.stdin.read()
+        model = args.model or config.get_default_model()
+        options = {"num_ctx": args.num_ctx} if args.num_ctx else None
+        counter = model_manager.get_token_counter(model)
+        tokens = counter.count(text)
+        budget = model_manager.prompt_budget(options)
+        kind = "exact" if counter.exact else "estimated"
+        print(f"{tokens} tokens ({kind}); {budget} available for the prompt in a "
+              f"{model_manager.context_window(options)}-token context window")
+        return 1 if tokens > budget else 0
+            
     elif args.command == "list":
-        models = model_manager.list_models(remote=args.remote)
+        models = model_manager.list_models(remote=args.remote, refresh=args.refresh)
         for model in models:
             print(model)
             
     elif args.command == "remote":
         if args.remote_command == "add":
-            config.add_remote(args.name, args.url, args.api_key)
+            config.add_remote(args.name, args.url, args.api_key, pool_size=args.pool_size,
+                              compress=args.compress, compress_threshold=args.compress_threshold)
+            if args.max_concurrency or args.rps or args.tps:
+                config.set_remote_limits(args.name, args.max_concurrency, args.rps, args.tps)
             print(f"Added remote server '{args.name}'")
             
             if args.default:
                 config.set_default_remote(args.name)
                 print(f"Set '{args.name}' as default remote server")
                 
+        elif args.remote_command == "limit":
+            try:
+                config.set_remote_limits(args.name, args.max_concurrency, args.rps, args.tps)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return 1
+            remote = config.get_remote(args.name)
+            print(f"Limits for '{args.name}':")
+            print(f"  max concurrency: {remote.get('max_concurrency') or 'unlimited'}")
+            print(f"  requests/second: {remote.get('requests_per_second') or 'unlimited'}")
+            print(f"  tokens/second: {remote.get('tokens_per_second') or 'unlimited'}")
+                
         elif args.remote_command == "remove":
             config.remove_remote(args.name)
             print(f"Removed remote server '{args.name}'")
@@ -101,14 +430,76 @@ def main():
                     print(f"  {name}: {url}{is_default}")
             else:
                 print("No remote servers configured")
+            
+            groups = config.list_remote_groups()
+            if groups:
+                print("Remote groups:")
+                for name, members in groups.items():
+                    is_default = " (default)" if name == config.config.get("default_remote") else ""
+                    print(f"  {name}: {', '.join(members)}{is_default}")
                 
         elif args.remote_command == "default":
             config.set_default_remote(args.name)
             print(f"Set '{args.name}' as default remote server")
             
+        elif args.remote_command == "group":
+            if args.group_command == "add":
+                try:
+                    config.add_remote_group(args.name, args.members, health_interval=args.health_interval,
+                                            hedge=args.hedge)
+                except ValueError as e:
+                    print(f"Error: {str(e)}")
+                    return 1
+                print(f"Added remote group '{args.name}' ({', '.join(args.members)})")
+                
+                if args.default:
+                    config.set_default_remote(args.name)
+                    print(f"Set '{args.name}' as default remote server")
+                    
+            elif args.group_command == "remove":
+                config.remove_remote_group(args.name)
+                print(f"Removed remote group '{args.name}'")
+                
+            elif args.group_command == "list":
+                groups = config.list_remote_groups()
+                if groups:
+                    for name, members in groups.items():
+                        print(f"  {name}: {', '.join(members)}")
+                else:
+                    print("No remote groups configured")
+                    
+            elif args.group_command == "status":
+                group = model_manager.get_remote_group(args.name)
+                if not group:
+                    print(f"Error: Remote group '{args.name}' not found")
+                    return 1
+                for state in group.members:
+                    group.probe(state)
+                for member in group.status():
+                    health = "healthy" if member["healthy"] else f"unhealthy ({member['error']})"
+                    print(f"  {member['name']}: {member['url']} - {health}")
+                    
+            else:
+                group_parser.print_help()
+                return 1
+            
         else:
             remote_parser.print_help()
             return 1
+            
+    elif args.command == "cache":
+        cache = model_manager.get_cache()
+        if cache is None:
+            print("Response cache is disabled")
+        elif args.cache_command == "info":
+            stats = cache.stats()
+            print(f"Cache directory: {stats['path']}")
+            print(f"Entries: {stats['entries']} ({stats['size'] / (1024 * 1024):.1f} MB)")
+        elif args.cache_command == "clear":
+            print(f"Removed {cache.clear()} cached responses")
+        else:
+            cache_parser.print_help()
+            return 1
     
     return 0
 
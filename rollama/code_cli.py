@@ -11,10 +11,12 @@ def main():
     # Model and remote options
     parser.add_argument("--model", "-m", help="Model to use (defaults to config default_model)")
     parser.add_argument("--remote", "-r", help="Remote server name to use")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
     
     args = parser.parse_args()
     
     code_manager = CodeManager()
+    code_manager.use_cache = False if args.no_cache else None
     
     # Set model in config if specified
     if args.model:
@@ -24,7 +26,7 @@ def main():
     if args.remote:
         if args.remote.lower() in ("none", "local"):
             code_manager.config.config["default_remote"] = None
-        elif code_manager.config.get_remote(args.remote):
+        elif code_manager.config.get_remote(args.remote) or code_manager.config.get_remote_group(args.remote):
             code_manager.config.set_default_remote(args.remote)
         else:
             print(f"Error: Remote server '{args.remote}' not found")
@@ -35,11 +37,12 @@ def main():
         help_text = """
         Rollama Code - Code Workspace Manager with AI capabilities
         
-        Usage: rollama-code [--model MODEL] [--remote REMOTE]
+        Usage: rollama-code [--model MODEL] [--remote REMOTE] [--no-cache]
         
         Optional Arguments:
         --model, -m MODEL    Model to use (defaults to config default_model)
         --remote, -r REMOTE  Remote server to use (use "local" for local Ollama)
+        --no-cache           Always generate fresh responses
         
         Available Commands:
         workspace
@@ -180,29 +183,15 @@ def main():
                 file_path = args[1]
                 description = " ".join(args[2:])
                 
-                # Read current content to provide context
-                try:
-                    current_content = code_manager.read_file(file_path)
-                    ai_prompt = f"Edit the following file ({file_path}) according to this description: {description}\n\nCurrent content:\n{current_content}"
-                except:
-                    ai_prompt = f"Edit file {file_path} according to this description: {description}"
-                
-                handle_ai_command(ai_prompt)
+                # The file goes in the prompt whole, with outlines of the files around it
+                ai_prompt = f"Edit file {file_path} according to this description: {description}"
+                handle_ai_command(ai_prompt, focus=[file_path])
             elif cmd == "analyze":
                 path = args[1] if len(args) > 1 else "."
-                files = code_manager.list_files(path)
-                file_contents = []
-                
-                for file in files:
-                    try:
-                        content = code_manager.read_file(file)
-                        file_contents.append(f"\n=== {file} ===\n{content}")
-                    except:
-                        continue
-                
-                if file_contents:
-                    ai_prompt = f"Analyze the following code and suggest improvements:\n{''.join(file_contents)}"
-                    handle_ai_command(ai_prompt)
+                if code_manager.indexed_files(path, text_only=True):
+                    # Reviewed in parts, concurrently, with the findings merged at the end
+                    print("\nAnalyzing code with AI assistant...")
+                    code_manager.analyze(path)
                 else:
                     print("No files found to analyze")
             else:
@@ -210,11 +199,11 @@ def main():
         except Exception as e:
             print(f"Error: {str(e)}")
 
-    def handle_ai_command(command):
+    def handle_ai_command(command, path=".", focus=None):
         """Handle natural language commands using AI"""
         try:
             print("\nProcessing request with AI assistant...")
-            response = code_manager.execute_ai_command(command)
+            response = code_manager.execute_ai_command(command, path=path, focus=focus)
             print("\nAI Assistant Response:")
             print("----------------------")
             print(response)
@@ -268,6 +257,10 @@ def main():
             except Exception as e:
                 print(f"Error: {str(e)}")
 
+    # Load the model while the user reads the help text
+    model_manager = code_manager.model_manager
+    model_manager.start_session(code_manager.config.get_default_model())
+    
     # Run in interactive mode
     try:
         interactive_mode()
@@ -276,6 +269,8 @@ def main():
     except Exception as e:
         print(f"Error: {str(e)}")
         return 1
+    finally:
+        model_manager.end_session()
         
     return 0
 
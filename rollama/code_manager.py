@@ -62,16 +62,41 @@ except ImportError:
         def __str__(self):
             return self.path
 
-from .config import Config
+from .analysis import WorkspaceAnalyzer
+from .config import get_config
+from .context_builder import ContextBuilder
+from .file_ops import FileOperationParser, first_code_block
 from .model_manager import ModelManager
+from .patching import PatchError, apply_patch
+from .workspace_index import WorkspaceIndex
+
+# Asks for a whole file when a patch to it could not be applied
+REWRITE_PROMPT = """This change to {path} could not be applied automatically:
+
+{patch}
+Current content of {path}:
+```
+{content}```
+
+Reply with the complete new content of {path}, with the change made, in a single fenced code block and nothing else.
+"""
+
+
+def _print_progress(message):
+    print(message, file=sys.stderr, flush=True)
+
 
 class CodeManager:
     def __init__(self):
         self.workspace_dir = Path(os.path.expanduser("~")) / ".rollama" / "code_workspaces"
         self.workspace_dir.mkdir(parents=True, exist_ok=True)
         self.current_workspace = None
-        self.config = Config()
+        # None caches deterministic requests only (see ModelManager.run_model)
+        self.use_cache = None
+        self.config = get_config()
         self.model_manager = ModelManager(self.config)
+        self._index = None
+        self._context_builder = None
         self._load_workspace_state()
 
     def _load_workspace_state(self):
@@ -136,22 +161,74 @@ class CodeManager:
         self._save_workspace_state()
         return "Deleted workspace: {}".format(name)
 
-    def list_files(self, path="."):
-        """List files in the current workspace"""
+    @property
+    def index(self):
+        """WorkspaceIndex of the current workspace, refreshed if it may be stale"""
         if not self.current_workspace:
             raise ValueError("No workspace selected")
+        if self._index is None or self._index.root != self.current_workspace:
+            self._index = WorkspaceIndex(self.current_workspace)
+        self._index.refresh()
+        return self._index
+
+    def _reindex(self, *paths):
+        """Update the index entries of paths this manager just changed"""
+        if self._index is not None and self._index.root == self.current_workspace:
+            self._index.update(*paths)
+
+    def indexed_files(self, path=".", text_only=False):
+        """
+        Files under a path in the current workspace, at any depth
         
-        target_path = self.current_workspace / path
-        if not target_path.exists():
+        Args:
+            path (str, optional): Workspace-relative directory, the root by default
+            text_only (bool, optional): Leave out binary files
+            
+        Returns:
+            list: Sorted workspace-relative paths
+        """
+        index = self.index
+        if not index.exists(path):
             raise ValueError("Path '{}' does not exist".format(path))
+        return index.paths(path, text_only=text_only)
+
+    def build_context(self, query, max_tokens, path=".", counter=None, focus=None):
+        """
+        Workspace files relevant to a request, packed into a token budget
+        
+        Args:
+            query (str): The user's request
+            max_tokens (int): Token budget for the context
+            path (str, optional): Only consider files under this directory
+            counter (optional): Token counter, the default model's by default
+            focus (list, optional): Files the request is about, sent whole while
+                the others are outlined; by default those the request names
             
-        files = []
-        try:
-            for item in target_path.iterdir():
-                item_type = "📁 " if item.is_dir() else "📄 "
-                files.append("{}{}".format(item_type, item.relative_to(self.current_workspace)))
-        except Exception as e:
-            raise ValueError("Error listing files: {}".format(str(e)))
+        Returns:
+            str: Context text, see ContextBuilder.build
+        """
+        index = self.index
+        if not index.exists(path):
+            raise ValueError("Path '{}' does not exist".format(path))
+        if self._context_builder is None or self._context_builder.index is not index:
+            # Keeps its word counts between requests
+            self._context_builder = ContextBuilder(index)
+        self._context_builder.counter = counter or self.model_manager.get_token_counter(
+            self.config.get_default_model()
+        )
+        return self._context_builder.build(query, max_tokens, path, focus)
+
+    def list_files(self, path=".", recursive=False):
+        """List files in the current workspace"""
+        index = self.index
+        if not index.exists(path):
+            raise ValueError("Path '{}' does not exist".format(path))
+            
+        if recursive or not index.is_dir(path):
+            files = ["📄 {}".format(item) for item in index.paths(path)]
+        else:
+            dirs, names = index.children(path)
+            files = ["📁 {}".format(item) for item in dirs] + ["📄 {}".format(item) for item in names]
             
         return sorted(files) if files else ["Directory is empty"]
 
@@ -166,6 +243,7 @@ class CodeManager:
             
         file_path.parent.mkdir(parents=True, exist_ok=True)
         file_path.write_text(content)
+        self._reindex(path)
         return "Created file: {}".format(path)
 
     def edit_file(self, path, content):
@@ -178,8 +256,24 @@ class CodeManager:
             raise ValueError("File '{}' does not exist".format(path))
             
         file_path.write_text(content)
+        self._reindex(path)
         return "Updated file: {}".format(path)
 
+    def patch_file(self, path, patch):
+        """Apply search/replace blocks or a unified diff to a file in the current workspace"""
+        if not self.current_workspace:
+            raise ValueError("No workspace selected")
+            
+        file_path = self.current_workspace / path
+        if not file_path.exists():
+            # Diffs against /dev/null create files
+            self.create_file(path, apply_patch("", patch))
+            return "Created file: {}".format(path)
+            
+        file_path.write_text(apply_patch(file_path.read_text(), patch))
+        self._reindex(path)
+        return "Patched file: {}".format(path)
+
     def read_file(self, path):
         """Read a file from the current workspace"""
         if not self.current_workspace:
@@ -204,6 +298,7 @@ class CodeManager:
             shutil.rmtree(str(file_path))
         else:
             file_path.unlink()
+        self._reindex(path)
         return "Deleted: {}".format(path)
 
     def create_directory(self, path):
@@ -216,6 +311,7 @@ class CodeManager:
             raise ValueError("Directory '{}' already exists".format(path))
             
         dir_path.mkdir(parents=True)
+        self._reindex(path)
         return "Created directory: {}".format(path)
 
     def rename(self, old_path, new_path):
@@ -223,6 +319,7 @@ class CodeManager:
         if not self.current_workspace:
             raise ValueError("No workspace selected")
             
+        old_name, new_name = old_path, new_path
         old_path = self.current_workspace / old_path
         new_path = self.current_workspace / new_path
         
@@ -232,27 +329,150 @@ class CodeManager:
             raise ValueError("Path '{}' already exists".format(new_path))
             
         old_path.rename(new_path)
+        self._reindex(old_name, new_name)
         return "Renamed: {} -> {}".format(old_path.name, new_path.name)
 
-    def execute_ai_command(self, prompt):
-        """Execute an AI command using the current model"""
+    def execute_ai_command(self, prompt, progress=None, path=".", focus=None):
+        """
+        Execute an AI command using the current model
+        
+        Files are written as soon as their block in the streamed reply is
+        complete, while the rest of the reply is still being generated.
+        
+        Args:
+            prompt (str): What the user asked for
+            progress (callable, optional): Called with a message for each file
+                operation; by default they are printed to stderr
+            path (str, optional): Directory whose files the context is drawn from
+            focus (list, optional): Files to send whole, with the others outlined
+        
+        Returns:
+            str: The model's full response
+        """
+        model, workspace_context = self._workspace_prompt(prompt, path, focus)
+        self.model_manager.check_prompt(model, workspace_context)
+        
+        # The parser gets the pieces exactly as the model produced them;
+        # showing them is separate
+        pieces = []
+        sys.stdout.write("\n")
+        for piece in self.apply_ai_stream(
+                self.model_manager.run_code_model(workspace_context, split_words=False), progress):
+            pieces.append(piece)
+            sys.stdout.write(piece)
+            sys.stdout.flush()
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+        response = "".join(pieces)
+        
+        # Execute any commands mentioned in the response that require setup
+        self._execute_setup_commands(response)
+        
+        return response
+
+    def analyze(self, path=".", progress=None):
+        """
+        Review the files under a path and suggest improvements
+        
+        Large workspaces are reviewed in parts, concurrently across the
+        remotes in the 'analysis' settings (the default remote otherwise),
+        and the findings merged; the report is streamed to stdout.
+        
+        Args:
+            path (str, optional): Workspace-relative directory, the root by default
+            progress (callable, optional): Called with a message as each part is
+                reviewed; by default they are printed to stderr
+        
+        Returns:
+            str: The report
+        """
+        index = self.index
+        if not index.exists(path):
+            raise ValueError("Path '{}' does not exist".format(path))
+        settings = self.config.get_analysis_settings()
+        analyzer = WorkspaceAnalyzer(self.model_manager, index, remotes=settings.get("remotes"),
+                                     concurrency=settings.get("concurrency"), use_cache=self.use_cache)
+        return analyzer.run(path, progress or _print_progress)
+
+    def stream_ai_command(self, prompt, progress=None, path=".", focus=None):
+        """
+        Execute an AI command through ModelManager.run_code_model
+        
+        Like execute_ai_command, but hands the reply to the caller as it
+        streams instead of printing it.
+        
+        Args:
+            prompt (str): What the user asked for
+            progress (callable, optional): Called with a message for each file operation
+            path (str, optional): Directory whose files the context is drawn from
+            focus (list, optional): Files to send whole, with the others outlined
+        
+        Yields:
+            str: Pieces of the model's response
+        """
+        _, workspace_context = self._workspace_prompt(prompt, path, focus)
+        pieces = []
+        for piece in self.apply_ai_stream(
+                self.model_manager.run_code_model(workspace_context, split_words=False), progress):
+            pieces.append(piece)
+            yield piece
+        self._execute_setup_commands(''.join(pieces))
+
+    def apply_ai_stream(self, pieces, progress=None):
+        """
+        Apply the file operations in streamed model output as each one completes
+        
+        Args:
+            pieces (iterable): Text pieces of the response, e.g. from
+                ModelManager.run_code_model(prompt, split_words=False)
+            progress (callable, optional): Called with a message for each file operation
+        
+        Yields:
+            str: The pieces, passed through once their operations are applied
+        """
+        parser = FileOperationParser()
+        failed_patches = []
+        for piece in pieces:
+            self._apply_file_operations(parser.feed(piece), progress, failed_patches)
+            yield piece
+        self._apply_file_operations(parser.close(), progress, failed_patches)
+        self._rewrite_files(failed_patches, progress)
+
+    def _workspace_prompt(self, prompt, path=".", focus=None):
+        """The default model and the prompt with workspace context for an AI command"""
         if not self.current_workspace:
             raise ValueError("No workspace selected")
             
-        # Add workspace context to the prompt
-        files = self.list_files()
-        workspace_context = f"""
+        model = self.config.get_default_model()
+        counter = self.model_manager.get_token_counter(model)
+        
+        # The workspace's files get what the rest of the prompt leaves of the budget
+        available = self.model_manager.prompt_budget() - counter.count(self._build_ai_prompt(prompt, ""))
+        limit = self.config.get_context_tokens()
+        max_tokens = max(min(available, limit) if limit else available, 0)
+        
+        context = self.build_context(prompt, max_tokens, path, counter, focus)
+        return model, self._build_ai_prompt(prompt, context or "The workspace is empty")
+
+    def _build_ai_prompt(self, prompt, file_listing):
+        """Prompt for execute_ai_command: the workspace's files, the request and the file operation markers"""
+        return f"""
 Current workspace: {self.current_workspace.name}
-Files in workspace:
-{chr(10).join(files)}
+Relevant workspace files:
+{file_listing}
 
 User request: {prompt}
 
 You are a coding assistant. The user wants you to help with their code. You can:
 1. Generate new code files using 'CREATE FILE: filename' followed by the content
-2. Edit existing files using 'EDIT FILE: filename' followed by the new content
-3. Create folders using 'CREATE DIR: dirname'
-4. Delete files using 'DELETE FILE: filename'
+2. Change part of an existing file using 'PATCH FILE: filename' followed by
+   SEARCH/REPLACE blocks (or a unified diff); each SEARCH section must copy the
+   existing lines exactly, with a few lines of context
+3. Rewrite an existing file using 'EDIT FILE: filename' followed by the new content
+4. Create folders using 'CREATE DIR: dirname'
+5. Delete files using 'DELETE FILE: filename'
+
+Prefer PATCH FILE to EDIT FILE for existing files: only the changed lines are written.
 
 Current workspace files are shown above. When generating or editing code:
 - Include proper imports
@@ -274,98 +494,93 @@ from example import hello
 class TestExample(unittest.TestCase):
     def test_hello(self):
         self.assertEqual(hello(), "Hello world")
+
+PATCH FILE: example.py
+<<<<<<< SEARCH
+def hello():
+    return "Hello world"
+=======
+def hello(name="world"):
+    return f"Hello {{name}}"
+>>>>>>> REPLACE
 """
+
+    def _process_ai_response(self, response, progress=None):
+        """Process file operations mentioned in a complete AI response"""
+        parser = FileOperationParser()
+        failed_patches = []
+        self._apply_file_operations(parser.feed(response) + parser.close(), progress, failed_patches)
+        self._rewrite_files(failed_patches, progress)
+
+    def _apply_file_operations(self, operations, progress=None, failed_patches=None):
+        """
+        Carry out operations from FileOperationParser, reporting each one
         
-        model = self.config.get_default_model()
-        response = self.model_manager.run_model(model, workspace_context)
-        
-        # Process any file operations in the response
-        self._process_ai_response(response)
-        
-        # Execute any commands mentioned in the response that require setup
-        self._execute_setup_commands(response)
-        
-        return response
+        Args:
+            operations (list): Operations to apply
+            progress (callable, optional): Called with a message per operation, stderr by default
+            failed_patches (list, optional): Collects patch operations that did not apply,
+                to be rewritten with _rewrite_files once the reply is complete
+        """
+        progress = progress or _print_progress
+        for operation in operations:
+            try:
+                progress(self._apply_file_operation(operation))
+            except PatchError as e:
+                if failed_patches is None:
+                    progress(f"Error processing file operation: {str(e)}")
+                    continue
+                progress(f"Patch for {operation['path']} did not apply ({str(e)}); "
+                         f"asking for the whole file")
+                failed_patches.append(operation)
+            except Exception as e:
+                progress(f"Error processing file operation: {str(e)}")
 
-    def _process_ai_response(self, response):
-        """Process file operations mentioned in the AI response"""
-        # Look for special markers and markdown code blocks
-        lines = response.split('\n')
-        current_file = None
-        content_buffer = []
-        in_code_block = False
-        current_markdown_file = None
-
-        for line in lines:
-            # Handle explicit markers
-            if line.startswith('CREATE FILE:') or line.startswith('EDIT FILE:'):
-                # Flush any previous file operation
-                if current_file and content_buffer:
-                    try:
-                        # If it's an edit operation, ensure the file exists
-                        if current_file.startswith('EDIT FILE:'):
-                            file_path = current_file.split(':', 1)[1].strip()
-                            if not Path(self.current_workspace / file_path).exists():
-                                raise ValueError(f"File not found: {file_path}")
-                            self.edit_file(file_path, '\n'.join(content_buffer))
-                        else:
-                            file_path = current_file.split(':', 1)[1].strip()
-                            self.create_file(file_path, '\n'.join(content_buffer))
-                    except Exception as e:
-                        print(f"Error processing file operation: {str(e)}")
-                    content_buffer = []
-                current_file = line
-            elif line.startswith('DELETE FILE:'):
-                path = line.split(':', 1)[1].strip()
-                self.delete_file(path)
-                current_file = None
-            elif line.startswith('CREATE DIR:'):
-                path = line.split(':', 1)[1].strip()
-                self.create_directory(path)
-                current_file = None
-            # Handle markdown code blocks
-            elif line.startswith('```'):
-                if not in_code_block:
-                    # Starting a code block
-                    in_code_block = True
-                    # Look for language and filename in format ```python/filepath: filename.py
-                    if '/' in line and 'filepath:' in line:
-                        parts = line[3:].strip().split('/')
-                        if len(parts) >= 2:
-                            current_markdown_file = parts[1].replace('filepath:', '').strip()
-                    content_buffer = []
-                else:
-                    # Ending a code block
-                    in_code_block = False
-                    if current_markdown_file and content_buffer:
-                        try:
-                            # Remove the first line if it contains filepath marker
-                            if content_buffer and 'filepath:' in content_buffer[0]:
-                                content_buffer = content_buffer[1:]
-                            # Create or edit the file
-                            if Path(self.current_workspace / current_markdown_file).exists():
-                                self.edit_file(current_markdown_file, '\n'.join(content_buffer))
-                            else:
-                                self.create_file(current_markdown_file, '\n'.join(content_buffer))
-                        except Exception as e:
-                            print(f"Error processing markdown code block: {str(e)}")
-                        current_markdown_file = None
-                        content_buffer = []
-            # Collect content inside code blocks or after file markers
-            elif (current_file and not line.startswith('```')) or (in_code_block and current_markdown_file):
-                content_buffer.append(line)
-
-        # Flush any remaining file operation
-        if current_file and content_buffer:
+    def _rewrite_files(self, operations, progress=None):
+        """Ask the model for the whole of each file whose patch did not apply"""
+        progress = progress or _print_progress
+        for operation in operations:
             try:
-                if current_file.startswith('EDIT FILE:'):
-                    file_path = current_file.split(':', 1)[1].strip()
-                    self.edit_file(file_path, '\n'.join(content_buffer))
-                else:
-                    file_path = current_file.split(':', 1)[1].strip()
-                    self.create_file(file_path, '\n'.join(content_buffer))
+                progress(self._rewrite_file(operation["path"], operation["content"]))
             except Exception as e:
-                print(f"Error processing final file operation: {str(e)}")
+                progress(f"Error rewriting {operation['path']}: {str(e)}")
+
+    def _rewrite_file(self, path, patch):
+        """Rewrite a file in full from the model, applying a patch that did not apply"""
+        file_path = self.current_workspace / path
+        content = file_path.read_text() if file_path.exists() else ""
+        prompt = REWRITE_PROMPT.format(path=path, patch=patch, content=content)
+        self.model_manager.check_prompt(self.config.get_default_model(), prompt)
+        # Collected quietly and exactly as generated; the caller reports the outcome
+        response = "".join(self.model_manager.run_code_model(prompt, split_words=False))
+        new_content = first_code_block(response)
+        if new_content is None:
+            raise ValueError("the model did not reply with the file")
+        if file_path.exists():
+            self.edit_file(path, new_content)
+        else:
+            self.create_file(path, new_content)
+        return "Rewrote file: {}".format(path)
+
+    def _apply_file_operation(self, operation):
+        """Carry out one file operation; returns what was done"""
+        action = operation["action"]
+        path = operation["path"]
+        if action == "create":
+            return self.create_file(path, operation["content"])
+        if action == "edit":
+            return self.edit_file(path, operation["content"])
+        if action == "patch":
+            return self.patch_file(path, operation["content"])
+        if action == "write":
+            if (self.current_workspace / path).exists():
+                return self.edit_file(path, operation["content"])
+            return self.create_file(path, operation["content"])
+        if action == "mkdir":
+            return self.create_directory(path)
+        if action == "delete":
+            return self.delete_file(path)
+        raise ValueError(f"Unknown file operation '{action}'")
 
     def _execute_setup_commands(self, response):
         """Execute any setup commands mentioned in the response"""
@@ -0,0 +1,75 @@
+"""Request body encoding with optional gzip compression.
+
+Large prompts (whole workspaces, attached files) are mostly text and shrink
+several-fold under gzip, which matters when a remote sits behind a slow
+uplink. Compression is opt-in per remote because the server, or a proxy in
+front of it, must accept Content-Encoding: gzip on requests.
+"""
+import gzip
+import json
+import zlib
+
+# Bodies smaller than this are sent as is; compressing them costs more than it saves
+DEFAULT_COMPRESS_THRESHOLD = 32 * 1024
+
+# zlib level 6 is close to maximum ratio on text at a fraction of level 9's cost
+DEFAULT_COMPRESS_LEVEL = 6
+
+
+def compress_threshold(remote):
+    """
+    Body size above which requests to a remote are gzipped
+
+    Args:
+        remote (dict): Remote server details ('compress', 'compress_threshold')
+
+    Returns:
+        int or None: Threshold in bytes, or None if compression is off
+    """
+    if not remote or not remote.get("compress"):
+        return None
+    threshold = remote.get("compress_threshold")
+    return DEFAULT_COMPRESS_THRESHOLD if threshold is None else int(threshold)
+
+
+def encode_json(payload, threshold=None):
+    """
+    Serialize a JSON request body, gzipping it if it is large enough
+
+    Args:
+        payload (object): Body to send
+        threshold (int, optional): Compress bodies of at least this many bytes;
+            None disables compression
+
+    Returns:
+        tuple: (body bytes, headers dict with Content-Type and any Content-Encoding)
+    """
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if threshold is not None and len(body) >= threshold:
+        body = gzip.compress(body, compresslevel=DEFAULT_COMPRESS_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def decode_body(data, encoding):
+    """
+    Undo a response's Content-Encoding
+
+    Args:
+        data (bytes): Response body as received
+        encoding (str): Content-Encoding header value, possibly empty
+
+    Returns:
+        bytes: Decoded body
+    """
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return gzip.decompress(data)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(data)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header
+            return zlib.decompress(data, -zlib.MAX_WBITS)
+    return data
@@ -1,29 +1,158 @@
 import os
 import json
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:
+    # Windows: writes stay atomic, they are just not serialized across processes
+    fcntl = None
+
+# Top-level settings that act as defaults for every remote
+REMOTE_DEFAULT_KEYS = ("pool_size", "connect_timeout", "read_timeout", "generation_timeout", "retries")
+
+
 class Config:
-    def __init__(self):
-        self.config_dir = Path.home() / ".rollama"
+    """
+    Settings stored in ~/.rollama/config.json.
+    
+    Several processes (the CLI, the GUI, rollama-code, rollamad) may use the
+    file at once. Writes go to a temporary file that is renamed over the
+    original, so readers never see half a file. Changes are made under an
+    advisory lock, starting from the latest copy on disk, so concurrent
+    writers do not undo each other. Reads use the copy in memory, re-parsed
+    only when the file's modification time shows another process changed it.
+    """
+    
+    def __init__(self, config_dir=None):
+        """
+        Load the configuration, creating it with defaults if needed
+        
+        Args:
+            config_dir (str or Path, optional): Directory holding config.json, ~/.rollama by default
+        """
+        self.config_dir = Path(config_dir) if config_dir else Path.home() / ".rollama"
         self.config_file = self.config_dir / "config.json"
+        self.lock_file = self.config_dir / "config.json.lock"
+        self._lock = threading.RLock()
+        self._data = None
+        self._signature = None
         self._ensure_config_exists()
-        self.config = self._load_config()
+        self._reload()
+    
+    @property
+    def config(self):
+        """The settings, re-read first if another process has saved a change"""
+        self._reload()
+        return self._data
+    
+    @config.setter
+    def config(self, value):
+        self._data = value
+    
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        # The inode changes on every atomic replace, even within the mtime's resolution
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
+    def _reload(self):
+        """Re-read the file if it changed since it was last read or written"""
+        signature = self._file_signature()
+        if self._data is not None and signature == self._signature:
+            return
+        with self._lock:
+            try:
+                data = self._load_config()
+            except (OSError, ValueError):
+                if self._data is None:
+                    raise
+                # Keep the copy we have; the file may be from a version that wrote in place
+                return
+            self._data = data
+            self._signature = signature
+    
+    @contextmanager
+    def _file_lock(self):
+        """Hold the advisory lock that serializes writers across threads and processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_file, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    @contextmanager
+    def _update(self):
+        """
+        Change settings and save them
+        
+        Yields the latest settings under the file lock; they are written back
+        when the block exits without an exception.
+        """
+        with self._file_lock():
+            self._reload()
+            yield self._data
+            self._write(self._data)
+    
+    def _write(self, data):
+        """Replace the file atomically; the caller holds the file lock"""
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.config_dir), prefix=".config.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._signature = self._file_signature()
     
     def _ensure_config_exists(self):
         """Create config directory and files if they don't exist"""
-        self.config_dir.mkdir(exist_ok=True)
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        if self.config_file.exists():
+            return
         
-        if not self.config_file.exists():
+        with self._file_lock():
+            # Another process may have created it while we waited for the lock
+            if self.config_file.exists():
+                return
             default_config = {
                 "remotes": {},
                 "default_remote": None,
                 "default_model": "llama2",
                 "font_family": "Courier",
-                "font_size": 10
+                "font_size": 10,
+                "pool_size": 10,
+                "connect_timeout": 10,
+                "read_timeout": 300,
+                "retries": 2,
+                "preconnect": True,
+                "catalog_ttl": 300,
+                "auto_warm": True,
+                "pinned_models": [],
+                "history_tokens": 4096,
+                "cache": {
+                    "enabled": True,
+                    "max_size_mb": 256,
+                    "max_age_days": 7
+                }
             }
-            
-            with open(self.config_file, "w") as f:
-                json.dump(default_config, f, indent=2)
+            self._write(default_config)
     
     def _load_config(self):
         """Load the configuration from file"""
@@ -31,26 +160,92 @@ class Config:
             return json.load(f)
     
     def _save_config(self):
-        """Save the configuration to file"""
-        with open(self.config_file, "w") as f:
-            json.dump(self.config, f, indent=2)
+        """Save the in-memory configuration to file as it stands"""
+        with self._file_lock():
+            self._write(self._data)
     
-    def add_remote(self, name, url, api_key=None):
+    def add_remote(self, name, url, api_key=None, pool_size=None, compress=False, compress_threshold=None):
         """Add a remote server to the configuration"""
-        self.config.setdefault("remotes", {})
-        self.config["remotes"][name] = {
+        remote = {
             "url": url,
             "api_key": api_key
         }
-        self._save_config()
+        if pool_size:
+            remote["pool_size"] = int(pool_size)
+        if compress:
+            remote["compress"] = True
+            if compress_threshold is not None:
+                remote["compress_threshold"] = int(compress_threshold)
+        with self._update() as config:
+            config.setdefault("remotes", {})[name] = remote
+    
+    def set_remote_limits(self, name, max_concurrency=None, requests_per_second=None, tokens_per_second=None):
+        """Set a remote server's concurrency and rate limits; 0 removes a limit, None leaves it unchanged"""
+        limits = {
+            "max_concurrency": max_concurrency,
+            "requests_per_second": requests_per_second,
+            "tokens_per_second": tokens_per_second,
+        }
+        with self._update() as config:
+            remote = config.get("remotes", {}).get(name)
+            if remote is None:
+                raise ValueError(f"Unknown remote server: {name}")
+            for key, value in limits.items():
+                if value is None:
+                    continue
+                if value:
+                    remote[key] = value
+                else:
+                    remote.pop(key, None)
     
     def remove_remote(self, name):
         """Remove a remote server from the configuration"""
-        if name in self.config.get("remotes", {}):
-            del self.config["remotes"][name]
-            if self.config.get("default_remote") == name:
-                self.config["default_remote"] = None
-            self._save_config()
+        if name not in self.config.get("remotes", {}):
+            return
+        with self._update() as config:
+            config.get("remotes", {}).pop(name, None)
+            if config.get("default_remote") == name:
+                config["default_remote"] = None
+            for group in config.get("remote_groups", {}).values():
+                if name in group.get("members", []):
+                    group["members"].remove(name)
+    
+    def add_remote_group(self, name, members, health_interval=None, hedge=False):
+        """Add a group of remote servers that requests are balanced across"""
+        group = {"members": list(members)}
+        if health_interval:
+            group["health_interval"] = health_interval
+        if hedge:
+            group["hedge"] = {"enabled": True, "percentile": 95}
+        
+        with self._update() as config:
+            unknown = [member for member in members if member not in config.get("remotes", {})]
+            if unknown:
+                raise ValueError(f"Unknown remote server(s): {', '.join(unknown)}")
+            if name in config.get("remotes", {}):
+                raise ValueError(f"A remote server named '{name}' already exists")
+            config.setdefault("remote_groups", {})[name] = group
+    
+    def remove_remote_group(self, name):
+        """Remove a remote group from the configuration"""
+        if name not in self.config.get("remote_groups", {}):
+            return
+        with self._update() as config:
+            config.get("remote_groups", {}).pop(name, None)
+            if config.get("default_remote") == name:
+                config["default_remote"] = None
+    
+    def list_remote_groups(self):
+        """Get a dictionary of remote groups and their member names"""
+        return {name: group.get("members", []) for name, group in self.config.get("remote_groups", {}).items()}
+    
+    def get_remote_group(self, name=None):
+        """Get the settings for a remote group, or None if name is not a group"""
+        if name is None:
+            name = self.config.get("default_remote")
+            if name is None:
+                return None
+        return self.config.get("remote_groups", {}).get(name)
     
     def list_remotes(self):
         """Get a dictionary of remote servers"""
@@ -63,19 +258,120 @@ class Config:
             if name is None:
                 return None
                 
-        return self.config.get("remotes", {}).get(name)
+        remote = self.config.get("remotes", {}).get(name)
+        if remote is None:
+            return None
+        # Global connection settings apply unless the remote overrides them
+        inherited = {
+            key: self.config[key] for key in REMOTE_DEFAULT_KEYS
+            if key not in remote and self.config.get(key) is not None
+        }
+        return dict(remote, **inherited) if inherited else remote
     
     def set_default_remote(self, name):
-        """Set the default remote server"""
-        if name in self.config.get("remotes", {}):
-            self.config["default_remote"] = name
-            self._save_config()
+        """Set the default remote server or remote group"""
+        with self._update() as config:
+            if name in config.get("remotes", {}) or name in config.get("remote_groups", {}):
+                config["default_remote"] = name
     
     def get_default_model(self):
         """Get the default model to use"""
         return self.config.get("default_model", "llama2")
     
+    def get_local_url(self):
+        """URL of the local Ollama daemon, or None to use OLLAMA_HOST/localhost"""
+        return self.config.get("local_url")
+    
+    def get_cache_settings(self):
+        """Response cache settings (enabled, max_size_mb, max_age_days, path)"""
+        return self.config.get("cache", {})
+    
+    def get_preconnect(self):
+        """Whether to open a connection to a remote as soon as it is selected"""
+        return self.config.get("preconnect", True)
+    
+    def get_keep_alive(self):
+        """How long Ollama keeps a model loaded after a request, or None for the server default"""
+        return self.config.get("keep_alive")
+    
+    def get_auto_warm(self):
+        """Whether sessions load their model as soon as they start"""
+        return self.config.get("auto_warm", True)
+    
+    def get_pinned_models(self):
+        """Models kept loaded for as long as a session is open"""
+        return list(self.config.get("pinned_models", []))
+    
+    def pin_model(self, model):
+        """Keep a model loaded during sessions"""
+        with self._update() as config:
+            pinned = config.setdefault("pinned_models", [])
+            if model not in pinned:
+                pinned.append(model)
+    
+    def unpin_model(self, model):
+        """Stop keeping a model loaded during sessions"""
+        with self._update() as config:
+            pinned = config.get("pinned_models", [])
+            if model in pinned:
+                pinned.remove(model)
+    
+    def get_history_tokens(self):
+        """Token budget for interactive chat history before older turns are summarized; 0 for no limit"""
+        return self.config.get("history_tokens", 4096)
+    
+    def get_context_tokens(self):
+        """Most tokens of workspace files in a coding prompt, or None for whatever the prompt budget leaves"""
+        return self.config.get("context_tokens")
+    
+    def get_analysis_settings(self):
+        """Settings for 'code analyze' (remotes, concurrency)"""
+        return self.config.get("analysis", {})
+    
+    def get_num_ctx(self):
+        """Context window in tokens that prompts are checked against, or None for Ollama's default"""
+        return self.config.get("num_ctx")
+    
+    def get_tokenizer_files(self):
+        """Model name to tokenizer.json path, for exact token counts"""
+        return dict(self.config.get("tokenizers", {}))
+    
+    def get_catalog_ttl(self):
+        """Seconds a server's cached model list is used before it is refreshed"""
+        return self.config.get("catalog_ttl", 300)
+    
     def set_default_model(self, model):
         """Set the default model to use"""
-        self.config["default_model"] = model
-        self._save_config()
+        with self._update() as config:
+            config["default_model"] = model
+    
+    def set_font(self, family, size):
+        """Set the GUI terminal font"""
+        with self._update() as config:
+            config["font_family"] = family
+            config["font_size"] = int(size)
+
+
+_configs = {}
+_configs_lock = threading.Lock()
+
+
+def get_config(config_dir=None):
+    """
+    Get the process-wide Config for a directory
+    
+    Components that share one Config read the file once and see each
+    other's changes immediately.
+    
+    Args:
+        config_dir (str or Path, optional): Directory holding config.json, ~/.rollama by default
+        
+    Returns:
+        Config: Shared instance
+    """
+    key = str(Path(config_dir) if config_dir else Path.home() / ".rollama")
+    with _configs_lock:
+        config = _configs.get(key)
+        if config is None:
+            config = _configs[key] = Config(key)
+    return config
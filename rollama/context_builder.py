@@ -0,0 +1,235 @@
+"""Relevance-ranked workspace context for coding prompts.
+
+Rather than a bare file listing or every file in full, a coding prompt gets
+the files that matter to the request: whole where they fit in the token
+budget, as an outline of their definitions (see outline.py) where they do
+not, and by name after that. When the request names its target files, only
+those are sent whole and the files around them are outlined. Files are
+ranked by:
+
+    mentions   - the request names the file or its path
+    names      - words of the request appear in the file's path
+    content    - BM25 over the words in each file
+    recency    - the most recently modified files get a small boost
+
+Small, relevant prompts prefill faster than workspace dumps and give the
+model less to get lost in. Word counts are cached by content hash, so a
+file is only tokenized again after it changes.
+"""
+import math
+import re
+from collections import Counter
+
+from .tokens import HeuristicCounter, trim_text
+
+# Score weights
+MENTION_WEIGHT = 10.0
+NAME_WEIGHT = 3.0
+RECENT_WEIGHT = 2.0
+
+# How many of the most recently modified files get a recency boost
+RECENT_FILES = 10
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Files larger than this are ranked by name only; reading them costs more than it tells
+MAX_SEARCH_BYTES = 512 * 1024
+
+# Identifiers and words; camelCase and snake_case are split into their parts
+_WORDS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+# Words too common in requests to say anything about which file is meant
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "code", "do", "file", "files",
+    "for", "from", "how", "i", "in", "into", "is", "it", "make", "me", "my", "new", "of",
+    "on", "or", "please", "so", "that", "the", "this", "to", "use", "we", "with", "you",
+}
+
+def words(text):
+    """Lowercased words of text for ranking, with stop words and single letters dropped"""
+    return [word for word in (match.lower() for match in _WORDS.findall(text))
+            if len(word) > 1 and word not in STOP_WORDS]
+
+
+class ContextBuilder:
+    """Ranks a workspace's files against a request and packs them into a token budget"""
+
+    def __init__(self, index, counter=None):
+        """
+        Initialize the builder
+
+        Args:
+            index (WorkspaceIndex): Index of the workspace
+            counter (optional): Token counter (see tokens.get_counter), the heuristic by default
+        """
+        self.index = index
+        self.counter = counter or HeuristicCounter()
+        # Content hash -> (word counts, word total)
+        self._documents = {}
+
+    def _read(self, path):
+        try:
+            with open(self.index.root / path, "r", encoding="utf-8", errors="replace") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _document(self, path, entry):
+        """Word counts of a file, cached by content hash"""
+        document = self._documents.get(entry["hash"])
+        if document is None:
+            text = self._read(path) if entry["size"] <= MAX_SEARCH_BYTES else None
+            counts = Counter(words(text)) if text else Counter()
+            document = (counts, sum(counts.values()))
+            self._documents[entry["hash"]] = document
+        return document
+
+    @staticmethod
+    def _mentioned(path, lowered_query):
+        """Whether a request names a file, by path or by a distinctive file name"""
+        name = path.rsplit("/", 1)[-1].lower()
+        return path.lower() in lowered_query or (len(name) > 3 and name in lowered_query)
+
+    def rank(self, query, paths):
+        """
+        Score files by relevance to a request
+
+        Args:
+            query (str): The user's request
+            paths (list): Workspace-relative text files to consider
+
+        Returns:
+            list: (score, path) pairs, best first; files that are neither
+                related to the request nor recently modified score 0
+        """
+        terms = set(words(query))
+        lowered_query = query.lower()
+        entries = {path: self.index.get(path) for path in paths}
+        entries = {path: entry for path, entry in entries.items() if entry}
+        documents = {path: self._document(path, entry) for path, entry in entries.items()} if terms else {}
+
+        # BM25 document frequencies and average length
+        frequency = Counter()
+        for counts, _ in documents.values():
+            frequency.update(term for term in terms if term in counts)
+        average_length = (sum(length for _, length in documents.values()) / len(documents)) if documents else 0
+
+        recent = sorted(entries, key=lambda path: entries[path]["mtime_ns"], reverse=True)[:RECENT_FILES]
+        recency = {path: RECENT_WEIGHT * (1 - position / RECENT_FILES) for position, path in enumerate(recent)}
+
+        scores = []
+        for path in entries:
+            score = 0.0
+            if self._mentioned(path, lowered_query):
+                score += MENTION_WEIGHT
+            score += NAME_WEIGHT * len(terms & set(words(path)))
+
+            if path in documents and average_length:
+                counts, length = documents[path]
+                for term in terms:
+                    count = counts.get(term)
+                    if not count:
+                        continue
+                    idf = math.log(1 + (len(documents) - frequency[term] + 0.5) / (frequency[term] + 0.5))
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    score += idf * count * (BM25_K1 + 1) / (count + norm)
+
+            score += recency.get(path, 0.0)
+            scores.append((score, path))
+        scores.sort(key=lambda item: (-item[0], item[1]))
+
+        if len(self._documents) > 2 * len(entries):
+            # Forget the word counts of contents that have since changed
+            current = {entry["hash"] for entry in entries.values()}
+            self._documents = {key: value for key, value in self._documents.items() if key in current}
+        return scores
+
+    def build(self, query, max_tokens, prefix=".", focus=None):
+        """
+        Workspace context for a request, within a token budget
+
+        Target files are included whole (cut short if they must be). With
+        no targets, the most relevant files are included whole while they
+        fit; the others that matter are outlined, the rest listed by name,
+        and whatever still does not fit is counted.
+
+        Args:
+            query (str): The user's request
+            max_tokens (int): Token budget for the context
+            prefix (str, optional): Only consider files under this directory
+            focus (list, optional): Files the request is about; by default
+                those the request names
+
+        Returns:
+            str: Context text ("" for an empty workspace)
+        """
+        paths = self.index.paths(prefix, text_only=True)
+        text_paths = set(paths)
+        binary = [path for path in self.index.paths(prefix) if path not in text_paths]
+        ranked = self.rank(query, paths)
+        if focus is None:
+            lowered_query = query.lower()
+            focus = [path for path in paths if self._mentioned(path, lowered_query)]
+        else:
+            # A directory stands for the files in it
+            focus = list(dict.fromkeys(
+                match for target in focus for match in self.index.paths(target) if match in text_paths
+            ))
+        targets = set(focus)
+
+        sections = []
+        listed = []
+        used = 0
+        order = [(None, path) for path in focus] + [item for item in ranked if item[1] not in targets]
+        for score, path in order:
+            if path not in targets and score <= 0:
+                listed.append(path)
+                continue
+            section = text = None
+            # Files that can only be outlined are not read when their outline is cached
+            if path in targets or not targets:
+                text = self._read(path)
+            if text is not None:
+                section = f"=== {path} ===\n{text.rstrip()}\n"
+                cost = self.counter.count(section)
+                if path in targets and used + cost > max_tokens:
+                    heading = f"=== {path} (cut short) ===\n"
+                    limit = max_tokens - used - self.counter.count(heading) - 1
+                    section = heading + trim_text(text, limit, self.counter) if limit > 0 else None
+                if section and used + self.counter.count(section) > max_tokens:
+                    section = None
+            if section is None:
+                # As much of the outline as fits in half of what is left,
+                # so one large file cannot crowd out the rest
+                heading = f"=== {path} (outline) ===\n"
+                limit = (max_tokens - used) // 2 - self.counter.count(heading) - 1
+                summary = self.index.outline(path, text) or ""
+                summary = trim_text(summary, limit, self.counter).rstrip() if limit > 0 else ""
+                section = f"{heading}{summary}\n" if summary else None
+            cost = self.counter.count(section) if section else 0
+            if section and used + cost <= max_tokens:
+                sections.append(section)
+                used += cost
+            else:
+                listed.append(path)
+        self.index.save_outlines()
+        listed.extend(binary)
+
+        if listed:
+            heading = "Other files:"
+            # Room is always left to say how many files did not fit
+            note = f"... and {len(listed)} more files"
+            used += self.counter.count(heading) + self.counter.count(note) + 2
+            names = []
+            for path in listed:
+                cost = self.counter.count(path) + 1
+                if used + cost > max_tokens:
+                    names.append(f"... and {len(listed) - len(names)} more files")
+                    break
+                names.append(path)
+                used += cost
+            if used <= max_tokens:
+                sections.append(heading + "\n" + "\n".join(names) + "\n")
+        return "\n".join(sections)
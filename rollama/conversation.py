@@ -0,0 +1,191 @@
+"""Multi-turn chat state for interactive sessions.
+
+Turns are kept as a messages array that only ever grows at the end, so each
+request shares its prefix with the one before and servers with prompt
+caching (Ollama, llama.cpp, vLLM) skip re-reading it. Against the local
+daemon the conversation also keeps Ollama's returned 'context' token state,
+so a turn sends just the new input instead of the whole history.
+
+With a token budget, the oldest turns are folded into a running summary once
+the history outgrows it. The summary is written on a background thread while
+the user reads the reply and types the next message, so prompts stay bounded
+without a turn ever waiting on a full re-read of the history.
+"""
+import threading
+
+from .tokens import MESSAGE_OVERHEAD_TOKENS, HeuristicCounter
+
+# After compacting, the kept turns use at most this share of the budget, so
+# compaction happens every few turns rather than on every one
+COMPACT_TARGET = 0.5
+
+# The latest exchange is never summarized away
+MIN_KEPT_MESSAGES = 2
+
+
+class Conversation:
+    """Messages exchanged so far, plus the local daemon's token state for them"""
+
+    def __init__(self, budget=None, summarize=None, counter=None):
+        """
+        Initialize an empty conversation
+
+        Args:
+            budget (int, optional): Approximate token limit for the history;
+                None or 0 keeps every turn
+            summarize (callable, optional): summarize(summary, messages) returns
+                a new summary folding messages into the previous summary (or None).
+                Without it, turns over budget are simply dropped.
+            counter (optional): Token counter (see tokens.get_counter), the heuristic by default
+        """
+        self.counter = counter or HeuristicCounter()
+        self.turns = []
+        self.turn_tokens = []
+        self.summary = None
+        self.budget = budget
+        self.summarize = summarize
+        # Ollama 'context' covering every message so far, and the
+        # (server_id, model) it was produced by
+        self.context = None
+        self.context_owner = None
+        self._lock = threading.Lock()
+        self._compaction = None
+
+    def __len__(self):
+        return len(self.turns)
+
+    @property
+    def messages(self):
+        """Messages to send: the summary of compacted turns, then the recent turns"""
+        with self._lock:
+            messages = list(self.turns)
+            if self.summary:
+                messages.insert(0, self._summary_message())
+        return messages
+
+    @property
+    def tokens(self):
+        """Approximate tokens the messages take up"""
+        with self._lock:
+            total = sum(self.turn_tokens)
+            if self.summary:
+                total += self._message_tokens(self._summary_message())
+        return total
+
+    def _message_tokens(self, message):
+        return self.counter.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+    def _summary_message(self):
+        return {"role": "system", "content": f"Summary of the conversation so far:\n{self.summary}"}
+
+    def add(self, role, content):
+        """
+        Append a message
+
+        Args:
+            role (str): 'user', 'assistant' or 'system'
+            content (str): Message text
+        """
+        message = {"role": role, "content": content}
+        with self._lock:
+            self.turns.append(message)
+            self.turn_tokens.append(self._message_tokens(message))
+
+    def discard_last(self):
+        """Drop the last message, e.g. a prompt whose reply failed"""
+        with self._lock:
+            if self.turns:
+                self.turns.pop()
+                self.turn_tokens.pop()
+
+    def context_for(self, server_id, model):
+        """
+        Context that continues this conversation on a server, if there is one
+
+        Args:
+            server_id (str): Server the next turn goes to
+            model (str): Model the next turn uses
+
+        Returns:
+            list or None: Token state to send with the next prompt
+        """
+        if self.context_owner != (server_id, model):
+            return None
+        return self.context
+
+    def set_context(self, server_id, model, context):
+        """Record the token state returned for the conversation so far"""
+        self.context = context
+        self.context_owner = (server_id, model) if context else None
+
+    def reset_context(self):
+        """Forget the token state; the next turn resends the messages"""
+        self.context = None
+        self.context_owner = None
+
+    def compact(self):
+        """
+        Start folding the oldest turns into the summary if the history is over budget
+
+        Runs in the background; call wait() before sending the next turn.
+
+        Returns:
+            threading.Thread or None: The compaction, or None if none was needed
+        """
+        if not self.budget or self.tokens <= self.budget:
+            return None
+        if self._compaction is not None and self._compaction.is_alive():
+            return self._compaction
+
+        with self._lock:
+            # Drop the oldest turns until the rest fit well inside the budget
+            kept_tokens = sum(self.turn_tokens)
+            count = 0
+            while (len(self.turns) - count > MIN_KEPT_MESSAGES
+                   and kept_tokens > self.budget * COMPACT_TARGET):
+                kept_tokens -= self.turn_tokens[count]
+                count += 1
+            # Start the kept history on a user turn, as chat templates expect
+            while count < len(self.turns) - 1 and self.turns[count]["role"] != "user":
+                count += 1
+            if count == 0:
+                return None
+            old_turns = self.turns[:count]
+            summary = self.summary
+
+        def run():
+            new_summary = summary
+            if self.summarize:
+                try:
+                    new_summary = self.summarize(summary, old_turns) or summary
+                except Exception:
+                    # Keep the old summary; the turns still go, so the prompt stays bounded
+                    pass
+            with self._lock:
+                # Only appends happen meanwhile, so the compacted turns are still first
+                del self.turns[:count]
+                del self.turn_tokens[:count]
+                self.summary = new_summary
+                # The history's prefix changed, so the server's token state no longer matches
+                self.context = None
+                self.context_owner = None
+
+        self._compaction = threading.Thread(target=run, daemon=True)
+        self._compaction.start()
+        return self._compaction
+
+    def wait(self):
+        """Block until any compaction in progress has finished"""
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+            self._compaction = None
+
+    def clear(self):
+        """Start over with no history"""
+        self.wait()
+        with self._lock:
+            self.turns = []
+            self.turn_tokens = []
+            self.summary = None
+        self.reset_context()
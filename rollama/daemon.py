@@ -0,0 +1,264 @@
+"""Optional resident daemon that keeps rollama's warm state between CLI calls.
+
+`rollamad` listens on a Unix domain socket under ~/.rollama and owns the
+connection pools, model catalog, response cache, rate limiters and circuit
+breakers of one long-lived process. When it is running, `rollama run` and
+`rollama list` send their request over the socket and relay the output, so a
+scripted call costs a socket round trip instead of a cold start. When it is
+not, the CLI does the work in-process as before.
+
+The protocol is one JSON request line from the client, answered by JSON
+lines of {"stream": "stdout"|"stderr", "text": ...}, ending with either
+{"done": true, "status": N} or {"error": message}.
+
+This module is imported by the CLI on every forwarded call, so it must stay
+free of heavy imports; the server side loads the model manager on start.
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+from .errors import RollamaError
+
+# Seconds to wait for the daemon to accept a connection before running in-process
+CONNECT_TIMEOUT = 0.5
+
+# Set to any non-empty value to never forward to the daemon
+NO_DAEMON_ENV = "ROLLAMA_NO_DAEMON"
+
+
+class DaemonUnavailable(RollamaError):
+    """No daemon is listening on the socket"""
+
+
+def default_socket_path():
+    """Path of the daemon's socket, ~/.rollama/rollamad.sock"""
+    return Path.home() / ".rollama" / "rollamad.sock"
+
+
+def default_log_path():
+    """Where a daemon started by `rollama daemon start` writes its output"""
+    return Path.home() / ".rollama" / "rollamad.log"
+
+
+def request(payload, out=None, err=None, socket_path=None):
+    """
+    Send one request to the daemon and relay its output
+
+    Args:
+        payload (dict): Request, with 'op' naming the operation
+        out (file, optional): Where the daemon's stdout text goes, sys.stdout by default
+        err (file, optional): Where the daemon's stderr text goes, sys.stderr by default
+        socket_path (str or Path, optional): Daemon socket, the default path if omitted
+
+    Returns:
+        int: The command's exit status
+
+    Raises:
+        DaemonUnavailable: If no daemon is listening; nothing was run
+        RollamaError: If the daemon failed the request or the connection dropped
+    """
+    out = out or sys.stdout
+    err = err or sys.stderr
+    if os.environ.get(NO_DAEMON_ENV) or not hasattr(socket, "AF_UNIX"):
+        raise DaemonUnavailable("Daemon disabled")
+
+    path = str(socket_path or default_socket_path())
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError, socket.timeout) as e:
+            # No socket, or a stale one left by a daemon that died
+            raise DaemonUnavailable(f"No daemon listening on {path}") from e
+        # Generation can pause for a long time between tokens
+        sock.settimeout(None)
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+
+        with sock.makefile("rb") as reader:
+            for line in reader:
+                message = json.loads(line)
+                if "text" in message:
+                    stream = err if message.get("stream") == "stderr" else out
+                    stream.write(message["text"])
+                    stream.flush()
+                elif "error" in message:
+                    raise RollamaError(message["error"])
+                elif message.get("done"):
+                    return message.get("status", 0)
+    except OSError as e:
+        raise RollamaError(f"Lost connection to the daemon: {e}") from e
+    finally:
+        sock.close()
+    raise RollamaError("The daemon closed the connection before finishing")
+
+
+def is_running(socket_path=None):
+    """Whether a daemon answers on the socket"""
+    try:
+        return request({"op": "ping"}, socket_path=socket_path) == 0
+    except RollamaError:
+        return False
+
+
+class _StreamWriter:
+    """File-like object that forwards writes to the client as JSON lines"""
+
+    def __init__(self, send, name):
+        self._send = send
+        self.name = name
+
+    def write(self, text):
+        if text:
+            self._send({"stream": self.name, "text": text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, message):
+        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            line = self.rfile.readline()
+            if not line:
+                return
+            payload = json.loads(line)
+            out = _StreamWriter(self._send, "stdout")
+            err = _StreamWriter(self._send, "stderr")
+            status = self.server.daemon.handle(payload, out, err)
+            self._send({"done": True, "status": status})
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away, e.g. on Ctrl-C; dropping the stream stops generation
+            pass
+        except Exception as e:
+            try:
+                self._send({"error": str(e)})
+            except OSError:
+                pass
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class RollamaDaemon:
+    """Serves CLI requests from one long-lived model manager"""
+
+    def __init__(self, socket_path=None):
+        """
+        Initialize the daemon
+
+        Args:
+            socket_path (str or Path, optional): Socket to listen on, the default path if omitted
+        """
+        from .config import get_config
+        from .model_manager import ModelManager
+
+        self.socket_path = Path(socket_path or default_socket_path())
+        # Config re-reads the file when `rollama remote add` and friends change it
+        self.config = get_config()
+        self.model_manager = ModelManager(self.config)
+        self.model_manager.health_checks = True
+        self._server = None
+
+    def handle(self, payload, out, err):
+        """
+        Run one request
+
+        Args:
+            payload (dict): The request
+            out (file): Receives the command's output
+            err (file): Receives warnings
+
+        Returns:
+            int: Exit status
+        """
+        op = payload.get("op")
+        if op == "ping":
+            return 0
+        if op == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return 0
+
+        if op == "run":
+            response = self.model_manager.run_model(
+                payload["model"],
+                payload["prompt"],
+                remote=payload.get("remote"),
+                stream=payload.get("stream", True),
+                options=payload.get("options"),
+                use_cache=payload.get("use_cache"),
+                refresh=payload.get("refresh", False),
+                hedge=payload.get("hedge"),
+                out=out,
+                err=err
+            )
+            if not payload.get("stream", True):
+                out.write(f"{response}\n")
+            return 0
+        if op == "list":
+            for model in self.model_manager.list_models(remote=payload.get("remote"),
+                                                        refresh=payload.get("refresh", False)):
+                out.write(f"{model}\n")
+            return 0
+        raise RollamaError(f"Unknown daemon request '{op}'")
+
+    def serve_forever(self):
+        """Listen on the socket until shutdown() is called or the process is interrupted"""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            if is_running(self.socket_path):
+                raise RollamaError(f"A daemon is already listening on {self.socket_path}")
+            # Left behind by a daemon that did not exit cleanly
+            self.socket_path.unlink()
+
+        self._server = _Server(str(self.socket_path), _Handler)
+        self._server.daemon = self
+        os.chmod(self.socket_path, 0o600)
+        try:
+            self._server.serve_forever()
+        finally:
+            from .load_balancer import close_groups
+            close_groups()
+            self._server.server_close()
+            try:
+                self.socket_path.unlink()
+            except OSError:
+                pass
+
+    def shutdown(self):
+        """Stop serving; requests in progress are abandoned"""
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rollama daemon - keeps connections and caches warm between CLI calls")
+    parser.add_argument("--socket", help="Socket to listen on (default: ~/.rollama/rollamad.sock)")
+    args = parser.parse_args()
+
+    try:
+        daemon = RollamaDaemon(args.socket)
+        print(f"rollamad listening on {daemon.socket_path}", flush=True)
+        daemon.serve_forever()
+    except RollamaError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Exceptions raised when talking to model servers."""
+
+
+class RollamaError(Exception):
+    """Base class for rollama errors"""
+
+
+class Cancelled(RollamaError):
+    """The request was abandoned by the caller; this says nothing about the server"""
+
+
+class RemoteError(RollamaError):
+    """A request to a model server failed"""
+
+    # Whether sending the same request again may succeed
+    retryable = False
+
+    def __init__(self, message, remote=None):
+        """
+        Args:
+            message (str): Description of the failure
+            remote (str, optional): URL of the server the request went to
+        """
+        super().__init__(message)
+        self.remote = remote
+
+
+class ConnectError(RemoteError):
+    """The server could not be reached"""
+
+    retryable = True
+
+
+class RequestTimeout(RemoteError):
+    """The server stopped responding after the request was sent"""
+
+
+class HTTPStatusError(RemoteError):
+    """The server answered with an error status"""
+
+    def __init__(self, status_code, body="", remote=None, retry_after=None):
+        """
+        Args:
+            status_code (int): HTTP status code
+            body (str): Response body, used in the message
+            remote (str, optional): URL of the server the request went to
+            retry_after (float, optional): Seconds the server asked us to wait
+        """
+        message = f"API returned status code {status_code}"
+        if body:
+            message += f": {body}"
+        super().__init__(message, remote)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class StreamError(RemoteError):
+    """The server reported an error in the middle of a response"""
+
+
+class CircuitOpenError(RemoteError):
+    """Recent requests to the server failed, so it is not being tried for a while"""
+
+    def __init__(self, remote, retry_after):
+        super().__init__(f"{remote} is unavailable after repeated failures; retrying in {retry_after:.0f}s", remote)
+        self.retry_after = retry_after
+
+
+def chunk_error(chunk):
+    """
+    The failure a stream chunk reports
+
+    Args:
+        chunk (dict): Chunk from a client's run_stream
+
+    Returns:
+        RollamaError or None: The exception carried by an error chunk
+            (see error_chunk), or None if the chunk is not an error
+    """
+    if not chunk.get("error"):
+        return None
+    error = chunk.get("exception")
+    if isinstance(error, RollamaError):
+        return error
+    return StreamError(chunk.get("response", "").strip() or str(error or chunk["error"]))
+
+
+def error_chunk(error, prefix="Error"):
+    """
+    Stream chunk reporting an error, as yielded by the clients' run_stream
+
+    Args:
+        error (Exception): The failure
+        prefix (str): Text shown before the error message
+
+    Returns:
+        dict: Chunk with 'error' set and the exception under 'exception'
+    """
+    return {"response": f"{prefix}: {error}", "error": True, "exception": error}
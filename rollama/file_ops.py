@@ -0,0 +1,197 @@
+"""Incremental parser for file operations in model output.
+
+Coding prompts ask the model to mark its changes with 'CREATE FILE:',
+'EDIT FILE:', 'PATCH FILE:', 'CREATE DIR:' and 'DELETE FILE:' lines, or to
+put a file's contents in a fenced code block naming it with 'filepath:'. The
+parser takes the reply as it streams and hands back each operation as soon
+as it is complete, so a multi-file generation can be written to disk file by
+file instead of after the last token.
+
+An operation is a dict with 'action' and 'path', plus 'content' for files:
+    create  - 'CREATE FILE:' block, the file must not exist
+    edit    - 'EDIT FILE:' block, the file must exist
+    write   - fenced block with a filepath, created or overwritten
+    patch   - 'PATCH FILE:' block, or any file block or unnamed fenced block
+              holding search/replace blocks or a unified diff; the content
+              is the patch (see patching.py)
+    mkdir   - 'CREATE DIR:' line
+    delete  - 'DELETE FILE:' line
+"""
+from .patching import is_patch, split_diff
+
+MARKERS = {
+    "CREATE FILE:": "create",
+    "EDIT FILE:": "edit",
+    "PATCH FILE:": "patch",
+    "CREATE DIR:": "mkdir",
+    "DELETE FILE:": "delete",
+}
+
+FENCE = "```"
+
+
+def _marker(line):
+    """The (action, path) a marker line announces, or None"""
+    for prefix, action in MARKERS.items():
+        if line.startswith(prefix):
+            return action, line[len(prefix):].strip()
+    return None
+
+
+def _filepath(line):
+    """Path named by 'filepath:' in a fence header or a leading comment, or None"""
+    if "filepath:" not in line:
+        return None
+    path = line.split("filepath:", 1)[1].strip()
+    # Closing comment syntax, as in /* filepath: a.css */ or <!-- filepath: a.html -->
+    for suffix in ("*/", "-->"):
+        if path.endswith(suffix):
+            path = path[:-len(suffix)].strip()
+    return path or None
+
+
+def _file_content(lines):
+    """Join a file's lines, dropping blank lines around them"""
+    start, end = 0, len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    if start == end:
+        return ""
+    return "\n".join(lines[start:end]) + "\n"
+
+
+class FileOperationParser:
+    """Turns streamed model output into file operations as each one completes"""
+
+    def __init__(self):
+        self._partial = ""
+        # None between operations; 'header' after a CREATE/EDIT/PATCH FILE line
+        # until its content starts; 'raw' for unfenced content, which runs
+        # until the next marker; 'fence' inside a code block
+        self._state = None
+        self._operation = None
+        self._lines = []
+
+    def feed(self, text):
+        """
+        Consume the next piece of output
+
+        Args:
+            text (str): Any amount of text, not necessarily whole lines
+
+        Returns:
+            list: Operations completed by this piece, in order
+        """
+        operations = []
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line, operations)
+        return operations
+
+    def close(self):
+        """
+        Finish at the end of the output
+
+        Returns:
+            list: Operations still open, completed by the end of the output.
+                A code block that was never closed is dropped rather than
+                written truncated.
+        """
+        operations = []
+        if self._partial:
+            self._line(self._partial, operations)
+            self._partial = ""
+        if self._state == "raw":
+            self._finish(operations)
+        self._state = None
+        self._operation = None
+        self._lines = []
+        return operations
+
+    def _start(self, state, operation):
+        self._state = state
+        self._operation = operation
+        self._lines = []
+
+    def _finish(self, operations):
+        operation = self._operation
+        if operation and (self._lines or self._state == "fence"):
+            content = _file_content(self._lines)
+            if operation["path"]:
+                if operation["action"] in ("edit", "write") and is_patch(content):
+                    operation["action"] = "patch"
+                operation["content"] = content
+                operations.append(operation)
+            elif is_patch(content):
+                # An unnamed diff block names its files in its headers
+                for path, patch in split_diff(content):
+                    if patch is None:
+                        operations.append({"action": "delete", "path": path})
+                    else:
+                        operations.append({"action": "patch", "path": path, "content": patch})
+        self._start(None, None)
+
+    def _line(self, line, operations):
+        if self._state == "fence":
+            if line.lstrip().startswith(FENCE):
+                self._finish(operations)
+            elif not self._lines and _filepath(line):
+                # '// filepath: name' as the block's first line names the file
+                if not self._operation["path"]:
+                    self._operation["path"] = _filepath(line)
+            else:
+                self._lines.append(line)
+            return
+
+        if self._state == "header":
+            if not line.strip():
+                return
+            if line.startswith(FENCE):
+                self._state = "fence"
+                return
+            if _marker(line) is None:
+                self._state = "raw"
+                self._lines.append(line)
+                return
+            # Another marker straight away; there was nothing to write
+            self._start(None, None)
+
+        elif self._state == "raw":
+            if _marker(line) is None and not line.startswith(FENCE):
+                self._lines.append(line)
+                return
+            self._finish(operations)
+
+        marker = _marker(line)
+        if marker is not None:
+            action, path = marker
+            if action in ("create", "edit", "patch"):
+                self._start("header", {"action": action, "path": path})
+            elif path:
+                operations.append({"action": action, "path": path})
+        elif line.startswith(FENCE):
+            self._start("fence", {"action": "write", "path": _filepath(line)})
+
+
+def first_code_block(text):
+    """
+    Contents of the first fenced code block in text
+
+    Args:
+        text (str): Model output
+
+    Returns:
+        str or None: The block's lines, or None if there is no closed block
+    """
+    lines = None
+    for line in text.split("\n"):
+        if line.lstrip().startswith(FENCE):
+            if lines is not None:
+                return _file_content(lines)
+            lines = []
+        elif lines is not None:
+            lines.append(line)
+    return None
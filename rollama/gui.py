@@ -6,11 +6,11 @@ import sys
 import threading
 import queue
 import io
-from PIL import Image, ImageTk
 import base64
 
-from .config import Config
+from .config import get_config
 from .model_manager import ModelManager
+from .tokens import trim_text
 from .utils import setup_history
 
 class RollamaTerminal(tk.Frame):
@@ -18,13 +18,18 @@ class RollamaTerminal(tk.Frame):
         tk.Frame.__init__(self, parent, *args, **kwargs)
         self.parent = parent
         
-        self.config = Config()
+        self.config = get_config()
         self.model_manager = ModelManager(self.config)
+        self.model_manager.health_checks = True
         
         self.current_model = self.config.get_default_model()
         self.current_remote = None
-        if self.config.get_remote():
+        if self.config.get_remote() or self.config.get_remote_group():
             self.current_remote = self.config.config.get("default_remote")
+            self.model_manager.preconnect(self.current_remote)
+        # Warm the model catalog so the model picker opens instantly
+        self.model_manager.prefetch_models(self.current_remote)
+        self.model_manager.start_session(self.current_model, self.current_remote)
         
         # Load font settings or use defaults
         self.font_family = self.config.config.get("font_family", "Courier")
@@ -176,15 +181,21 @@ class RollamaTerminal(tk.Frame):
         elif command.lower().startswith("switch model "):
             model_name = command[13:].strip()
             self.current_model = model_name
+            self.model_manager.start_session(model_name, self.current_remote)
             self.status_var.set(f"Model: {self.current_model} | Server: {self.current_remote or 'Local'}")
             self.terminal.insert(tk.END, f"Switched to model: {model_name}\n")
         elif command.lower().startswith("switch remote "):
             remote_name = command[14:].strip()
             if remote_name.lower() == "local" or remote_name.lower() == "none":
                 self.current_remote = None
+                self.model_manager.prefetch_models(None)
+                self.model_manager.start_session(self.current_model, None)
                 self.terminal.insert(tk.END, "Switched to local Ollama\n")
-            elif self.config.get_remote(remote_name):
+            elif self.config.get_remote(remote_name) or self.config.get_remote_group(remote_name):
                 self.current_remote = remote_name
+                self.model_manager.preconnect(remote_name)
+                self.model_manager.prefetch_models(remote_name)
+                self.model_manager.start_session(self.current_model, remote_name)
                 self.terminal.insert(tk.END, f"Switched to remote: {remote_name}\n")
             else:
                 self.terminal.insert(tk.END, f"Error: Remote '{remote_name}' not found\n")
@@ -202,7 +213,7 @@ class RollamaTerminal(tk.Frame):
             context = command
             if self.attachments:
                 attachment_info = "\n\nAttached files:\n"
-                for i, (attachment_type, attachment_data, filename) in enumerate(self.attachments, 1):
+                for i, (attachment_type, attachment_data, filename) in enumerate(self._fit_attachments(command), 1):
                     attachment_info += f"{i}. {filename} ({attachment_type})\n"
                     
                     # For text files, include content
@@ -221,6 +232,28 @@ class RollamaTerminal(tk.Frame):
             
         return "break"
         
+    def _fit_attachments(self, command):
+        """Attachments with text contents trimmed, in proportion to size, to fit the context window"""
+        counter = self.model_manager.get_token_counter(self.current_model)
+        sizes = [counter.count(data) if kind == "text" else 0 for kind, data, _ in self.attachments]
+        # Room for the command and the per-file headers, roughly
+        available = self.model_manager.prompt_budget() - counter.count(command) - 20 * len(self.attachments)
+        total = sum(sizes)
+        if total <= available:
+            return self.attachments
+        
+        fitted = []
+        for (kind, data, filename), size in zip(self.attachments, sizes):
+            if kind == "text":
+                data = trim_text(data, max(0, available) * size // total, counter)
+            fitted.append((kind, data, filename))
+        self.terminal.insert(
+            tk.END,
+            f"Attachments are about {total} tokens; trimmed to fit the "
+            f"{self.model_manager.context_window()}-token context window\n"
+        )
+        return fitted
+        
     def run_model_query(self, model, prompt, remote=None):
         try:
             response = self.model_manager.run_model(model, prompt, remote=remote)
@@ -298,7 +331,8 @@ Any other text will be sent as a prompt to the current model.
                 filename = os.path.basename(file_path)
                 self.attachments.append(("text", content, filename))
                 
-                self.terminal.insert(tk.END, f"\nAttached file: {filename}\n")
+                tokens = self.model_manager.count_tokens(self.current_model, content)
+                self.terminal.insert(tk.END, f"\nAttached file: {filename} (~{tokens} tokens)\n")
                 self.show_prompt()
             except Exception as e:
                 messagebox.showerror("Error", f"Could not read file: {str(e)}")
@@ -329,6 +363,8 @@ Any other text will be sent as a prompt to the current model.
                 
                 # Display a thumbnail
                 try:
+                    # PIL is only needed for thumbnails, so it is loaded on first use
+                    from PIL import Image, ImageTk
                     img = Image.open(file_path)
                     img.thumbnail((200, 200))  # Resize for display
                     photo = ImageTk.PhotoImage(img)
@@ -462,9 +498,7 @@ Any other text will be sent as a prompt to the current model.
         # Save and apply font settings
         try:
             # Update config values
-            self.config.config["font_family"] = font_family
-            self.config.config["font_size"] = int(font_size)
-            self.config._save_config()
+            self.config.set_font(font_family, font_size)
             
             # Store current values
             self.font_family = font_family
@@ -629,6 +663,9 @@ Any other text will be sent as a prompt to the current model.
             
         # Update current remote
         self.current_remote = remote_name
+        self.model_manager.preconnect(remote_name)
+        self.model_manager.prefetch_models(remote_name)
+        self.model_manager.start_session(self.current_model, remote_name)
         self.status_var.set(f"Model: {self.current_model} | Server: {self.current_remote or 'Local'}")
         
     def list_models(self):
@@ -685,6 +722,7 @@ Any other text will be sent as a prompt to the current model.
             model_name = model_item.split(" ")[0]  # Get just the model name part
             
             self.current_model = model_name
+            self.model_manager.start_session(model_name, self.current_remote)
             self.status_var.set(f"Model: {self.current_model} | Server: {self.current_remote or 'Local'}")
             
             self.terminal.insert(tk.END, f"\nSwitched to model: {model_name}\n")
@@ -735,6 +773,7 @@ def main():
     root = tk.Tk()
     app = RollamaGUI(root)
     root.mainloop()
+    app.terminal.model_manager.end_session(app.terminal.current_remote)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,199 @@
+import socket
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_POOL_SIZE = 10
+
+# One keep-alive session per remote (scheme://host:port), shared by every
+# ApiClient in the process so repeated prompts reuse open TCP/TLS connections.
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# The InFlight handle of the request being sent on this thread, if any
+_current = threading.local()
+
+
+def _shutdown(conn):
+    """Shut a connection's socket down, waking any thread blocked on it"""
+    sock = getattr(conn, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class InFlight:
+    """
+    Handle for aborting a request from another thread
+
+    Closing the response only helps once its headers have arrived; until
+    then the sending thread is blocked inside session.post, which a server
+    still working on the reply can hold for minutes. A request sent on a
+    pooled session inside `with handle:` records the connection it goes out
+    on, so abort() can shut that socket down at any point.
+    """
+
+    def __init__(self):
+        self.aborted = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        _current.request = self
+        return self
+
+    def __exit__(self, *exc):
+        _current.request = None
+        self._attach(None)
+
+    def _attach(self, conn):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.in_flight = None
+            self._conn = conn
+            if conn is not None:
+                conn.in_flight = self
+            aborted = self.aborted
+        if aborted and conn is not None:
+            _shutdown(conn)
+
+    def abort(self):
+        """Abort the request, now or as soon as it has a connection"""
+        with self._lock:
+            self.aborted = True
+            conn = self._conn
+        if conn is not None:
+            _shutdown(conn)
+
+
+class _AbortableConnection:
+    in_flight = None
+
+    def connect(self):
+        super().connect()
+        # abort() may have found no socket to shut down while this one was opening
+        if self.in_flight is not None and self.in_flight.aborted:
+            _shutdown(self)
+
+
+class _AbortablePool:
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        request = getattr(_current, "request", None)
+        if request is not None:
+            request._attach(conn)
+        return conn
+
+
+class _HTTPConnection(_AbortableConnection, HTTPConnection):
+    pass
+
+
+class _HTTPSConnection(_AbortableConnection, HTTPSConnection):
+    pass
+
+
+class _HTTPPool(_AbortablePool, HTTPConnectionPool):
+    ConnectionCls = _HTTPConnection
+
+
+class _HTTPSPool(_AbortablePool, HTTPSConnectionPool):
+    ConnectionCls = _HTTPSConnection
+
+
+class _Adapter(HTTPAdapter):
+    """HTTPAdapter whose connections can be aborted through an InFlight handle"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _HTTPPool, "https": _HTTPSPool}
+
+
+def _pool_key(url):
+    """Normalize a remote URL to the scheme://host:port it connects to"""
+    parts = urlsplit(url)
+    return f"{parts.scheme or 'http'}://{parts.netloc.lower()}"
+
+
+def _mount_adapter(session, pool_size):
+    adapter = _Adapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def get_session(url, pool_size=None):
+    """
+    Get the shared session for a remote, creating it on first use
+
+    Args:
+        url (str): Remote server URL
+        pool_size (int, optional): Maximum number of pooled connections.
+            The pool is grown if a larger size is requested later.
+
+    Returns:
+        requests.Session: Session bound to the remote's connection pool
+    """
+    pool_size = int(pool_size or DEFAULT_POOL_SIZE)
+    key = _pool_key(url)
+
+    with _sessions_lock:
+        entry = _sessions.get(key)
+        if entry is None:
+            session = requests.Session()
+            _mount_adapter(session, pool_size)
+            _sessions[key] = (session, pool_size)
+            return session
+
+        session, current_size = entry
+        if pool_size > current_size:
+            old_adapter = session.get_adapter(key)
+            _mount_adapter(session, pool_size)
+            _sessions[key] = (session, pool_size)
+            # Drop the old pool's idle sockets; connections still in use are
+            # closed when their responses are released
+            old_adapter.close()
+        return session
+
+
+def preconnect(url, pool_size=None, headers=None, background=True):
+    """
+    Open a connection to a remote ahead of the first request
+
+    Args:
+        url (str): Remote server URL
+        pool_size (int, optional): Pool size for the remote's session
+        headers (dict, optional): Headers to send with the probe
+        background (bool): Run the probe on a daemon thread
+
+    Returns:
+        threading.Thread or None: The probe thread when run in background
+    """
+    def probe():
+        session = get_session(url, pool_size)
+        try:
+            # Any response will do; the point is to leave a warm socket in the pool
+            session.head(url, headers=headers or {}, timeout=5)
+        except requests.exceptions.RequestException:
+            pass
+
+    if not background:
+        probe()
+        return None
+
+    thread = threading.Thread(target=probe, daemon=True)
+    thread.start()
+    return thread
+
+
+def close_all():
+    """Close every pooled session"""
+    with _sessions_lock:
+        for session, _ in _sessions.values():
+            session.close()
+        _sessions.clear()
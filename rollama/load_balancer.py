@@ -0,0 +1,666 @@
+import atexit
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+
+from .api_client import ApiClient
+from .async_client import AsyncApiClient
+from .errors import RemoteError, RollamaError, StreamError, error_chunk
+from .retry import is_server_failure
+
+DEFAULT_HEALTH_INTERVAL = 30
+HEALTH_TIMEOUT = 5
+
+# Weight of the newest sample in the latency moving average
+EWMA_ALPHA = 0.3
+
+# Time-to-first-token samples kept per group for the hedging delay
+TTFT_WINDOW = 200
+
+# Hedging settings used when a group's "hedge" config omits them
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_HEDGE_MIN_DELAY_MS = 100
+DEFAULT_HEDGE_DELAY_MS = 1000
+MIN_HEDGE_SAMPLES = 10
+
+# Groups are process-wide so every ModelManager (CLI, GUI, code manager)
+# sees the same outstanding-request counts and latency history
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+class RemoteState:
+    """Load and health bookkeeping for one member of a remote group"""
+
+    def __init__(self, name, remote):
+        self.name = name
+        self.remote = remote
+        self.outstanding = 0
+        self.latency = None  # EWMA of time to first token, in seconds
+        self.healthy = True
+        self.last_error = None
+
+    def record_latency(self, seconds):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency = EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.latency
+
+
+class RemoteGroup:
+    """
+    A set of remote servers that requests are balanced across.
+
+    Each request goes to the healthy member with the lowest expected wait,
+    estimated as (outstanding requests + 1) * latency EWMA. A member that
+    fails before producing any output is marked unhealthy until it next
+    succeeds. Long-running processes also start a background thread that
+    probes every member's /v1/models endpoint to track health.
+    """
+
+    def __init__(self, name, members, health_interval=DEFAULT_HEALTH_INTERVAL):
+        """
+        Initialize the group
+
+        Args:
+            name (str): Group name
+            members (dict): Member remote name -> remote details (url, api_key)
+            health_interval (float): Seconds between health probes, 0 to disable
+        """
+        self.name = name
+        self.members = [RemoteState(member, remote) for member, remote in members.items()]
+        self.health_interval = health_interval
+        self.ttft_samples = deque(maxlen=TTFT_WINDOW)
+        self._lock = threading.Lock()
+        self._health_stop = None
+
+    def update_members(self, members):
+        """Sync membership with the configuration, keeping stats of existing members"""
+        with self._lock:
+            current = {state.name: state for state in self.members}
+            self.members = []
+            for member, remote in members.items():
+                state = current.get(member) or RemoteState(member, remote)
+                state.remote = remote
+                self.members.append(state)
+
+    def pick(self, exclude=()):
+        """
+        Choose the member to send the next request to
+
+        Args:
+            exclude (iterable): Member names already tried for this request
+
+        Returns:
+            RemoteState or None: Selected member, None when all are excluded
+        """
+        with self._lock:
+            candidates = [state for state in self.members if state.name not in exclude]
+            if not candidates:
+                return None
+
+            # Prefer healthy members, but a fully unhealthy group still gets tried
+            healthy = [state for state in candidates if state.healthy] or candidates
+            known = [state.latency for state in healthy if state.latency is not None]
+            default_latency = sum(known) / len(known) if known else 1.0
+
+            def expected_wait(state):
+                latency = state.latency if state.latency is not None else default_latency
+                return ((state.outstanding + 1) * latency, random.random())
+
+            return min(healthy, key=expected_wait)
+
+    def acquire(self, state):
+        with self._lock:
+            state.outstanding += 1
+
+    def release(self, state):
+        with self._lock:
+            state.outstanding = max(0, state.outstanding - 1)
+
+    def mark_failed(self, state, error):
+        with self._lock:
+            state.healthy = False
+            state.last_error = error
+
+    def mark_succeeded(self, state, latency=None):
+        with self._lock:
+            state.healthy = True
+            state.last_error = None
+            if latency is not None:
+                state.record_latency(latency)
+                self.ttft_samples.append(latency)
+
+    def hedge_delay(self, percentile=DEFAULT_HEDGE_PERCENTILE, min_delay_ms=DEFAULT_HEDGE_MIN_DELAY_MS,
+                    default_delay_ms=DEFAULT_HEDGE_DELAY_MS):
+        """
+        How long to wait for a first token before sending a hedged request
+
+        Args:
+            percentile (float): Percentile of recent time-to-first-token to wait for
+            min_delay_ms (float): Lower bound, so fast groups are not flooded with hedges
+            default_delay_ms (float): Delay used until enough samples are collected
+
+        Returns:
+            float: Delay in seconds
+        """
+        with self._lock:
+            samples = sorted(self.ttft_samples)
+        if len(samples) < MIN_HEDGE_SAMPLES:
+            return default_delay_ms / 1000.0
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100.0))
+        return max(samples[index], min_delay_ms / 1000.0)
+
+    def probe(self, state):
+        """Check one member's /v1/models endpoint and update its health"""
+        client = ApiClient(state.remote)
+        headers = {}
+        if state.remote.get("api_key"):
+            headers["Authorization"] = f"Bearer {state.remote['api_key']}"
+        try:
+            response = client.session.get(
+                f"{state.remote['url']}/v1/models",
+                headers=headers,
+                timeout=HEALTH_TIMEOUT
+            )
+            healthy = response.status_code == 200
+            error = None if healthy else f"status code {response.status_code}"
+        except requests.exceptions.RequestException as e:
+            healthy = False
+            error = str(e)
+
+        with self._lock:
+            state.healthy = healthy
+            state.last_error = error
+        return healthy
+
+    def start_health_checks(self):
+        """Start the background health probe thread, if not already running"""
+        with self._lock:
+            if not self.health_interval or self._health_stop is not None:
+                return
+            stop = self._health_stop = threading.Event()
+
+        def run():
+            while not stop.is_set():
+                for state in list(self.members):
+                    if stop.is_set():
+                        return
+                    self.probe(state)
+                stop.wait(self.health_interval)
+
+        threading.Thread(target=run, daemon=True, name=f"rollama-health-{self.name}").start()
+
+    def stop_health_checks(self):
+        """Stop the background health probe thread; a probe in progress finishes first"""
+        with self._lock:
+            stop, self._health_stop = self._health_stop, None
+        if stop is not None:
+            stop.set()
+
+    def status(self):
+        """
+        Snapshot of member state
+
+        Returns:
+            list: One dict per member (name, url, healthy, outstanding, latency)
+        """
+        with self._lock:
+            return [
+                {
+                    "name": state.name,
+                    "url": state.remote["url"],
+                    "healthy": state.healthy,
+                    "outstanding": state.outstanding,
+                    "latency": state.latency,
+                    "error": state.last_error,
+                }
+                for state in self.members
+            ]
+
+
+def get_group(name, members, health_interval=DEFAULT_HEALTH_INTERVAL, health_checks=False):
+    """
+    Get the shared RemoteGroup for a configured group
+
+    Args:
+        name (str): Group name
+        members (dict): Member remote name -> remote details
+        health_interval (float): Seconds between health probes
+        health_checks (bool): Start probing the members in the background.
+            Only worth it in a long-running process; a one-shot command
+            learns enough from its own request and failover.
+
+    Returns:
+        RemoteGroup: The shared group
+    """
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = RemoteGroup(name, members, health_interval)
+            _groups[name] = group
+        else:
+            group.update_members(members)
+    if health_checks:
+        group.start_health_checks()
+    return group
+
+
+def close_groups():
+    """Stop every group's health checks; called at exit"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    for group in groups:
+        group.stop_health_checks()
+
+
+atexit.register(close_groups)
+
+
+def _server_failed(chunk):
+    """Whether an error chunk should count against the member's health"""
+    error = chunk.get("exception")
+    return error is None or is_server_failure(error)
+
+
+class _Attempt:
+    """One member's request within a hedged stream"""
+
+    def __init__(self, state, client):
+        self.state = state
+        self.client = client
+        self.started = time.monotonic()
+        self.active = True
+
+
+_END = object()
+
+
+class GroupClient:
+    """ApiClient-compatible client that balances requests across a RemoteGroup"""
+
+    def __init__(self, group, local_url=None, hedge=None, keep_alive=None):
+        """
+        Initialize the group client
+
+        Args:
+            group (RemoteGroup): Group to balance across
+            local_url (str, optional): Local daemon URL passed to member clients
+            hedge (dict, optional): Hedging settings (percentile, min_delay_ms,
+                default_delay_ms); hedging is off when None
+            keep_alive (str or int, optional): Passed to member clients
+        """
+        self.group = group
+        self.local_url = local_url
+        self.hedge = hedge
+        self.keep_alive = keep_alive
+        self.remote = {"url": f"group:{group.name}", "group": group.name}
+
+    @property
+    def server_id(self):
+        """Identifier of the server(s) this client talks to"""
+        return self.remote["url"]
+
+    def _client(self, state):
+        return ApiClient(state.remote, local_url=self.local_url, keep_alive=self.keep_alive)
+
+    def preconnect(self, background=True):
+        """Warm up a pooled connection to every member"""
+        return [self._client(state).preconnect(background) for state in self.group.members]
+
+    def run_stream(self, model, prompt, options=None):
+        """
+        Stream from the least-loaded healthy member, failing over to another
+        member if a request fails before its first token.
+
+        Args:
+            model (str): Model name
+            prompt (str or list): Prompt, or chat messages ({'role', 'content'} dicts)
+            options (dict, optional): Sampling parameters
+
+        Yields:
+            dict: Response chunks with 'response' key containing text
+        """
+        if self.hedge is not None and len(self.group.members) > 1:
+            yield from self._run_hedged_stream(model, prompt, options)
+            return
+
+        tried = set()
+        last_error = None
+        while True:
+            state = self.group.pick(exclude=tried)
+            if state is None:
+                yield error_chunk(RemoteError(f"All remotes in group '{self.group.name}' failed: {last_error}", self.remote["url"]))
+                return
+            tried.add(state.name)
+
+            self.group.acquire(state)
+            started = time.monotonic()
+            first = True
+            try:
+                for chunk in self._client(state).run_stream(model, prompt, options):
+                    if first:
+                        if chunk.get("error"):
+                            last_error = chunk.get("response", "").strip()
+                            if _server_failed(chunk):
+                                self.group.mark_failed(state, last_error)
+                            break
+                        self.group.mark_succeeded(state, time.monotonic() - started)
+                        first = False
+                    yield chunk
+                else:
+                    if not first:
+                        return
+                    # Ended without output: nothing was streamed, so try another member
+                    last_error = "empty response"
+            except Exception as e:
+                if not first:
+                    raise
+                last_error = str(e)
+                self.group.mark_failed(state, last_error)
+            finally:
+                self.group.release(state)
+
+    def _run_hedged_stream(self, model, prompt, options):
+        """
+        Stream with hedging: if no first token arrives within the group's
+        percentile-based delay, send the same request to a second member and
+        stream whichever answers first, cancelling the other.
+        """
+        delay = self.group.hedge_delay(
+            percentile=self.hedge.get("percentile", DEFAULT_HEDGE_PERCENTILE),
+            min_delay_ms=self.hedge.get("min_delay_ms", DEFAULT_HEDGE_MIN_DELAY_MS),
+            default_delay_ms=self.hedge.get("default_delay_ms", DEFAULT_HEDGE_DELAY_MS)
+        )
+        events = queue.Queue()
+        attempts = []
+        tried = set()
+        winner = None
+        hedged = False
+        last_error = None
+
+        def worker(attempt):
+            try:
+                for chunk in attempt.client.run_stream(model, prompt, options):
+                    if attempt.client.cancelled:
+                        break
+                    events.put((attempt, chunk))
+            except Exception as e:
+                if not attempt.client.cancelled:
+                    events.put((attempt, error_chunk(e if isinstance(e, RollamaError) else StreamError(str(e)))))
+            finally:
+                self.group.release(attempt.state)
+                events.put((attempt, _END))
+
+        def launch():
+            state = self.group.pick(exclude=tried)
+            if state is None:
+                return None
+            tried.add(state.name)
+            self.group.acquire(state)
+            attempt = _Attempt(state, self._client(state))
+            attempts.append(attempt)
+            threading.Thread(target=worker, args=(attempt,), daemon=True).start()
+            return attempt
+
+        launch()
+        hedge_at = time.monotonic() + delay
+        try:
+            while True:
+                if winner is None and not hedged:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                else:
+                    timeout = None
+                try:
+                    attempt, chunk = events.get(timeout=timeout)
+                except queue.Empty:
+                    # First token is late: hedge with a second member
+                    hedged = True
+                    launch()
+                    continue
+
+                if chunk is _END:
+                    attempt.active = False
+                    if attempt is winner:
+                        return
+                    if winner is None and not any(a.active for a in attempts):
+                        # Everything in flight failed before a token; fail over
+                        if launch() is None:
+                            yield error_chunk(RemoteError(f"All remotes in group '{self.group.name}' failed: {last_error}", self.remote["url"]))
+                            return
+                        # The replacement gets its own full delay before being hedged
+                        hedge_at = time.monotonic() + delay
+                    continue
+
+                if winner is None:
+                    if chunk.get("error"):
+                        last_error = chunk.get("response", "").strip()
+                        if _server_failed(chunk):
+                            self.group.mark_failed(attempt.state, last_error)
+                        attempt.client.cancel()
+                        continue
+                    winner = attempt
+                    self.group.mark_succeeded(attempt.state, time.monotonic() - attempt.started)
+                    for other in attempts:
+                        if other is not winner:
+                            other.client.cancel()
+
+                if attempt is winner:
+                    yield chunk
+        finally:
+            for attempt in attempts:
+                if attempt.active and attempt is not winner:
+                    attempt.client.cancel()
+            if winner is not None and winner.active:
+                winner.client.cancel()
+
+    def chat_stream(self, model, prompt, options=None):
+        """Alias for run_stream to maintain API compatibility"""
+        return self.run_stream(model, prompt, options)
+
+    def run_remote_model(self, model, prompt, options=None):
+        """
+        Run a non-streaming query on the least-loaded healthy member, with failover
+
+        Returns:
+            str: Model response
+
+        Raises:
+            RemoteError: If every member failed
+        """
+        if self.hedge is not None and len(self.group.members) > 1:
+            pieces = []
+            for chunk in self._run_hedged_stream(model, prompt, options):
+                if chunk.get("error"):
+                    raise chunk.get("exception") or RemoteError(chunk.get("response", "").strip(), self.remote["url"])
+                pieces.append(chunk.get("response", ""))
+            return "".join(pieces)
+
+        tried = set()
+        last_error = "no healthy members"
+        while True:
+            state = self.group.pick(exclude=tried)
+            if state is None:
+                raise RemoteError(f"All remotes in group '{self.group.name}' failed: {last_error}", self.remote["url"])
+            tried.add(state.name)
+
+            self.group.acquire(state)
+            started = time.monotonic()
+            try:
+                response = self._client(state).run_remote_model(model, prompt, options)
+            except RollamaError as e:
+                last_error = str(e)
+                if is_server_failure(e):
+                    self.group.mark_failed(state, last_error)
+                continue
+            finally:
+                self.group.release(state)
+
+            self.group.mark_succeeded(state, time.monotonic() - started)
+            return response
+
+    def list_remote_models(self):
+        """
+        List models available on any healthy member
+
+        Returns:
+            list: Sorted, de-duplicated model names
+        """
+        models = set()
+        for state in self.group.members:
+            if state.healthy:
+                models.update(self._client(state).list_remote_models())
+        return sorted(models)
+
+    def warm_model(self, model, keep_alive=None):
+        """
+        Load a model on every healthy member, since any of them may serve the next request
+
+        Returns:
+            float: Seconds the slowest load took
+
+        Raises:
+            RollamaError: If no member could load the model
+        """
+        slowest = None
+        last_error = None
+        for state in self.group.members:
+            if not state.healthy:
+                continue
+            try:
+                elapsed = self._client(state).warm_model(model, keep_alive)
+            except RollamaError as e:
+                last_error = e
+                continue
+            slowest = elapsed if slowest is None else max(slowest, elapsed)
+        if slowest is None:
+            raise last_error or RemoteError(f"Remote group '{self.group.name}' has no healthy members", self.remote["url"])
+        return slowest
+
+    def fetch_model_catalog(self):
+        """
+        Merge the model catalogs of every healthy member
+
+        Returns:
+            list: Model dicts, 'loaded' if any member has the model in memory
+
+        Raises:
+            RollamaError: If no member could be queried
+        """
+        models = {}
+        last_error = None
+        reached = False
+        for state in self.group.members:
+            if not state.healthy:
+                continue
+            try:
+                catalog = self._client(state).fetch_model_catalog()
+            except RollamaError as e:
+                last_error = e
+                continue
+            reached = True
+            for model in catalog:
+                merged = models.setdefault(model["name"], dict(model))
+                merged["loaded"] = merged["loaded"] or model["loaded"]
+        if not reached and last_error is not None:
+            raise last_error
+        return sorted(models.values(), key=lambda model: model["name"])
+
+
+class AsyncGroupClient:
+    """AsyncApiClient-compatible client that balances requests across a RemoteGroup"""
+
+    def __init__(self, group, local_url=None):
+        """
+        Initialize the async group client
+
+        Args:
+            group (RemoteGroup): Group to balance across
+            local_url (str, optional): Local daemon URL passed to member clients
+        """
+        self.group = group
+        self.local_url = local_url
+        self.remote = {"url": f"group:{group.name}", "group": group.name}
+
+    @property
+    def server_id(self):
+        """Identifier of the server(s) this client talks to"""
+        return self.remote["url"]
+
+    async def run_stream(self, model, prompt, options=None):
+        """
+        Stream from the least-loaded healthy member, failing over to another
+        member if a request fails before its first token.
+
+        Yields:
+            dict: Response chunks with 'response' key containing text
+        """
+        tried = set()
+        last_error = None
+        while True:
+            state = self.group.pick(exclude=tried)
+            if state is None:
+                yield error_chunk(RemoteError(f"All remotes in group '{self.group.name}' failed: {last_error}", self.remote["url"]))
+                return
+            tried.add(state.name)
+
+            self.group.acquire(state)
+            started = time.monotonic()
+            first = True
+            try:
+                client = AsyncApiClient(state.remote, local_url=self.local_url)
+                async for chunk in client.run_stream(model, prompt, options):
+                    if first:
+                        if chunk.get("error"):
+                            last_error = chunk.get("response", "").strip()
+                            if _server_failed(chunk):
+                                self.group.mark_failed(state, last_error)
+                            break
+                        self.group.mark_succeeded(state, time.monotonic() - started)
+                        first = False
+                    yield chunk
+                else:
+                    if not first:
+                        return
+                    last_error = "empty response"
+            except Exception as e:
+                if not first:
+                    raise
+                last_error = str(e)
+                self.group.mark_failed(state, last_error)
+            finally:
+                self.group.release(state)
+
+    async def run(self, model, prompt, options=None):
+        """
+        Run a query and return the complete response
+
+        Returns:
+            str: Model response
+
+        Raises:
+            RollamaError: If every member failed
+        """
+        pieces = []
+        async for chunk in self.run_stream(model, prompt, options):
+            if chunk.get("error"):
+                raise chunk.get("exception") or RemoteError(chunk.get("response", "").strip(), self.remote["url"])
+            pieces.append(chunk.get("response", ""))
+        return "".join(pieces)
+
+    async def list_models(self):
+        """
+        List models available on any healthy member
+
+        Returns:
+            list: Sorted, de-duplicated model names
+        """
+        models = set()
+        for state in self.group.members:
+            if state.healthy:
+                models.update(await AsyncApiClient(state.remote, local_url=self.local_url).list_models())
+        return sorted(models)
@@ -0,0 +1,137 @@
+"""On-disk, TTL-based cache of the models each server offers.
+
+Listing models means one to three HTTP round trips per server, or spawning
+`ollama list`, so the results are kept in ~/.rollama/models.json. A fresh
+entry is returned as is. A stale entry is returned immediately while a
+background thread fetches a new one, so a model picker never waits on the
+network once a server has been seen.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_TTL = 300
+
+
+class ModelCatalog:
+    """Cached model lists keyed by server id"""
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL):
+        """
+        Initialize the catalog
+
+        Args:
+            path (str or Path, optional): Catalog file, ~/.rollama/models.json by default
+            ttl (float): Seconds before an entry is refreshed
+        """
+        self.path = Path(path) if path else Path.home() / ".rollama" / "models.json"
+        self.ttl = ttl
+        self._entries = None
+        self._lock = threading.Lock()
+        self._refreshing = {}
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _store(self, server_id, models):
+        with self._lock:
+            # Re-read first so entries written by other processes are kept
+            self._entries = None
+            self._load()[server_id] = {"fetched": time.time(), "models": models}
+            self._save()
+
+    def _fetch(self, server_id, fetch):
+        models = fetch()
+        # An empty list usually means the server is not set up yet; ask again next time
+        if models:
+            self._store(server_id, models)
+        return models
+
+    def _refresh_in_background(self, server_id, fetch):
+        with self._lock:
+            running = self._refreshing.get(server_id)
+            if running is not None and running.is_alive():
+                return running
+
+            def refresh():
+                try:
+                    self._fetch(server_id, fetch)
+                except Exception:
+                    # Keep serving the stale entry; the next lookup tries again
+                    pass
+
+            thread = threading.Thread(target=refresh, daemon=True)
+            self._refreshing[server_id] = thread
+        thread.start()
+        return thread
+
+    def get(self, server_id, fetch, refresh=False):
+        """
+        Get the models a server offers
+
+        Args:
+            server_id (str): Key for the server (see ApiClient.server_id)
+            fetch (callable): Queries the server, returning a list of model dicts
+            refresh (bool): Fetch now even if a cached entry exists
+
+        Returns:
+            list: Model dicts with 'name' and 'loaded'
+
+        Raises:
+            Exception: Whatever fetch raises, when there is no cached entry to fall back on
+        """
+        with self._lock:
+            entry = self._load().get(server_id)
+            running = self._refreshing.get(server_id)
+
+        if entry is None and not refresh and running is not None and running.is_alive():
+            # A prefetch is already on its way; wait for it rather than asking twice
+            running.join()
+            with self._lock:
+                entry = self._load().get(server_id)
+
+        if entry is None or refresh:
+            return self._fetch(server_id, fetch)
+        if time.time() - entry.get("fetched", 0) > self.ttl:
+            self._refresh_in_background(server_id, fetch)
+        return entry["models"]
+
+    def prefetch(self, server_id, fetch):
+        """Refresh a server's entry in the background if it is missing or stale"""
+        with self._lock:
+            entry = self._load().get(server_id)
+        if entry is None or time.time() - entry.get("fetched", 0) > self.ttl:
+            return self._refresh_in_background(server_id, fetch)
+        return None
+
+    def invalidate(self, server_id=None):
+        """Forget one server's models, or every server's"""
+        with self._lock:
+            entries = self._load()
+            if server_id is None:
+                entries.clear()
+            else:
+                entries.pop(server_id, None)
+            self._save()
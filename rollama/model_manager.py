@@ -1,7 +1,48 @@
 import sys
 import re
+import threading
 import time
-from .api_client import ApiClient
+from .api_client import ApiClient, as_messages
+from .conversation import Conversation
+from .errors import RollamaError, chunk_error
+from .model_catalog import ModelCatalog
+from .response_cache import ResponseCache, DEFAULT_MAX_SIZE_MB, DEFAULT_MAX_AGE_DAYS, is_deterministic
+from .tokens import DEFAULT_NUM_CTX, count_messages, get_counter, prompt_budget
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the new part of the conversation into the summary so far. Keep facts, decisions, "
+    "names, code identifiers and open questions; drop pleasantries. Reply with the summary only."
+)
+
+# Summaries should be faithful rather than creative
+SUMMARY_OPTIONS = {"temperature": 0.2}
+
+
+class _WordSplitter:
+    """Split streamed text into words, emitting newlines as separate items"""
+    
+    def __init__(self):
+        self.current_word = []
+    
+    def feed(self, piece):
+        words = []
+        for char in piece:
+            if char.isspace():
+                if self.current_word:
+                    words.append(''.join(self.current_word))
+                    self.current_word = []
+                if char == '\n':
+                    words.append('\n')
+            else:
+                self.current_word.append(char)
+        return words
+    
+    def flush(self):
+        words = [''.join(self.current_word)] if self.current_word else []
+        self.current_word = []
+        return words
+
 
 class ModelManager:
     """Manages interactions with Ollama models, both local and remote."""
@@ -14,17 +55,14 @@ class ModelManager:
             config (Config): Configuration object
         """
         self.config = config
+        # Probe remote group members in the background; only long-running
+        # processes (the daemon, the GUI) turn this on
+        self.health_checks = False
+        self._cache = None
+        self._catalog = None
     
-    def _get_client(self, remote=None):
-        """
-        Get the API client based on remote configuration
-        
-        Args:
-            remote (str, optional): Remote server name to use
-            
-        Returns:
-            ApiClient: API client instance
-        """
+    def _get_remote_config(self, remote=None):
+        """Resolve a remote name (or the default remote) to its details"""
         remote_config = None
         if remote:
             remote_config = self.config.get_remote(remote)
@@ -32,22 +70,166 @@ class ModelManager:
                 raise ValueError(f"Error: Remote server '{remote}' not found")
         elif self.config.get_remote():
             remote_config = self.config.get_remote()
+        return remote_config
+    
+    def get_remote_group(self, remote=None):
+        """
+        Resolve a remote name (or the default remote) to a RemoteGroup
+        
+        Returns:
+            RemoteGroup or None: The shared group, or None if the name is not a group
+        """
+        group_config = self.config.get_remote_group(remote)
+        if not group_config:
+            return None
+        
+        from .load_balancer import get_group, DEFAULT_HEALTH_INTERVAL
+        name = remote or self.config.config.get("default_remote")
+        members = {}
+        for member in group_config.get("members", []):
+            member_config = self.config.get_remote(member)
+            if member_config:
+                members[member] = member_config
+        if not members:
+            raise ValueError(f"Error: Remote group '{name}' has no usable members")
+        return get_group(name, members, group_config.get("health_interval", DEFAULT_HEALTH_INTERVAL),
+                         health_checks=self.health_checks)
+    
+    def _get_client(self, remote=None, hedge=None):
+        """
+        Get the API client based on remote configuration
+        
+        Args:
+            remote (str, optional): Remote server or remote group name to use
+            hedge (bool, optional): Hedge group requests; None uses the group's setting
+            
+        Returns:
+            ApiClient or GroupClient: API client instance
+        """
+        group = self.get_remote_group(remote)
+        if group:
+            from .load_balancer import GroupClient
+            hedge_settings = dict(self.config.get_remote_group(remote).get("hedge") or {})
+            enabled = hedge_settings.pop("enabled", False) if hedge is None else hedge
+            return GroupClient(group, local_url=self.config.get_local_url(),
+                               hedge=hedge_settings if enabled else None,
+                               keep_alive=self.config.get_keep_alive())
+        return ApiClient(self._get_remote_config(remote), local_url=self.config.get_local_url(),
+                         keep_alive=self.config.get_keep_alive())
+    
+    def _get_async_client(self, remote=None):
+        """
+        Get the asyncio API client based on remote configuration
+        
+        Args:
+            remote (str, optional): Remote server or remote group name to use
+            
+        Returns:
+            AsyncApiClient or AsyncGroupClient: Async API client instance
+        """
+        group = self.get_remote_group(remote)
+        if group:
+            from .load_balancer import AsyncGroupClient
+            return AsyncGroupClient(group, local_url=self.config.get_local_url())
+        from .async_client import AsyncApiClient
+        return AsyncApiClient(self._get_remote_config(remote), local_url=self.config.get_local_url(),
+                              keep_alive=self.config.get_keep_alive())
+    
+    def preconnect(self, remote=None):
+        """
+        Open a pooled connection to a remote in the background, if enabled
+        
+        Args:
+            remote (str, optional): Remote server name to connect to
+        """
+        if not self.config.get_preconnect():
+            return None
+        try:
+            client = self._get_client(remote)
+        except ValueError:
+            return None
+        return client.preconnect(background=True)
+    
+    def warm_up(self, model_name, remote=None, keep_alive=None):
+        """
+        Load a model into memory so the first prompt does not wait for it
         
-        return ApiClient(remote_config)
+        Args:
+            model_name (str): Model to load
+            remote (str, optional): Remote server or remote group name
+            keep_alive (str or int, optional): How long to keep it loaded;
+                defaults to the 'keep_alive' setting
+            
+        Returns:
+            float: Seconds the load took
+            
+        Raises:
+            RollamaError: If the server could not load the model
+        """
+        return self._get_client(remote).warm_model(model_name, keep_alive)
     
-    def run_code_model(self, prompt, remote=None):
+    def start_session(self, model_name, remote=None):
+        """
+        Warm up the session's model and pin the configured models, in the background
+        
+        Does nothing when the 'auto_warm' setting is off. Failures are
+        ignored: the first prompt simply pays for the load as before.
+        
+        Args:
+            model_name (str): Model the session starts with
+            remote (str, optional): Remote server or remote group name
+            
+        Returns:
+            threading.Thread or None: The warm-up thread
+        """
+        if not self.config.get_auto_warm():
+            return None
+        pinned = self.config.get_pinned_models()
+        # Pinned models stay loaded until end_session; others use the normal keep_alive
+        models = [(model_name, -1 if model_name in pinned else None)]
+        models += [(model, -1) for model in pinned if model != model_name]
+        
+        def warm():
+            for model, keep_alive in models:
+                try:
+                    self.warm_up(model, remote, keep_alive)
+                except (RollamaError, ValueError):
+                    pass
+        
+        thread = threading.Thread(target=warm, daemon=True)
+        thread.start()
+        return thread
+    
+    def end_session(self, remote=None):
+        """Let pinned models unload again once their normal keep_alive expires"""
+        if not self.config.get_auto_warm():
+            return
+        keep_alive = self.config.get_keep_alive()
+        for model in self.config.get_pinned_models():
+            try:
+                self.warm_up(model, remote, "5m" if keep_alive is None else keep_alive)
+            except (RollamaError, ValueError):
+                pass
+    
+    def run_code_model(self, prompt, remote=None, split_words=True):
         """
         Run a model specifically for code generation with word-by-word streaming support.
         
         Args:
             prompt (str): Prompt to send to the model
             remote (str, optional): Remote server to use
+            split_words (bool, optional): Yield words and newlines; False yields the
+                text pieces as received, whitespace and all, e.g. for
+                CodeManager.apply_ai_stream to write files from
             
         Returns:
             Generator yielding response words for processing
+            
+        Raises:
+            RollamaError: If the request fails, before or during the stream
         """
         client = self._get_client(remote)
-        current_word = []
+        splitter = _WordSplitter()
         
         try:
             stream_method = getattr(client, 'run_stream', None) or getattr(client, 'chat_stream')
@@ -55,35 +237,121 @@ class ModelManager:
                 response_stream = stream_method(self.config.get_default_model(), prompt)
                 
                 for chunk in response_stream:
+                    error = chunk_error(chunk)
+                    if error is not None:
+                        raise error
                     piece = chunk.get('response', chunk.get('content', ''))
                     if not piece:
                         continue
+                    if not split_words:
+                        yield piece
+                        continue
                         
                     # Split the piece into words while preserving newlines
-                    for char in piece:
-                        if char.isspace():
-                            if current_word:
-                                yield ''.join(current_word)
-                                current_word = []
-                            if char == '\n':
-                                yield '\n'
-                        else:
-                            current_word.append(char)
+                    yield from splitter.feed(piece)
                 
                 # Yield any remaining word
-                if current_word:
-                    yield ''.join(current_word)
+                yield from splitter.flush()
             else:
                 # Fallback to non-streaming mode
                 response = self.run_model(self.config.get_default_model(), prompt, remote=remote, stream=False)
+                if not split_words:
+                    yield response
+                    return
                 # Split response into words and yield them
                 for word in response.split():
                     yield word
                     
+        except RollamaError:
+            raise
         except Exception as e:
-            yield f"\nError in code generation: {str(e)}"
+            raise RollamaError(f"Error in code generation: {e}") from e
 
-    def run_model(self, model_name, prompt, remote=None, stream=True):
+    async def run_code_model_async(self, prompt, remote=None):
+        """
+        Async variant of run_code_model for use on an asyncio event loop.
+        
+        Args:
+            prompt (str): Prompt to send to the model
+            remote (str, optional): Remote server to use
+            
+        Yields:
+            str: Response words, with newlines as separate items
+            
+        Raises:
+            RollamaError: If the request fails
+        """
+        splitter = _WordSplitter()
+        async for piece in self.run_model_async(self.config.get_default_model(), prompt, remote=remote):
+            for word in splitter.feed(piece):
+                yield word
+        for word in splitter.flush():
+            yield word
+
+    async def run_model_async(self, model_name, prompt, remote=None, options=None):
+        """
+        Async variant of run_model that streams instead of printing.
+        
+        Many of these can run concurrently on one event loop, against any mix
+        of local and remote servers.
+        
+        Args:
+            model_name (str): Name of the model to run
+            prompt (str): Prompt to send to the model
+            remote (str, optional): Remote server to use
+            options (dict, optional): Sampling parameters (temperature, top_p, seed, ...)
+            
+        Yields:
+            str: Response text pieces as they arrive
+            
+        Raises:
+            RollamaError: If the request fails
+        """
+        client = self._get_async_client(remote)
+        async for chunk in client.run_stream(model_name, prompt, options):
+            error = chunk_error(chunk)
+            if error is not None:
+                raise error
+            piece = chunk.get('response', chunk.get('content', ''))
+            if piece:
+                yield piece
+
+    def get_cache(self):
+        """Response cache configured from the 'cache' settings, or None if disabled"""
+        if self._cache is None:
+            settings = self.config.get_cache_settings()
+            if not settings.get("enabled", True):
+                return None
+            self._cache = ResponseCache(
+                cache_dir=settings.get("path"),
+                max_size_mb=settings.get("max_size_mb", DEFAULT_MAX_SIZE_MB),
+                max_age_days=settings.get("max_age_days", DEFAULT_MAX_AGE_DAYS)
+            )
+        return self._cache
+    
+    def _cache_key(self, client, model_name, prompt, options):
+        """Cache key for a single-prompt request sent through client"""
+        messages = as_messages(prompt)
+        return ResponseCache.make_key(client.server_id, model_name, messages, options)
+    
+    def cache_for(self, options, use_cache=None):
+        """
+        The response cache to use for a request, or None
+        
+        Args:
+            options (dict or None): The request's sampling parameters
+            use_cache (bool, optional): True to cache whatever the sampling
+                settings, False never to; None caches deterministic requests only
+        
+        Returns:
+            ResponseCache or None: The cache, or None if the request should bypass it
+        """
+        if use_cache is False or (use_cache is None and not is_deterministic(options)):
+            return None
+        return self.get_cache()
+    
+    def run_model(self, model_name, prompt, remote=None, stream=True, options=None, use_cache=None, refresh=False,
+                  hedge=None, out=None, err=None):
         """
         Run a model with the given prompt.
         
@@ -92,53 +360,66 @@ class ModelManager:
             prompt (str): Prompt to send to the model
             remote (str, optional): Remote server to use
             stream (bool, optional): Whether to stream the response. Defaults to True.
+            options (dict, optional): Sampling parameters (temperature, top_p, seed, ...)
+            use_cache (bool, optional): Look up and store the response in the response
+                cache: True always, False never, None (the default) only when the
+                request is deterministic (temperature 0 or a seed)
+            refresh (bool, optional): Ignore any cached response but store the new one
+            hedge (bool, optional): Hedge requests to a remote group; None uses the group's setting
+            out (file, optional): Where streamed output and errors are written, stdout by default
+            err (file, optional): Where warnings are written, stderr by default
             
         Returns:
             If stream=True: str containing full response that was streamed
             If stream=False: str containing full response
+            
+        Raises:
+            RollamaError: If the request fails; with stream=True, whatever was
+                received before the failure has already been written to out
         """
-        client = self._get_client(remote)
+        out = out or sys.stdout
+        client = self._get_client(remote, hedge=hedge)
+        self.check_prompt(model_name, prompt, options, err=err)
+        
+        cache = self.cache_for(options, use_cache)
+        cache_key = self._cache_key(client, model_name, prompt, options) if cache else None
+        cached = cache.get(cache_key) if cache and not refresh else None
         
         try:
             if stream:
                 stream_method = getattr(client, 'run_stream', None) or getattr(client, 'chat_stream')
                 if stream_method:
-                    sys.stdout.write('\n')  # Start on new line
-                    sys.stdout.flush()
+                    out.write('\n')  # Start on new line
+                    out.flush()
                     
-                    response_stream = stream_method(model_name, prompt)
-                    last_chunk = ""
-                    full_response = []  # Collect chunks to build full response
+                    if cached is not None:
+                        # Replay the cached stream chunk by chunk
+                        response_stream = ({'response': piece} for piece in cached)
+                    else:
+                        response_stream = stream_method(model_name, prompt, options)
+                    full_response, pieces, error = self._print_stream(response_stream, out)
+                    if error is not None:
+                        raise error
                     
-                    # Don't show the tag to the user, but still track responses
-                    for chunk in response_stream:
-                        piece = chunk.get('response', chunk.get('content', ''))
-                        if piece:
-                            # Add space between words if needed
-                            if piece[0].isalnum() and last_chunk and last_chunk[-1].isalnum():
-                                sys.stdout.write(' ')
-                                full_response.append(' ')
-                            sys.stdout.write(piece)
-                            full_response.append(piece)
-                            sys.stdout.flush()
-                            last_chunk = piece
-                            
-                    sys.stdout.write('\n')
-                    sys.stdout.flush()
+                    if cache and cached is None and pieces:
+                        cache.put(cache_key, pieces, model=model_name)
                     
                     # Return the collected response
-                    return ''.join(full_response)
+                    return full_response
                 else:
-                    print("\nWarning: Streaming not supported. Falling back to standard mode.")
+                    print("\nWarning: Streaming not supported. Falling back to standard mode.", file=out)
                     stream = False
             
             # Non-streaming mode
             if not stream:
+                if cached is not None:
+                    return ''.join(cached)
+                
                 # Use appropriate methods on the client
                 if hasattr(client, 'run_local_model') and not client.remote:
-                    response = client.run_local_model(model_name, prompt)
+                    response = client.run_local_model(model_name, prompt, options)
                 elif hasattr(client, 'run_remote_model') and client.remote:
-                    response = client.run_remote_model(model_name, prompt)
+                    response = client.run_remote_model(model_name, prompt, options)
                 # Try common method names for the Ollama API as fallback
                 elif hasattr(client, 'run'):
                     response = client.run(model_name, prompt)
@@ -151,39 +432,264 @@ class ModelManager:
                 
                 # Handle different response formats
                 if isinstance(response, dict):
-                    return response.get('response', response.get('content', str(response)))
-                elif isinstance(response, str):
-                    return response
-                else:
-                    return str(response)
+                    response = response.get('response', response.get('content', str(response)))
+                elif not isinstance(response, str):
+                    response = str(response)
+                
+                # Failures raise, so anything that reaches here is model output
+                if cache and response:
+                    cache.put(cache_key, [response], model=model_name)
+                return response
                     
+        except RollamaError:
+            raise
         except Exception as e:
-            error_msg = f"Error running model: {str(e)}"
-            if stream:
-                print(f"\n{error_msg}")
-                return None
-            return error_msg
+            raise RollamaError(f"Error running model: {e}") from e
     
-    def list_models(self, remote=None):
+    def _print_stream(self, response_stream, out=None):
+        """
+        Write streamed chunks to out (stdout by default) as they arrive
+        
+        Pieces are written verbatim: Ollama's tokens carry their own spacing,
+        and a token may be part of a word. Error chunks are not part of the
+        reply; the first one's error is returned for the caller to report.
+        
+        Returns:
+            tuple: (full response text, pieces as received, RollamaError or None)
+        """
+        out = out or sys.stdout
+        pieces = []  # Chunks as received, for the response cache
+        error = None
+        
+        for chunk in response_stream:
+            if chunk.get('error'):
+                error = error or chunk_error(chunk)
+                continue
+            piece = chunk.get('response', chunk.get('content', ''))
+            if piece:
+                pieces.append(piece)
+                out.write(piece)
+                out.flush()
+                
+        out.write('\n')
+        out.flush()
+        return ''.join(pieces), pieces, error
+    
+    def chat(self, model_name, conversation, user_input, remote=None, options=None):
+        """
+        Send the next turn of a conversation and stream the reply to stdout.
+        
+        The whole conversation goes out as a messages array whose earlier
+        turns never change, so servers can reuse their cached prompt prefix.
+        With the local daemon, the 'context' returned by the previous turn is
+        sent instead and only the new input is processed.
+        
+        Args:
+            model_name (str): Name of the model to run
+            conversation (Conversation): History so far; the new turn and reply are appended
+            user_input (str): The user's new message
+            remote (str, optional): Remote server to use
+            options (dict, optional): Sampling parameters (temperature, top_p, seed, ...)
+            
+        Returns:
+            str or None: The reply, or None if it failed (the turn is then dropped)
+        """
+        try:
+            client = self._get_client(remote)
+        except ValueError as e:
+            print(f"\nError running model: {str(e)}")
+            return None
+        
+        # A summary of older turns may still be being written
+        conversation.wait()
+        local = isinstance(client, ApiClient) and not client.remote
+        context = conversation.context_for(client.server_id, model_name) if local else None
+        first_turn = len(conversation) == 0
+        conversation.add("user", user_input)
+        # Per-message counts are kept by the conversation, so this costs nothing per turn
+        self._check_prompt_tokens(conversation.tokens, options)
+        
+        if local and (context or first_turn):
+            response_stream = client.generate_stream(model_name, user_input, context, options)
+        else:
+            response_stream = client.run_stream(model_name, conversation.messages, options)
+        
+        contexts = []
+        
+        def track_context(chunks):
+            for chunk in chunks:
+                if chunk.get('context'):
+                    contexts.append(chunk['context'])
+                yield chunk
+        
+        sys.stdout.write('\n')
+        sys.stdout.flush()
+        try:
+            response, _, error = self._print_stream(track_context(response_stream))
+        except Exception as e:
+            response, error = "", e
+        if error is not None:
+            print(f"\nError running model: {error}")
+        
+        if error is not None or not response:
+            conversation.discard_last()
+            return None
+        conversation.add("assistant", response)
+        if local:
+            conversation.set_context(client.server_id, model_name, contexts[-1] if contexts else None)
+        # Summarize older turns while the user reads the reply
+        conversation.compact()
+        return response
+    
+    def create_conversation(self, model_name, remote=None):
+        """
+        Start a conversation limited to the configured 'history_tokens' budget
+        
+        Turns over budget are summarized by the same model on the same server.
+        
+        Args:
+            model_name (str): Model the conversation is with
+            remote (str, optional): Remote server to use
+            
+        Returns:
+            Conversation: Empty conversation to pass to chat
+        """
+        def summarize(summary, messages):
+            return self.summarize(model_name, messages, summary, remote)
+        
+        # Never let the history alone overflow the context window
+        budget = self.prompt_budget()
+        history_tokens = self.config.get_history_tokens()
+        if history_tokens:
+            budget = min(budget, history_tokens)
+        return Conversation(budget=budget, summarize=summarize, counter=self.get_token_counter(model_name))
+    
+    def summarize(self, model_name, messages, summary=None, remote=None):
+        """
+        Condense chat messages into a short summary
+        
+        Args:
+            model_name (str): Model to write the summary
+            messages (list): Chat messages ({'role', 'content'} dicts) to condense
+            summary (str, optional): Summary of what came before messages, to fold in
+            remote (str, optional): Remote server to use
+            
+        Returns:
+            str: The summary
+            
+        Raises:
+            RollamaError: If the model could not be run
+        """
+        transcript = "\n\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
+        earlier = f"Summary so far:\n{summary}\n\n" if summary else ""
+        prompt = [
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": f"{earlier}Conversation to add:\n{transcript}"},
+        ]
+        client = self._get_client(remote)
+        if client.remote:
+            response = client.run_remote_model(model_name, prompt, SUMMARY_OPTIONS)
+        else:
+            response = client.run_local_model(model_name, prompt, SUMMARY_OPTIONS)
+        return response.strip()
+    
+    def get_token_counter(self, model_name=None):
+        """Exact token counter for the model if its tokenizer is available, otherwise the estimator"""
+        return get_counter(model_name, self.config.get_tokenizer_files())
+    
+    def context_window(self, options=None):
+        """Context window in tokens: the request's num_ctx, the configured one, or Ollama's default"""
+        return (options or {}).get("num_ctx") or self.config.get_num_ctx() or DEFAULT_NUM_CTX
+    
+    def prompt_budget(self, options=None):
+        """Tokens a prompt may use, leaving room in the context window for the reply"""
+        return prompt_budget(self.context_window(options))
+    
+    def count_tokens(self, model_name, prompt):
+        """
+        Count the tokens in a prompt
+        
+        Args:
+            model_name (str): Model whose tokenizer to use, if available
+            prompt (str or list): Prompt, or chat messages ({'role', 'content'} dicts)
+            
+        Returns:
+            int: Token count, exact or estimated
+        """
+        counter = self.get_token_counter(model_name)
+        if isinstance(prompt, str):
+            return counter.count(prompt)
+        return count_messages(prompt, counter)
+    
+    def check_prompt(self, model_name, prompt, options=None, err=None):
+        """
+        Warn on err (stderr by default) if a prompt will not fit in the model's context window
+        
+        Returns:
+            tuple: (prompt tokens, tokens available for the prompt)
+        """
+        return self._check_prompt_tokens(self.count_tokens(model_name, prompt), options, err)
+    
+    def _check_prompt_tokens(self, tokens, options=None, err=None):
+        budget = self.prompt_budget(options)
+        if tokens > budget:
+            (err or sys.stderr).write(
+                f"Warning: the prompt is about {tokens} tokens but only {budget} fit in the "
+                f"{self.context_window(options)}-token context window (num_ctx); the start will be cut off\n"
+            )
+        return tokens, budget
+    
+    def get_model_catalog(self):
+        """Shared model catalog, with the TTL from the 'catalog_ttl' setting"""
+        if self._catalog is None:
+            self._catalog = ModelCatalog(ttl=self.config.get_catalog_ttl())
+        return self._catalog
+    
+    def get_models(self, remote=None, refresh=False):
+        """
+        Get the models a server offers, from the catalog where possible
+        
+        Args:
+            remote (str, optional): Remote server or remote group name
+            refresh (bool, optional): Query the server even if the catalog has an entry
+            
+        Returns:
+            list: Model dicts with 'name', 'loaded' and, where known, 'size'
+        """
+        client = self._get_client(remote)
+        return self.get_model_catalog().get(client.server_id, client.fetch_model_catalog, refresh=refresh)
+    
+    def prefetch_models(self, remote=None):
+        """Refresh the catalog for a server in the background if it is missing or stale"""
+        try:
+            client = self._get_client(remote)
+        except ValueError:
+            return None
+        return self.get_model_catalog().prefetch(client.server_id, client.fetch_model_catalog)
+    
+    def list_models(self, remote=None, refresh=False):
         """
         List available models
         
         Args:
             remote (str, optional): Remote server name to list models from
+            refresh (bool, optional): Query the server even if the catalog has an entry
             
         Returns:
             list: Available models
         """
         client = self._get_client(remote)
+        source = f"Remote ({remote or 'default'})" if client.remote else "Local"
         
-        if client.remote_config:
-            models = client.list_remote_models()
-            source = f"Remote ({remote or 'default'})"
-        else:
-            models = client.list_local_models()
-            source = "Local"
+        try:
+            models = self.get_models(remote, refresh=refresh)
+        except RollamaError as e:
+            return [f"Error listing models on {source}: {e}"]
             
         if not models:
             return [f"No models found on {source}"]
             
-        return [f"{model} ({source})" for model in models]
+        return [
+            f"{model['name']} ({source}, loaded)" if model.get("loaded") else f"{model['name']} ({source})"
+            for model in models
+        ]
@@ -0,0 +1,168 @@
+"""Symbol outlines of source files.
+
+An outline stands in for a file that is too large to put in a prompt whole:
+its imports, classes, function signatures and the first line of each
+docstring, usually a tenth of the file's tokens or less. Python files are
+outlined from their syntax tree; other files, and Python that does not
+parse, fall back to picking out lines that look like definitions.
+"""
+import ast
+import re
+
+# Lines kept per outline
+MAX_OUTLINE_LINES = 80
+
+# Bump when outlines change shape, so cached ones are recomputed
+OUTLINE_VERSION = 1
+
+# Lines that start a definition, in the common languages
+_DEFINITION = re.compile(
+    r"^\s*(?:(?:export|default|public|private|protected|static|abstract|final|async|pub|"
+    r"override|internal|inline|virtual)\s+)*"
+    r"(?:def|class|interface|struct|enum|trait|impl|fn|func|function|module|type|"
+    r"namespace|const|let|var)\b"
+    r"|^#{1,6}\s"
+)
+
+
+def _limit(lines, max_lines):
+    if len(lines) > max_lines:
+        lines = lines[:max_lines] + [f"... {len(lines) - max_lines} more lines"]
+    return "\n".join(lines)
+
+
+def regex_outline(text, max_lines=MAX_OUTLINE_LINES):
+    """
+    The lines of a file that look like definitions: classes, functions, headings
+
+    Args:
+        text (str): File contents
+        max_lines (int, optional): Most lines to keep
+
+    Returns:
+        str: Matching lines, stripped of trailing whitespace, or "" if there are none
+    """
+    return _limit([line.rstrip() for line in text.splitlines() if _DEFINITION.match(line)], max_lines)
+
+
+def _docstring_line(node):
+    docstring = ast.get_docstring(node)
+    if not docstring:
+        return None
+    first = docstring.strip().splitlines()[0].strip()
+    return f'"""{first}"""'
+
+
+def _segment(text, node):
+    """Source text of a node, on one line"""
+    segment = ast.get_source_segment(text, node) or ""
+    return " ".join(segment.split())
+
+
+def _argument(text, arg, default=None):
+    # An arg's source includes its annotation
+    result = _segment(text, arg)
+    if default is not None:
+        result += (" = " if arg.annotation is not None else "=") + _segment(text, default)
+    return result
+
+
+def _arguments(text, args):
+    """A function's parameter list; ast.arguments has no source position of its own"""
+    parts = []
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    for number, (arg, default) in enumerate(zip(positional, defaults), 1):
+        parts.append(_argument(text, arg, default))
+        if number == len(args.posonlyargs):
+            parts.append("/")
+    if args.vararg:
+        parts.append("*" + _argument(text, args.vararg))
+    elif args.kwonlyargs:
+        parts.append("*")
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        parts.append(_argument(text, arg, default))
+    if args.kwarg:
+        parts.append("**" + _argument(text, args.kwarg))
+    return ", ".join(parts)
+
+
+def _signature(text, node):
+    keyword = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    signature = f"{keyword} {node.name}({_arguments(text, node.args)})"
+    if node.returns is not None:
+        signature += f" -> {_segment(text, node.returns)}"
+    return signature + ":"
+
+
+def _outline_body(text, body, indent, lines):
+    for node in body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and not indent:
+            lines.append(_segment(text, node))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            for decorator in node.decorator_list:
+                lines.append(f"{indent}@{_segment(text, decorator)}")
+            if isinstance(node, ast.ClassDef):
+                bases = [_segment(text, base) for base in node.bases + node.keywords]
+                lines.append(f"{indent}class {node.name}" + (f"({', '.join(bases)})" if bases else "") + ":")
+            else:
+                lines.append(indent + _signature(text, node))
+            docstring = _docstring_line(node)
+            if docstring:
+                lines.append(f"{indent}    {docstring}")
+            if isinstance(node, ast.ClassDef):
+                # Methods and nested classes; function bodies are left out
+                _outline_body(text, node.body, indent + "    ", lines)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = [target.id for target in targets if isinstance(target, ast.Name)]
+            # Constants at module level, and class attributes
+            if names and (indent or all(name.isupper() for name in names)):
+                annotation = f": {_segment(text, node.annotation)}" if isinstance(node, ast.AnnAssign) else ""
+                lines.append(f"{indent}{' = '.join(names)}{annotation} = ...")
+
+
+def python_outline(text, max_lines=MAX_OUTLINE_LINES):
+    """
+    Outline of Python source from its syntax tree
+
+    Args:
+        text (str): Python source
+        max_lines (int, optional): Most lines to keep
+
+    Returns:
+        str: Module docstring, imports, constants, classes with their
+            attributes and methods, and functions, with signatures and the
+            first line of each docstring
+
+    Raises:
+        SyntaxError: If the source does not parse
+    """
+    tree = ast.parse(text)
+    lines = []
+    docstring = _docstring_line(tree)
+    if docstring:
+        lines.append(docstring)
+    _outline_body(text, tree.body, "", lines)
+    return _limit(lines, max_lines)
+
+
+def file_outline(text, language=None, max_lines=MAX_OUTLINE_LINES):
+    """
+    Outline of a file in the best way available for its language
+
+    Args:
+        text (str): File contents
+        language (str, optional): Language, as detected by the workspace index
+        max_lines (int, optional): Most lines to keep
+
+    Returns:
+        str: The outline, or "" if nothing in the file looks like a definition
+    """
+    if language == "python":
+        try:
+            return python_outline(text, max_lines)
+        except (SyntaxError, ValueError):
+            # Half-written code; the definition lines are still worth having
+            pass
+    return regex_outline(text, max_lines)
@@ -0,0 +1,282 @@
+"""Apply model-written edits: search/replace blocks and unified diffs.
+
+Rewriting a whole file to change one line costs as many output tokens as the
+file is long, and output tokens are the slowest part of generation. Edits
+are written as search/replace blocks or unified diff hunks instead and
+applied here.
+
+Models copy the text they are replacing imperfectly, so each hunk is looked
+for with growing tolerance: exactly, then ignoring trailing whitespace, then
+ignoring indentation (which is carried over to the replacement), then by
+similarity. Line numbers in hunk headers only break ties between matches.
+"""
+import difflib
+import re
+
+from .errors import RollamaError
+
+SEARCH_MARKER = re.compile(r"^<{5,9} ?SEARCH\s*$")
+DIVIDER = re.compile(r"^={5,9}\s*$")
+REPLACE_MARKER = re.compile(r"^>{5,9} ?REPLACE\s*$")
+
+# Models often leave out the line numbers, or the whole range
+HUNK_HEADER = re.compile(r"^@@(?: -(\d+)(?:,\d+)?)?")
+
+# Lowest similarity at which a stretch of the file is taken for a hunk's text
+FUZZY_THRESHOLD = 0.85
+
+
+class PatchError(RollamaError):
+    """A patch could not be parsed, or some of its hunks were not found"""
+
+
+class Hunk:
+    """One replacement: the lines to find, what replaces them, and where they were"""
+
+    def __init__(self, old, new, line=None):
+        """
+        Args:
+            old (list): Lines to replace; empty for a pure insertion
+            new (list): Replacement lines
+            line (int, optional): 0-based line where old started, from a diff header
+        """
+        self.old = old
+        self.new = new
+        self.line = line
+
+
+def _first_line(text):
+    for line in text.splitlines():
+        if line.strip():
+            return line
+    return ""
+
+
+def is_patch(text):
+    """Whether text is search/replace blocks or a unified diff rather than file contents"""
+    first = _first_line(text)
+    return bool(SEARCH_MARKER.match(first)) or first.startswith(("@@", "--- ", "diff --git "))
+
+
+def split_diff(text):
+    """
+    Split a unified diff into per-file patches
+
+    Args:
+        text (str): Diff with '--- a/path' / '+++ b/path' file headers
+
+    Returns:
+        list: (path, patch text) pairs; patch text is None for a deleted file
+    """
+    files = []
+    path = None
+    lines = []
+    old_path = None
+    text_lines = text.splitlines()
+    for number, line in enumerate(text_lines):
+        # File headers come in '--- ' / '+++ ' pairs; either alone is a hunk line
+        if line.startswith("--- ") and text_lines[number + 1:number + 2] and \
+                text_lines[number + 1].startswith("+++ "):
+            old_path = line[4:].split("\t")[0].strip()
+            continue
+        if line.startswith("+++ ") and number and text_lines[number - 1].startswith("--- "):
+            if path:
+                files.append((path, "\n".join(lines) + "\n"))
+            new_path = line[4:].split("\t")[0].strip()
+            if new_path == "/dev/null":
+                files.append((_strip_prefix(old_path), None))
+                path = None
+            else:
+                path = _strip_prefix(new_path)
+            lines = []
+            continue
+        if path:
+            lines.append(line)
+    if path:
+        files.append((path, "\n".join(lines) + "\n"))
+    return [(path, patch) for path, patch in files if path]
+
+
+def _strip_prefix(path):
+    if path and path[:2] in ("a/", "b/"):
+        return path[2:]
+    return path
+
+
+def parse_patch(text):
+    """
+    Read the hunks of a patch
+
+    Args:
+        text (str): Search/replace blocks, or unified diff hunks for one file
+
+    Returns:
+        list: Hunk objects in order
+
+    Raises:
+        PatchError: If there are no hunks or a block is not terminated
+    """
+    lines = text.splitlines()
+    if any(SEARCH_MARKER.match(line) for line in lines):
+        hunks = _parse_search_replace(lines)
+    else:
+        hunks = _parse_unified(lines)
+    if not hunks:
+        raise PatchError("No hunks found in patch")
+    return hunks
+
+
+def _parse_search_replace(lines):
+    hunks = []
+    old = new = None
+    for line in lines:
+        if new is not None:
+            if REPLACE_MARKER.match(line):
+                hunks.append(Hunk(old, new))
+                old = new = None
+            else:
+                new.append(line)
+        elif old is not None:
+            if DIVIDER.match(line):
+                new = []
+            else:
+                old.append(line)
+        elif SEARCH_MARKER.match(line):
+            old = []
+    if old is not None:
+        raise PatchError("Unterminated SEARCH/REPLACE block")
+    return hunks
+
+
+def _parse_unified(lines):
+    hunks = []
+    hunk = None
+    for line in lines:
+        header = HUNK_HEADER.match(line)
+        if header:
+            start = header.group(1)
+            hunk = Hunk([], [], max(int(start) - 1, 0) if start else None)
+            hunks.append(hunk)
+        elif hunk is None or line.startswith("\\"):
+            # File headers before the first hunk, or '\ No newline at end of file'
+            continue
+        elif line.startswith("-"):
+            hunk.old.append(line[1:])
+        elif line.startswith("+"):
+            hunk.new.append(line[1:])
+        else:
+            # Context; models sometimes drop the leading space
+            context = line[1:] if line.startswith(" ") else line
+            hunk.old.append(context)
+            hunk.new.append(context)
+    # A hunk with no changes in it has nothing to apply
+    return [hunk for hunk in hunks if hunk.old != hunk.new]
+
+
+def _indent(line):
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _reindent(new, old, found):
+    """Shift the replacement by the indentation the matched text differs by"""
+    old_line = next((line for line in old if line.strip()), None)
+    found_line = next((line for line in found if line.strip()), None)
+    if old_line is None or found_line is None:
+        return new
+    have, want = _indent(old_line), _indent(found_line)
+    if have == want:
+        return new
+    if want.startswith(have):
+        extra = want[len(have):]
+        return [extra + line if line.strip() else line for line in new]
+    if have.startswith(want):
+        return [want + line[len(have):] if line.startswith(have) else line for line in new]
+    return new
+
+
+def _closest(positions, hint, start):
+    # Prefer matches after the previous hunk, then the one nearest the hint
+    return min(positions, key=lambda at: (at < start, abs(at - hint)))
+
+
+def _locate(lines, hunk, hint, start):
+    """Where a hunk's old text is in lines, and its replacement fitted to what was found"""
+    size = len(hunk.old)
+    last = len(lines) - size
+    for normalize, reindent in ((None, False), (str.rstrip, False), (str.strip, True)):
+        if normalize is None:
+            target, text = hunk.old, lines
+        else:
+            target = [normalize(line) for line in hunk.old]
+            text = [normalize(line) for line in lines]
+        positions = [at for at in range(last + 1)
+                     if text[at] == target[0] and text[at:at + size] == target]
+        if positions:
+            at = _closest(positions, hint, start)
+            new = _reindent(hunk.new, hunk.old, lines[at:at + size]) if reindent else hunk.new
+            return at, new
+
+    # Nothing close enough to match line for line; find the most similar stretch
+    matcher = difflib.SequenceMatcher(None)
+    matcher.set_seq2("\n".join(line.strip() for line in hunk.old))
+    best = None
+    for at in range(last + 1):
+        matcher.set_seq1("\n".join(line.strip() for line in lines[at:at + size]))
+        if matcher.real_quick_ratio() < FUZZY_THRESHOLD or matcher.quick_ratio() < FUZZY_THRESHOLD:
+            continue
+        ratio = matcher.ratio()
+        if ratio >= FUZZY_THRESHOLD and (
+                best is None or ratio > best[0]
+                or (ratio == best[0] and abs(at - hint) < abs(best[1] - hint))):
+            best = (ratio, at)
+    if best is None:
+        return None
+    at = best[1]
+    return at, _reindent(hunk.new, hunk.old, lines[at:at + size])
+
+
+def apply_patch(content, patch):
+    """
+    Apply a patch to a file's contents
+
+    Either every hunk applies or none do.
+
+    Args:
+        content (str): Current file contents ("" for a new file)
+        patch (str): Search/replace blocks or unified diff hunks
+
+    Returns:
+        str: The patched contents
+
+    Raises:
+        PatchError: If the patch cannot be parsed or a hunk cannot be placed
+    """
+    hunks = parse_patch(patch)
+    lines = content.splitlines()
+    failed = []
+    # Lines the hunks applied so far added, to correct later hunks' line numbers
+    offset = 0
+    start = 0
+    for number, hunk in enumerate(hunks, 1):
+        hint = hunk.line + offset if hunk.line is not None else start
+        if not hunk.old:
+            # Pure insertion: at its line if the diff gave one, otherwise at the end
+            at = min(hint, len(lines)) if hunk.line is not None else len(lines)
+            new, size = hunk.new, 0
+        else:
+            found = _locate(lines, hunk, hint, start)
+            if found is None:
+                failed.append(number)
+                continue
+            at, new = found
+            size = len(hunk.old)
+        lines[at:at + size] = new
+        offset += len(new) - size
+        start = at + len(new)
+
+    if failed:
+        numbers = ", ".join(str(number) for number in failed)
+        raise PatchError(f"Could not find hunk {numbers} of {len(hunks)}")
+    if not lines:
+        return ""
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,191 @@
+"""Per-remote concurrency limits and token-bucket rate limiting.
+
+A RemoteLimiter is shared by every client in the process that talks to the
+same server, so the GUI, a background job and a batch run all draw from the
+same budget. Callers wait for capacity rather than getting an error, which
+keeps an oversubscribed server from thrashing model loads.
+"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+# Remote settings keys that enable limiting
+LIMIT_KEYS = ("max_concurrency", "requests_per_second", "tokens_per_second")
+
+# Poll interval for async waiters on the thread-level semaphore
+_ASYNC_POLL = 0.01
+
+
+class TokenBucket:
+    """Thread-safe token bucket that may go into debt"""
+
+    def __init__(self, rate, burst=None):
+        """
+        Initialize the bucket
+
+        Args:
+            rate (float): Tokens added per second
+            burst (float, optional): Bucket capacity, one second's worth by default
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst) if burst else max(self.rate, 1.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount=1):
+        """
+        Take tokens now and report how long the caller must wait to honour the rate
+
+        Args:
+            amount (float): Tokens to take; 0 only waits for the bucket to leave debt
+
+        Returns:
+            float: Seconds to wait before proceeding
+        """
+        with self._lock:
+            self._refill()
+            if amount:
+                self.level -= amount
+                deficit = -self.level
+            else:
+                deficit = -self.level if self.level < 0 else 0.0
+        return max(0.0, deficit / self.rate)
+
+    def charge(self, amount):
+        """Take tokens after the fact, e.g. once a response's size is known"""
+        with self._lock:
+            self._refill()
+            self.level -= amount
+
+
+class RemoteLimiter:
+    """Concurrency and rate limits for one remote server"""
+
+    def __init__(self, max_concurrency=None, requests_per_second=None, tokens_per_second=None):
+        """
+        Initialize the limiter
+
+        Args:
+            max_concurrency (int, optional): Requests allowed in flight at once
+            requests_per_second (float, optional): Sustained request rate
+            tokens_per_second (float, optional): Sustained prompt + completion token rate
+        """
+        self.max_concurrency = None
+        self._semaphore = None
+        self.requests = None
+        self.tokens = None
+        self.configure(max_concurrency, requests_per_second, tokens_per_second)
+
+    def configure(self, max_concurrency=None, requests_per_second=None, tokens_per_second=None):
+        """Apply new limits; requests already in flight keep their slots"""
+        if max_concurrency != self.max_concurrency:
+            self.max_concurrency = max_concurrency
+            self._semaphore = threading.Semaphore(max_concurrency) if max_concurrency else None
+        if not requests_per_second:
+            self.requests = None
+        elif self.requests is None or self.requests.rate != requests_per_second:
+            self.requests = TokenBucket(requests_per_second)
+        if not tokens_per_second:
+            self.tokens = None
+        elif self.tokens is None or self.tokens.rate != tokens_per_second:
+            self.tokens = TokenBucket(tokens_per_second)
+
+    def _delay(self):
+        delay = 0.0
+        if self.requests:
+            delay = self.requests.reserve(1)
+        if self.tokens:
+            # Token usage is only known afterwards, so just wait out any debt
+            delay = max(delay, self.tokens.reserve(0))
+        return delay
+
+    def record_tokens(self, count):
+        """Charge the tokens a finished request used against the token rate"""
+        if self.tokens and count:
+            self.tokens.charge(count)
+
+    @contextmanager
+    def slot(self):
+        """Block until a request may be sent, holding a concurrency slot until exit"""
+        semaphore = self._semaphore
+        if semaphore:
+            semaphore.acquire()
+        try:
+            delay = self._delay()
+            if delay:
+                time.sleep(delay)
+            yield
+        finally:
+            if semaphore:
+                semaphore.release()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """Async variant of slot that waits without blocking the event loop"""
+        semaphore = self._semaphore
+        if semaphore:
+            # The semaphore is shared with threads, so poll instead of awaiting it
+            while not semaphore.acquire(blocking=False):
+                await asyncio.sleep(_ASYNC_POLL)
+        try:
+            delay = self._delay()
+            if delay:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            if semaphore:
+                semaphore.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(remote):
+    """
+    Get the process-wide limiter for a remote
+
+    Args:
+        remote (dict): Remote server details; limits are read from LIMIT_KEYS
+
+    Returns:
+        RemoteLimiter or None: Shared limiter, or None if the remote has no limits
+    """
+    if not remote or not any(remote.get(key) for key in LIMIT_KEYS):
+        return None
+    settings = {key: remote.get(key) for key in LIMIT_KEYS}
+    with _limiters_lock:
+        limiter = _limiters.get(remote["url"])
+        if limiter is None:
+            limiter = _limiters[remote["url"]] = RemoteLimiter(**settings)
+        else:
+            limiter.configure(**settings)
+    return limiter
+
+
+def count_tokens(chunks_seen, usage=None, text=""):
+    """
+    Best estimate of the tokens a response used
+
+    Args:
+        chunks_seen (int): Content chunks streamed (roughly one token each)
+        usage (dict, optional): Server-reported usage, preferred when present
+        text (str): Response text, used when nothing else is known
+
+    Returns:
+        int: Token count
+    """
+    if usage:
+        total = usage.get("total_tokens")
+        if total is None:
+            total = (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+        if total:
+            return total
+    return chunks_seen or len(text) // 4
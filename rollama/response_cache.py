@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+DEFAULT_MAX_SIZE_MB = 256
+DEFAULT_MAX_AGE_DAYS = 7
+
+# Writes between full scans of the cache, which also drop expired entries
+EVICT_EVERY = 256
+
+
+def normalize_messages(messages):
+    """Canonical form of a message list, insensitive to line endings and trailing whitespace"""
+    normalized = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, str):
+            content = "\n".join(line.rstrip() for line in content.replace("\r\n", "\n").split("\n")).strip()
+        normalized.append({"role": message.get("role", "user"), "content": content})
+    return normalized
+
+
+def is_deterministic(options):
+    """
+    Whether a request's sampling settings make its reply repeatable
+
+    Only such replies are cached unless the caller asks otherwise; replaying
+    one sampled answer to a prompt meant to vary would hide the variation.
+
+    Args:
+        options (dict or None): Sampling parameters
+
+    Returns:
+        bool: True if the temperature is 0 or a seed is set
+    """
+    options = options or {}
+    return options.get("temperature") == 0 or options.get("seed") is not None
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of model responses.
+
+    Each entry stores the streamed chunks of one response so a hit can be
+    replayed chunk by chunk. An entry's mtime is its last access time, which
+    drives LRU eviction once the cache exceeds its size limit; entries older
+    than the age limit are discarded on lookup and during eviction.
+
+    Eviction stats every entry, so it does not run on every write: the total
+    size is kept in memory from the last scan and the cache is scanned again
+    only when that passes the limit, or every EVICT_EVERY writes to account
+    for other processes sharing the directory.
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=DEFAULT_MAX_SIZE_MB, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir (str or Path, optional): Cache location, ~/.rollama/cache by default
+            max_size_mb (float): Total size limit for all entries
+            max_age_days (float): Entries older than this are never returned
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / ".rollama" / "cache"
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.max_age = max_age_days * 24 * 3600
+        # Total size of the entries as of the last scan plus this process's writes since
+        self._size = None
+        self._writes = 0
+
+    @staticmethod
+    def make_key(remote_url, model, messages, options=None):
+        """
+        Build the cache key for a request
+
+        Args:
+            remote_url (str): Server the request is sent to
+            model (str): Model name
+            messages (list): Chat messages ({'role', 'content'} dicts)
+            options (dict, optional): Sampling parameters
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        material = json.dumps(
+            {
+                "remote": remote_url,
+                "model": model,
+                "messages": normalize_messages(messages),
+                "options": options or {},
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """
+        Look up a cached response
+
+        Args:
+            key (str): Cache key from make_key
+
+        Returns:
+            list or None: Cached chunks, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("created", 0) > self.max_age:
+            self._remove(path)
+            return None
+
+        try:
+            # Record the access for LRU ordering
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry.get("chunks", [])
+
+    def put(self, key, chunks, **metadata):
+        """
+        Store a response
+
+        Args:
+            key (str): Cache key from make_key
+            chunks (list): Response chunks in the order they were streamed
+            **metadata: Extra fields kept with the entry (model, remote, ...)
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = dict(metadata, created=time.time(), chunks=list(chunks))
+
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+            size = path.stat().st_size
+        except OSError:
+            self._remove(Path(tmp_path))
+            return
+
+        self._writes += 1
+        if self._size is not None:
+            self._size += size - replaced
+        if self._size is None or self._size > self.max_size or self._writes >= EVICT_EVERY:
+            self.evict()
+
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    @staticmethod
+    def _remove(path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Drop expired entries, then least recently used ones until under the size limit
+
+        Returns:
+            int: Number of entries removed
+        """
+        now = time.time()
+        removed = 0
+        live = []
+        for mtime, size, path in self._entries():
+            # mtime is refreshed on every hit, so an expired mtime implies an expired entry
+            if now - mtime > self.max_age:
+                self._remove(path)
+                removed += 1
+            else:
+                live.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in live)
+        if total > self.max_size:
+            for mtime, size, path in sorted(live):
+                self._remove(path)
+                removed += 1
+                total -= size
+                if total <= self.max_size:
+                    break
+        self._size = total
+        self._writes = 0
+        return removed
+
+    def clear(self):
+        """Remove every cached response"""
+        entries = self._entries()
+        for _, _, path in entries:
+            self._remove(path)
+        self._size = 0
+        return len(entries)
+
+    def stats(self):
+        """
+        Summarize the cache contents
+
+        Returns:
+            dict: entries, size in bytes, and the cache directory
+        """
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "size": sum(size for _, size, _ in entries),
+            "path": str(self.cache_dir),
+        }
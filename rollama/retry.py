@@ -0,0 +1,212 @@
+"""Retries with jittered exponential backoff and per-remote circuit breakers.
+
+Only failures that happen before a response starts are retried: connection
+errors and 429/5xx statuses. Once tokens are streaming, a failure is reported
+to the caller rather than replayed, so output is never duplicated.
+"""
+import asyncio
+import random
+import threading
+import time
+
+from .errors import CircuitOpenError, HTTPStatusError, RemoteError
+
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 10.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 30.0
+
+
+class RetryPolicy:
+    """How many times, and how long apart, to resend a failed request"""
+
+    def __init__(self, retries=DEFAULT_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX):
+        """
+        Args:
+            retries (int): Extra attempts after the first
+            backoff_base (float): Upper bound of the first delay, doubled per attempt
+            backoff_max (float): Cap on any single delay
+        """
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def from_remote(cls, remote):
+        """Build the policy from a remote's 'retries' setting"""
+        retries = remote.get("retries") if remote else None
+        return cls(DEFAULT_RETRIES if retries is None else retries)
+
+    def delay(self, attempt, error=None):
+        """
+        Seconds to wait before retry number attempt (0-based)
+
+        Uses "full jitter" so clients that failed together do not retry in
+        lockstep. A server's Retry-After is honoured when it is longer.
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to a server that keeps failing.
+
+    After `threshold` consecutive failures the breaker opens and requests
+    fail immediately with CircuitOpenError. Once `cooldown` seconds pass,
+    one trial request is let through; its success closes the breaker and
+    its failure re-opens it for another cooldown.
+    """
+
+    def __init__(self, remote, threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN):
+        self.remote = remote
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_request(self):
+        """
+        Check that a request may be sent
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or a trial is already in flight
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - self.opened_at)
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(self.remote, max(remaining, 0))
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+    def abandon_trial(self):
+        """Let another trial through when a request ended without a verdict on the server"""
+        with self._lock:
+            self._trial = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(remote):
+    """
+    Get the process-wide circuit breaker for a remote
+
+    Args:
+        remote (dict): Remote server details (url, breaker_threshold, breaker_cooldown)
+
+    Returns:
+        CircuitBreaker: Shared breaker for the remote's URL
+    """
+    threshold = remote.get("breaker_threshold") or DEFAULT_FAILURE_THRESHOLD
+    cooldown = remote.get("breaker_cooldown") or DEFAULT_COOLDOWN
+    with _breakers_lock:
+        breaker = _breakers.get(remote["url"])
+        if breaker is None:
+            breaker = _breakers[remote["url"]] = CircuitBreaker(remote["url"], threshold, cooldown)
+        else:
+            breaker.threshold = threshold
+            breaker.cooldown = cooldown
+    return breaker
+
+
+def is_server_failure(error):
+    """Whether error suggests the server is unwell, rather than the request being bad"""
+    # A 4xx other than 429 is the caller's fault, not a sign the server is down
+    return not isinstance(error, HTTPStatusError) or error.retryable
+
+
+def call_with_retry(send, policy, breaker):
+    """
+    Send a request, retrying transient failures
+
+    Args:
+        send (callable): Sends the request and returns the response, raising
+            RemoteError on failure
+        policy (RetryPolicy): Retry settings
+        breaker (CircuitBreaker): Breaker for the target server
+
+    Returns:
+        The value returned by send
+
+    Raises:
+        RemoteError: The last failure once retries are exhausted
+    """
+    attempt = 0
+    while True:
+        breaker.before_request()
+        try:
+            result = send()
+        except RemoteError as e:
+            error = e
+        except BaseException:
+            # A bug, an interrupt or a cancelled task says nothing about the server, but a
+            # half-open breaker must not be left waiting forever for this trial's outcome
+            breaker.abandon_trial()
+            raise
+        else:
+            breaker.record_success()
+            return result
+        if is_server_failure(error):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if not error.retryable or attempt >= policy.retries:
+            raise error
+        time.sleep(policy.delay(attempt, error))
+        attempt += 1
+
+
+async def async_call_with_retry(send, policy, breaker):
+    """Async variant of call_with_retry; send is a coroutine function"""
+    attempt = 0
+    while True:
+        breaker.before_request()
+        try:
+            result = await send()
+        except RemoteError as e:
+            error = e
+        except BaseException:
+            # Including cancellation; see call_with_retry
+            breaker.abandon_trial()
+            raise
+        else:
+            breaker.record_success()
+            return result
+        if is_server_failure(error):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if not error.retryable or attempt >= policy.retries:
+            raise error
+        await asyncio.sleep(policy.delay(attempt, error))
+        attempt += 1
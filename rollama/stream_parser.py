@@ -0,0 +1,294 @@
+"""Incremental parsers for streamed model responses.
+
+Remote servers stream OpenAI-style Server-Sent Events and the Ollama daemon
+streams newline-delimited JSON. Both parsers work directly on the raw bytes
+read from the socket: frames may be split across reads, and JSON payloads
+are handed to json.loads as bytes without an intermediate decode per line.
+"""
+import json
+import re
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    # json.loads on bytes sniffs the encoding on every call; decoding
+    # ourselves and going straight to the scanner is markedly faster
+    _raw_decode = json.JSONDecoder().raw_decode
+
+    def _loads(payload):
+        return _raw_decode(payload.decode("utf-8").strip())[0]
+
+DONE = b"[DONE]"
+
+_LINE_BREAK = re.compile(rb"\r\n|\r|\n")
+
+
+class _LineBuffer:
+    """Accumulate bytes and split off complete lines"""
+
+    def __init__(self):
+        self._tail = b""
+
+    def feed(self, data, final=False):
+        """
+        Add data and return the complete lines it finishes
+
+        Args:
+            data (bytes): Next piece of the body
+            final (bool): Treat the end of data as the end of a line
+
+        Returns:
+            list: Lines as bytes, without line terminators
+        """
+        if self._tail:
+            data = self._tail + data
+
+        if b"\r" in data:
+            held = b""
+            if data[-1:] == b"\r" and not final:
+                # A trailing \r may be the first half of a \r\n split across reads
+                data, held = data[:-1], b"\r"
+            lines = _LINE_BREAK.split(data)
+            self._tail = lines.pop() + held
+        else:
+            # Fast path for the overwhelmingly common \n-terminated stream
+            lines = data.split(b"\n")
+            self._tail = lines.pop()
+
+        if final and self._tail:
+            lines.append(self._tail)
+            self._tail = b""
+        return lines
+
+
+class SSEParser:
+    """Incremental text/event-stream parser yielding each event's data"""
+
+    def __init__(self):
+        self._lines = _LineBuffer()
+        self._data = []
+        self.last_event_id = None
+
+    def feed(self, data):
+        """
+        Parse the next piece of the stream
+
+        Args:
+            data (bytes): Bytes as read from the connection
+
+        Returns:
+            list: Data payloads (bytes) of every event completed by data
+        """
+        return self._parse(self._lines.feed(data))
+
+    def close(self):
+        """Flush a final event that was not followed by a blank line"""
+        events = self._parse(self._lines.feed(b"", final=True))
+        if self._data:
+            events.append(b"\n".join(self._data))
+            self._data.clear()
+        return events
+
+    def _parse(self, lines):
+        events = []
+        pending = self._data
+        for line in lines:
+            if line[:6] == b"data: ":
+                pending.append(line[6:])
+                continue
+            if not line:
+                # Blank line dispatches the pending event
+                if pending:
+                    events.append(pending[0] if len(pending) == 1 else b"\n".join(pending))
+                    pending.clear()
+                continue
+
+            first = line[0]
+            if first == 0x3A:  # ":" comment / keep-alive
+                continue
+            if first == 0x7B:  # "{": bare JSON line from a non-SSE server
+                events.append(line)
+                continue
+
+            field, _, value = line.partition(b":")
+            if value[:1] == b" ":
+                value = value[1:]
+
+            if field == b"data":
+                pending.append(value)
+            elif field == b"id":
+                self.last_event_id = value
+        return events
+
+
+class NDJSONParser:
+    """Incremental newline-delimited JSON parser"""
+
+    def __init__(self):
+        self._lines = _LineBuffer()
+
+    def feed(self, data):
+        """
+        Parse the next piece of the stream
+
+        Args:
+            data (bytes): Bytes as read from the connection
+
+        Returns:
+            list: Decoded JSON records completed by data
+        """
+        return [_loads(line) for line in self._lines.feed(data) if line.strip()]
+
+    def close(self):
+        """Decode a final record that had no trailing newline"""
+        return [_loads(line) for line in self._lines.feed(b"", final=True) if line.strip()]
+
+
+def openai_chunk(payload):
+    """
+    Convert one OpenAI-compatible SSE payload into a response chunk
+
+    Args:
+        payload (bytes): Event data
+
+    Returns:
+        dict or None: Chunk with 'response' text plus 'finish_reason',
+            'usage' and the decoded 'raw' record when present; None for
+            the [DONE] sentinel
+    """
+    if payload == DONE or not payload.strip():
+        return None
+    try:
+        data = _loads(payload)
+    except ValueError:
+        # Not JSON; pass the text through rather than dropping it
+        return {"response": payload.decode("utf-8", "replace")}
+
+    if data.__class__ is not dict:
+        return {"response": str(data), "raw": data}
+
+    chunk = {"response": "", "raw": data}
+    choices = data.get("choices")
+    if choices:
+        choice = choices[0]
+        delta = choice.get("delta")
+        if delta is not None:
+            chunk["response"] = delta.get("content") or ""
+        elif "message" in choice:
+            chunk["response"] = choice["message"].get("content") or ""
+        else:
+            chunk["response"] = choice.get("text") or ""
+        finish_reason = choice.get("finish_reason")
+        if finish_reason:
+            chunk["finish_reason"] = finish_reason
+    elif "response" in data:
+        chunk["response"] = data["response"] or ""
+
+    if "usage" in data and data["usage"]:
+        chunk["usage"] = data["usage"]
+    if "error" in data and data["error"]:
+        error = data["error"]
+        chunk["error"] = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+    return chunk
+
+
+# Structured fields reported by the Ollama daemon on its final stream chunk
+OLLAMA_STATS_FIELDS = (
+    "total_duration", "load_duration",
+    "prompt_eval_count", "prompt_eval_duration",
+    "eval_count", "eval_duration",
+    # Token state from /api/generate, passed back to continue the conversation
+    "context",
+)
+
+
+def ollama_chunk(data):
+    """
+    Convert one Ollama NDJSON record into a response chunk
+
+    Args:
+        data (dict): Decoded record from /api/chat or /api/generate
+
+    Returns:
+        dict: Chunk with 'response' text, 'done', and on the final chunk
+            the token counts, timings, 'finish_reason' and any 'context'
+    """
+    if "message" in data:
+        content = data["message"].get("content", "")
+    else:
+        content = data.get("response", "")
+
+    chunk = {"response": content, "done": data.get("done", False)}
+    if data.get("error"):
+        chunk["error"] = data["error"]
+    if chunk["done"]:
+        for field in OLLAMA_STATS_FIELDS:
+            if field in data:
+                chunk[field] = data[field]
+        if "done_reason" in data:
+            chunk["finish_reason"] = data["done_reason"]
+    return chunk
+
+
+def iter_sse_chunks(byte_chunks):
+    """
+    Parse an OpenAI-compatible SSE body into response chunks
+
+    Args:
+        byte_chunks (iterable): Body bytes as they are read
+
+    Yields:
+        dict: Response chunks (see openai_chunk)
+    """
+    parser = SSEParser()
+    for data in byte_chunks:
+        for payload in parser.feed(data):
+            chunk = openai_chunk(payload)
+            if chunk is not None:
+                yield chunk
+    for payload in parser.close():
+        chunk = openai_chunk(payload)
+        if chunk is not None:
+            yield chunk
+
+
+def iter_ndjson_chunks(byte_chunks):
+    """
+    Parse an Ollama NDJSON body into response chunks
+
+    Args:
+        byte_chunks (iterable): Body bytes as they are read
+
+    Yields:
+        dict: Response chunks (see ollama_chunk)
+    """
+    parser = NDJSONParser()
+    for data in byte_chunks:
+        for record in parser.feed(data):
+            yield ollama_chunk(record)
+    for record in parser.close():
+        yield ollama_chunk(record)
+
+
+async def aiter_sse_chunks(byte_chunks):
+    """Async variant of iter_sse_chunks over an async iterable of bytes"""
+    parser = SSEParser()
+    async for data in byte_chunks:
+        for payload in parser.feed(data):
+            chunk = openai_chunk(payload)
+            if chunk is not None:
+                yield chunk
+    for payload in parser.close():
+        chunk = openai_chunk(payload)
+        if chunk is not None:
+            yield chunk
+
+
+async def aiter_ndjson_chunks(byte_chunks):
+    """Async variant of iter_ndjson_chunks over an async iterable of bytes"""
+    parser = NDJSONParser()
+    async for data in byte_chunks:
+        for record in parser.feed(data):
+            yield ollama_chunk(record)
+    for record in parser.close():
+        yield ollama_chunk(record)
@@ -0,0 +1,347 @@
+"""Persistent index of the files in a code workspace.
+
+Listing a workspace, building a prompt's file list and gathering files for
+analysis all need to know what is in it. Walking and reading thousands of
+generated files for each of those adds up, so each workspace keeps an index
+in <workspace>/.rollama/index.json with every file's size, mtime, content
+hash, language and line count.
+
+Refreshing only stats the tree: a file is read again only when its size or
+mtime changed, and refreshes within a couple of seconds of each other are
+skipped altogether. Changes made through CodeManager update their entries
+directly.
+
+Symbol outlines (see outline.py) are kept alongside in outlines.json, keyed
+by content hash, so a file is only outlined again after it changes.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .outline import OUTLINE_VERSION, file_outline
+
+INDEX_VERSION = 1
+
+# Directory inside each workspace holding rollama's own files
+INDEX_DIR = ".rollama"
+
+# Never indexed: rollama's own files, VCS metadata, environments and build output
+IGNORED_DIRS = {
+    INDEX_DIR, ".git", ".hg", ".svn", "__pycache__", "node_modules",
+    ".venv", "venv", ".mypy_cache", ".pytest_cache", ".tox",
+}
+
+# Seconds a refresh is trusted for before the tree is stat'ed again
+REFRESH_INTERVAL = 2.0
+
+# Bytes checked for NUL to tell binary files from text
+BINARY_SNIFF_BYTES = 8192
+
+LANGUAGES = {
+    ".py": "python", ".pyi": "python",
+    ".js": "javascript", ".mjs": "javascript", ".cjs": "javascript", ".jsx": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".java": "java", ".kt": "kotlin", ".scala": "scala",
+    ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp", ".cxx": "cpp", ".hpp": "cpp",
+    ".cs": "csharp", ".go": "go", ".rs": "rust", ".rb": "ruby", ".php": "php",
+    ".swift": "swift", ".m": "objective-c", ".lua": "lua", ".r": "r",
+    ".sh": "shell", ".bash": "shell", ".zsh": "shell", ".ps1": "powershell",
+    ".sql": "sql", ".html": "html", ".htm": "html", ".css": "css", ".scss": "scss",
+    ".json": "json", ".yaml": "yaml", ".yml": "yaml", ".toml": "toml", ".ini": "ini",
+    ".xml": "xml", ".md": "markdown", ".rst": "rst", ".txt": "text",
+}
+
+FILENAME_LANGUAGES = {
+    "Makefile": "make",
+    "Dockerfile": "dockerfile",
+    "CMakeLists.txt": "cmake",
+}
+
+
+def detect_language(path):
+    """Language of a file from its name, or None if unknown"""
+    name = os.path.basename(path)
+    if name in FILENAME_LANGUAGES:
+        return FILENAME_LANGUAGES[name]
+    return LANGUAGES.get(os.path.splitext(name)[1].lower())
+
+
+def _describe(full_path, stat):
+    """Index entry for a file, reading it once for the hash and line count"""
+    with open(full_path, "rb") as f:
+        data = f.read()
+    binary = b"\0" in data[:BINARY_SNIFF_BYTES]
+    lines = 0
+    if data and not binary:
+        lines = data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": hashlib.sha256(data).hexdigest(),
+        "language": None if binary else detect_language(full_path),
+        "lines": lines,
+        "binary": binary,
+    }
+
+
+def _normalize(path):
+    """Workspace-relative path in index form: '/'-separated, '' for the root"""
+    path = str(path).replace(os.sep, "/").strip("/")
+    parts = [part for part in path.split("/") if part not in ("", ".")]
+    return "/".join(parts)
+
+
+class WorkspaceIndex:
+    """File metadata for one workspace, kept on disk and refreshed incrementally"""
+
+    def __init__(self, root):
+        """
+        Load a workspace's index; nothing is scanned until refresh()
+
+        Args:
+            root (str or Path): Workspace directory
+        """
+        self.root = Path(root)
+        self.index_file = self.root / INDEX_DIR / "index.json"
+        self.outlines_file = self.root / INDEX_DIR / "outlines.json"
+        self.files = {}
+        self.dirs = set()
+        # Content hash -> outline, loaded on first use
+        self._outlines = None
+        self._outlines_dirty = False
+        self._refreshed = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.files = data.get("files", {})
+        self.dirs = set(data.get("dirs", []))
+
+    def save(self):
+        """Write the index, atomically"""
+        with self._lock:
+            data = {"version": INDEX_VERSION, "files": self.files, "dirs": sorted(self.dirs)}
+            self._write_json(self.index_file, data)
+
+    def _write_json(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def outline(self, path, text=None):
+        """
+        Symbol outline of an indexed file, cached by content hash
+
+        Args:
+            path (str): Workspace-relative file
+            text (str, optional): The file's contents, if already read
+
+        Returns:
+            str or None: The outline ("" if the file has no definitions),
+                or None if the file is not indexed or cannot be read
+        """
+        with self._lock:
+            entry = self.get(path)
+            if entry is None or entry.get("binary"):
+                return None
+            if self._outlines is None:
+                self._outlines = {}
+                try:
+                    with open(self.outlines_file, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    if data.get("version") == OUTLINE_VERSION:
+                        self._outlines = data.get("outlines", {})
+                except (OSError, ValueError):
+                    pass
+            cached = self._outlines.get(entry["hash"])
+            if cached is not None:
+                return cached
+
+        if text is None:
+            try:
+                with open(self.root / _normalize(path), "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                return None
+        result = file_outline(text, entry.get("language"))
+        with self._lock:
+            self._outlines[entry["hash"]] = result
+            self._outlines_dirty = True
+        return result
+
+    def save_outlines(self):
+        """Write outlines computed since the last save, dropping those of replaced contents"""
+        with self._lock:
+            if not self._outlines_dirty:
+                return
+            current = {entry["hash"] for entry in self.files.values()}
+            self._outlines = {key: value for key, value in self._outlines.items() if key in current}
+            self._write_json(self.outlines_file, {"version": OUTLINE_VERSION, "outlines": self._outlines})
+            self._outlines_dirty = False
+
+    def _scan(self, directory, seen_files, seen_dirs):
+        """Stat a subtree, re-describing files whose size or mtime changed; returns changed paths"""
+        changed = []
+        full_dir = self.root / directory if directory else self.root
+        try:
+            entries = list(os.scandir(full_dir))
+        except OSError:
+            return changed
+        for entry in entries:
+            path = f"{directory}/{entry.name}" if directory else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in IGNORED_DIRS:
+                        continue
+                    seen_dirs.add(path)
+                    changed.extend(self._scan(path, seen_files, seen_dirs))
+                    continue
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                seen_files.add(path)
+                old = self.files.get(path)
+                if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+                    continue
+                self.files[path] = _describe(entry.path, stat)
+                changed.append(path)
+            except OSError:
+                # Removed while scanning, or unreadable; leave it out
+                continue
+        return changed
+
+    def _rescan(self, prefix):
+        """Bring the entries under prefix up to date; returns changed paths"""
+        full_path = self.root / prefix if prefix else self.root
+        inside = lambda path: not prefix or path == prefix or path.startswith(prefix + "/")
+        seen_files, seen_dirs = set(), set()
+
+        if prefix and full_path.is_file():
+            changed = []
+            stat = full_path.stat()
+            old = self.files.get(prefix)
+            if not old or old["size"] != stat.st_size or old["mtime_ns"] != stat.st_mtime_ns:
+                self.files[prefix] = _describe(str(full_path), stat)
+                changed.append(prefix)
+            seen_files.add(prefix)
+        else:
+            if prefix and full_path.is_dir():
+                seen_dirs.add(prefix)
+            changed = self._scan(prefix, seen_files, seen_dirs) if full_path.is_dir() else []
+
+        for path in [path for path in self.files if inside(path) and path not in seen_files]:
+            del self.files[path]
+            changed.append(path)
+        removed_dirs = {path for path in self.dirs if inside(path) and path not in seen_dirs}
+        added_dirs = seen_dirs - self.dirs
+        self.dirs = (self.dirs - removed_dirs) | seen_dirs
+        if removed_dirs or added_dirs:
+            changed.extend(sorted(removed_dirs | added_dirs))
+        return changed
+
+    def refresh(self, force=False):
+        """
+        Bring the whole index up to date with the workspace
+
+        Args:
+            force (bool, optional): Stat the tree even if it was refreshed moments ago
+
+        Returns:
+            list: Paths added, changed or removed since the last refresh
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed < REFRESH_INTERVAL:
+                return []
+            changed = self._rescan("")
+            self._refreshed = time.monotonic()
+            if changed or not self.index_file.exists():
+                self.save()
+            return changed
+
+    def update(self, *paths):
+        """
+        Re-index paths that were just created, changed, renamed or deleted
+
+        Args:
+            *paths (str): Workspace-relative files or directories
+
+        Returns:
+            list: Paths whose entries changed
+        """
+        with self._lock:
+            changed = []
+            for path in paths:
+                changed.extend(self._rescan(_normalize(path)))
+            if changed:
+                self.save()
+            return changed
+
+    def get(self, path):
+        """Entry for a file, or None if it is not indexed"""
+        return self.files.get(_normalize(path))
+
+    def exists(self, path):
+        """Whether path is an indexed file or directory ('.' is the root)"""
+        path = _normalize(path)
+        return not path or path in self.files or path in self.dirs
+
+    def is_dir(self, path):
+        """Whether path is an indexed directory ('.' is the root)"""
+        path = _normalize(path)
+        return not path or path in self.dirs
+
+    def paths(self, prefix=".", text_only=False):
+        """
+        Files under a directory, at any depth
+
+        Args:
+            prefix (str, optional): Workspace-relative directory, the root by default
+            text_only (bool, optional): Leave out binary files
+
+        Returns:
+            list: Sorted workspace-relative paths
+        """
+        prefix = _normalize(prefix)
+        start = prefix + "/" if prefix else ""
+        with self._lock:
+            return sorted(
+                path for path, entry in self.files.items()
+                if (path.startswith(start) or path == prefix)
+                and not (text_only and entry.get("binary"))
+            )
+
+    def children(self, prefix="."):
+        """
+        Immediate contents of a directory
+
+        Args:
+            prefix (str, optional): Workspace-relative directory, the root by default
+
+        Returns:
+            tuple: (sorted subdirectory paths, sorted file paths)
+        """
+        prefix = _normalize(prefix)
+        start = prefix + "/" if prefix else ""
+        direct = lambda path: path.startswith(start) and "/" not in path[len(start):]
+        with self._lock:
+            return (sorted(path for path in self.dirs if direct(path)),
+                    sorted(path for path in self.files if direct(path)))
@@ -15,6 +15,7 @@ setup(
             "rollama=rollama.cli:main",
             "rollama-gui=rollama.gui:main",  # Added GUI entry point
             "rollama-code=rollama.code_cli:main",  # Added Code management entry point
+            "rollamad=rollama.daemon:main",
         ],
     },
 )
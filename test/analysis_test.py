@@ -0,0 +1,126 @@
+import asyncio
+import io
+
+from rollama.analysis import WorkspaceAnalyzer, chunk_files
+from rollama.tokens import HeuristicCounter
+from rollama.workspace_index import WorkspaceIndex
+
+
+class FakeClient:
+    server_id = "fake"
+
+    def __init__(self, manager, remote):
+        self.manager = manager
+        self.remote = remote
+
+    async def run_stream(self, model, prompt, options=None):
+        self.manager.running += 1
+        self.manager.most_running = max(self.manager.most_running, self.manager.running)
+        await asyncio.sleep(0.01)
+        self.manager.running -= 1
+        self.manager.prompts.append((self.remote, prompt))
+        if "broken.py" in prompt and "These are findings" not in prompt:
+            yield {"response": "Error: boom", "error": True}
+            return
+        yield {"response": f"finding {len(self.manager.prompts)}"}
+
+
+class FakeConfig:
+    groups = {"gpus": {"members": ["a", "b", "c"]}}
+
+    def get_default_model(self):
+        return "llama2"
+
+    def get_remote_group(self, name=None):
+        return self.groups.get(name)
+
+
+class FakeManager:
+    config = FakeConfig()
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.prompts = []
+        self.final = None
+        self.running = 0
+        self.most_running = 0
+
+    def get_cache(self):
+        return None
+
+    def get_token_counter(self, model_name=None):
+        return HeuristicCounter()
+
+    def prompt_budget(self, options=None):
+        return self.budget
+
+    def _get_async_client(self, remote=None):
+        return FakeClient(self, remote)
+
+    def run_model(self, model_name, prompt, remote=None, options=None, use_cache=None, out=None):
+        self.final = prompt
+        return "report"
+
+
+def make_index(root, files=12):
+    for i in range(files):
+        (root / f"module_{i:02}.py").write_text("".join(f"def f{j}(x):\n    return x + {j}\n" for j in range(20)))
+    index = WorkspaceIndex(root)
+    index.refresh()
+    return index
+
+
+def test_chunks_fit_budget_and_split_large_files():
+    counter = HeuristicCounter()
+    small = "def a():\n    return 1\n"
+    large = "".join(f"value_{i} = {i}\n" for i in range(400))
+    chunks = chunk_files([("a.py", small), ("b.py", small), ("big.py", large)], 300, counter)
+
+    assert chunks[0]["paths"][:2] == ["a.py", "b.py"]
+    assert all(counter.count(chunk["text"]) <= 300 for chunk in chunks)
+    parts = [chunk for chunk in chunks if "big.py (lines" in chunk["text"]]
+    assert len(parts) > 1
+    # Every line of the large file is in exactly one part
+    lines = [line for chunk in parts for line in chunk["text"].splitlines() if line.startswith("value_")]
+    assert lines == large.splitlines()
+
+
+def test_small_workspace_is_one_request(tmp_path):
+    manager = FakeManager(budget=100000)
+    analyzer = WorkspaceAnalyzer(manager, make_index(tmp_path, files=2), use_cache=False)
+
+    assert analyzer.run() == "report"
+    assert manager.prompts == []
+    assert "module_00.py" in manager.final and "module_01.py" in manager.final
+
+
+def test_map_reduce_spreads_parts_across_servers(tmp_path):
+    manager = FakeManager(budget=500)
+    analyzer = WorkspaceAnalyzer(manager, make_index(tmp_path), remotes=["gpus", "cpu"], use_cache=False)
+    assert analyzer.server_count() == 4 and analyzer.concurrency == 8
+    messages = []
+
+    assert analyzer.run(progress=messages.append, out=io.StringIO()) == "report"
+
+    reviews = [prompt for _, prompt in manager.prompts if prompt.startswith("You are reviewing part")]
+    assert len(reviews) > 1
+    assert {remote for remote, _ in manager.prompts} == {"gpus", "cpu"}
+    assert 1 < manager.most_running <= 8
+    # Every file was reviewed, and every review reached the report
+    assert all(f"module_{i:02}.py" in "".join(reviews) for i in range(12))
+    assert "These are findings" in manager.final
+    assert sum(message.startswith("[") for message in messages) >= len(reviews)
+
+
+def test_failed_parts_are_reported_and_left_out(tmp_path):
+    index = make_index(tmp_path, files=3)
+    (tmp_path / "broken.py").write_text("def broken(:\n" * 200)
+    index.refresh(force=True)
+    manager = FakeManager(budget=400)
+    messages = []
+
+    WorkspaceAnalyzer(manager, index, use_cache=False).run(progress=messages.append)
+
+    assert any("broken.py" in message and "failed: Error: boom" in message for message in messages)
+    assert any(message.startswith("Leaving out") for message in messages)
+    assert "finding" in manager.final
@@ -0,0 +1,217 @@
+import json
+
+import pytest
+
+from rollama import http_pool
+from rollama.api_client import DEFAULT_GENERATION_TIMEOUT, DEFAULT_READ_TIMEOUT, ApiClient
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=b"", chunks=None):
+        self.status_code = status_code
+        self.body = body
+        self.chunks = chunks or [body]
+        self.headers = {}
+        self.raw = None
+
+    @property
+    def text(self):
+        return self.body.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.body)
+
+    def iter_content(self, chunk_size=None):
+        yield from self.chunks
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def post(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+@pytest.fixture
+def session(monkeypatch):
+    fake = FakeSession(FakeResponse())
+    monkeypatch.setattr(http_pool, "get_session", lambda url, pool_size=None: fake)
+    return fake
+
+
+def test_remote_generation_waits_longer_than_a_stream(session):
+    reply = {"choices": [{"message": {"content": "hello"}}]}
+    session.response = FakeResponse(body=json.dumps(reply).encode())
+    client = ApiClient({"url": "http://timeouts.test"})
+
+    assert client.run_remote_model("llama2", "hi") == "hello"
+    # The whole reply is generated before the first byte arrives
+    assert session.requests[-1][1]["timeout"][1] == DEFAULT_GENERATION_TIMEOUT
+
+    session.response = FakeResponse(chunks=[b'data: {"choices": [{"delta": {"content": "hel"}}]}\n\n',
+                                            b"data: [DONE]\n\n"])
+    assert [chunk["response"] for chunk in client.run_stream("llama2", "hi")] == ["hel"]
+    assert session.requests[-1][1]["timeout"][1] == DEFAULT_READ_TIMEOUT
+
+    session.response = FakeResponse(body=json.dumps(reply).encode())
+    client = ApiClient({"url": "http://timeouts.test", "read_timeout": 30, "generation_timeout": 600})
+    client.run_remote_model("llama2", "hi")
+    assert session.requests[-1][1]["timeout"] == (10, 600)
+
+
+def test_cancel_aborts_a_request_still_waiting_for_headers():
+    import socket
+    import threading
+    import time
+
+    # A server that accepts the request and never answers, like one still
+    # processing a long prompt
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    accepted = []
+    threading.Thread(target=lambda: accepted.append(server.accept()), daemon=True).start()
+
+    client = ApiClient({"url": f"http://127.0.0.1:{server.getsockname()[1]}", "max_concurrency": 1})
+    chunks = []
+    thread = threading.Thread(target=lambda: chunks.extend(client.run_stream("llama2", "hi")))
+    thread.start()
+    while not accepted:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    client.cancel()
+    thread.join(timeout=2)
+    try:
+        assert not thread.is_alive()
+        # Nothing to report, and the concurrency slot was given back
+        assert chunks == []
+        with client.limiter.slot():
+            pass
+    finally:
+        server.close()
+        for conn, _ in accepted:
+            conn.close()
+
+
+def ndjson(*records):
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+def test_local_chat_stream_posts_to_the_daemon(session):
+    body = ndjson({"message": {"content": "Hel"}}, {"message": {"content": "lo"}},
+                  {"message": {"content": ""}, "done": True, "eval_count": 2})
+    # Records split across reads, as they arrive off the socket
+    session.response = FakeResponse(chunks=[body[:20], body[20:45], body[45:]])
+    client = ApiClient(local_url="http://localhost:11434", keep_alive="30m")
+
+    chunks = list(client.run_stream("llama2", "hi", options={"temperature": 0}))
+
+    assert [chunk["response"] for chunk in chunks] == ["Hel", "lo", ""]
+    assert chunks[-1]["done"] and chunks[-1]["eval_count"] == 2
+    url, kwargs = session.requests[-1]
+    assert url == "http://localhost:11434/api/chat" and kwargs["stream"]
+    assert kwargs["json"] == {"model": "llama2", "messages": [{"role": "user", "content": "hi"}], "stream": True,
+                              "options": {"temperature": 0}, "keep_alive": "30m"}
+
+
+def test_local_generate_stream_continues_from_a_context(session):
+    session.response = FakeResponse(body=ndjson({"response": "again"}, {"response": "", "done": True, "context": [1, 2, 3]}))
+    client = ApiClient(local_url="http://localhost:11434")
+
+    chunks = list(client.generate_stream("llama2", "more", context=[1, 2]))
+
+    assert chunks[0]["response"] == "again" and chunks[-1]["context"] == [1, 2, 3]
+    url, kwargs = session.requests[-1]
+    assert url == "http://localhost:11434/api/generate"
+    assert kwargs["json"]["prompt"] == "more" and kwargs["json"]["context"] == [1, 2]
+
+
+@pytest.mark.parametrize("stream", ["run_stream", "generate_stream"])
+def test_local_stream_failures_become_error_chunks(session, stream):
+    from rollama.errors import HTTPStatusError, StreamError
+
+    client = ApiClient(local_url="http://localhost:11434")
+    session.response = FakeResponse(status_code=404, body=b'{"error": "model \\"nope\\" not found"}')
+    chunks = list(getattr(client, stream)("nope", "hi"))
+    assert len(chunks) == 1 and chunks[0]["error"]
+    assert isinstance(chunks[0]["exception"], HTTPStatusError) and chunks[0]["exception"].status_code == 404
+
+    # An error reported mid-stream ends it after the text already sent
+    session.response = FakeResponse(body=ndjson({"response": "Hal", "message": {"content": "Hal"}},
+                                                {"error": "out of memory"}))
+    chunks = list(getattr(client, stream)("llama2", "hi"))
+    assert chunks[0]["response"] == "Hal"
+    assert isinstance(chunks[1]["exception"], StreamError) and "out of memory" in chunks[1]["response"]
+    assert len(chunks) == 2
+
+
+def test_local_non_streaming_requests(session):
+    from rollama.errors import HTTPStatusError
+
+    client = ApiClient(local_url="http://localhost:11434")
+    session.response = FakeResponse(body=b'{"response": "plain"}')
+    assert client.run_local_model("llama2", "hi") == "plain"
+    assert session.requests[-1][0].endswith("/api/generate")
+
+    session.response = FakeResponse(body=b'{"message": {"role": "assistant", "content": "chatty"}}')
+    assert client.run_local_model("llama2", [{"role": "user", "content": "hi"}]) == "chatty"
+    assert session.requests[-1][0].endswith("/api/chat")
+
+    session.response = FakeResponse(status_code=500, body=b"boom")
+    with pytest.raises(HTTPStatusError, match="500"):
+        client.run_local_model("llama2", "hi")
+
+
+def test_local_stream_falls_back_to_the_cli_without_a_daemon(session, monkeypatch):
+    import requests
+
+    session.response = requests.exceptions.ConnectionError("refused")
+    client = ApiClient(local_url="http://localhost:11434")
+    monkeypatch.setattr(client, "_run_local_subprocess_stream",
+                        lambda model, prompt: iter([{"response": f"cli: {prompt}"}]))
+
+    assert list(client.run_stream("llama2", "hi")) == [{"response": "cli: hi"}]
+
+
+def test_local_replies_that_are_not_json_raise_typed_errors(session):
+    from rollama.errors import StreamError
+
+    client = ApiClient(local_url="http://localhost:11434")
+    session.response = FakeResponse(body=b"<html>Sign in to the network</html>")
+    with pytest.raises(StreamError, match="Invalid reply from local Ollama"):
+        client.run_local_model("llama2", "hi")
+
+    session.get = session.post
+    with pytest.raises(StreamError, match="Invalid reply from local Ollama"):
+        client.list_local_models()
+
+
+@pytest.mark.parametrize("stream", ["run_stream", "generate_stream"])
+def test_cancelled_local_streams_neither_fall_back_nor_report_errors(session, monkeypatch, stream):
+    import requests
+
+    client = ApiClient(local_url="http://localhost:11434")
+    monkeypatch.setattr(client, "_run_local_subprocess_stream",
+                        lambda model, prompt: pytest.fail("fell back to the ollama CLI"))
+    client.cancel()
+
+    # What a request aborted by cancel() raises from session.post
+    session.response = requests.exceptions.ConnectionError("connection aborted")
+    assert list(getattr(client, stream)("llama2", "hi")) == []
+    session.response = requests.exceptions.ChunkedEncodingError("connection aborted")
+    assert list(getattr(client, stream)("llama2", "hi")) == []
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from rollama.async_client import AsyncApiClient, close_pools, request
+from rollama.errors import ConnectError
+
+# Canned replies by request path: the head to send, then the body pieces
+REPLIES = {
+    "/chunked": (b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n",
+                 [b"5\r\nhello\r\n", b"6;ext=1\r\n world\r\n", b"0\r\nX-Trailer: 1\r\n\r\n"]),
+    "/length": (b"HTTP/1.1 200 OK\r\nContent-Length: 11\r\n\r\n", [b"hello", b" world"]),
+    "/close": (b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n", [b"hello", b" world"]),
+    # Stalls before the blank line that ends the trailers
+    "/stall-trailer": (b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n", [b"5\r\nhello\r\n0\r\n"]),
+}
+
+
+async def serve(connections):
+    """Start a local HTTP server; connections counts the sockets it accepted"""
+    async def handle(reader, writer):
+        connections.append(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                path = line.split()[1].decode()
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                await reader.readexactly(length)
+
+                if path == "/silent":
+                    await asyncio.sleep(2)
+                head, pieces = REPLIES[path]
+                writer.write(head)
+                for piece in pieces:
+                    await writer.drain()
+                    await asyncio.sleep(0.01)
+                    writer.write(piece)
+                await writer.drain()
+                if path.startswith("/stall"):
+                    await asyncio.sleep(2)
+                if path in ("/close", "/stall-trailer"):
+                    return
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+
+def run_with_server(test):
+    """Run test(url, connections) on a fresh event loop against the local server"""
+    async def main():
+        connections = []
+        server, url = await serve(connections)
+        try:
+            return await test(url, connections)
+        finally:
+            await close_pools()
+            server.close()
+
+    return asyncio.run(main())
+
+
+async def fetch(url, **kwargs):
+    response = await request("POST", url, json_body={"prompt": "hi"}, **kwargs)
+    return response.status_code, b"".join([data async for data in response.iter_bytes()])
+
+
+@pytest.mark.parametrize("path, reused", [("/chunked", True), ("/length", True), ("/close", False)])
+def test_each_framing_is_read_and_keep_alive_is_reused(path, reused):
+    async def test(url, connections):
+        assert await fetch(url + path) == (200, b"hello world")
+        assert await fetch(url + path) == (200, b"hello world")
+        # A connection is only reused once its body was read to the end
+        assert len(connections) == (1 if reused else 2)
+
+    run_with_server(test)
+
+
+def test_an_unread_body_does_not_go_back_to_the_pool():
+    async def test(url, connections):
+        response = await request("GET", url + "/length")
+        response.close()
+        assert await fetch(url + "/length") == (200, b"hello world")
+        assert len(connections) == 2
+
+    run_with_server(test)
+
+
+def test_silent_servers_time_out():
+    async def test(url, connections):
+        with pytest.raises(asyncio.TimeoutError):
+            await fetch(url + "/silent", timeout=0.1)
+        # The trailer of a chunked body is read under the read timeout too
+        with pytest.raises(asyncio.TimeoutError):
+            await fetch(url + "/stall-trailer", read_timeout=0.1)
+
+    run_with_server(test)
+
+
+def test_connect_timeouts_are_retried_as_connection_failures(monkeypatch):
+    attempts = []
+
+    async def unreachable(*args, **kwargs):
+        attempts.append(1)
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(asyncio, "open_connection", unreachable)
+    client = AsyncApiClient({"url": "http://connect-timeout.test", "connect_timeout": 0.05, "retries": 1})
+
+    async def main():
+        return [chunk async for chunk in client.run_stream("llama2", "hi")]
+
+    chunks = asyncio.run(main())
+    assert len(attempts) == 2
+    assert isinstance(chunks[-1]["exception"], ConnectError)
@@ -0,0 +1,97 @@
+import asyncio
+import io
+import json
+from rollama.batch import BatchRunner, parse_item
+
+
+class FakeClient:
+    server_id = "fake"
+
+    async def run_stream(self, model, prompt, options=None):
+        # Later prompts finish first, so completion order differs from input order
+        await asyncio.sleep(0.01 * (5 - int(prompt[1:])))
+        if prompt == "p3":
+            yield {"response": "Error: boom", "error": True}
+            return
+        yield {"response": prompt.upper()}
+        yield {"response": "!", "finish_reason": "stop"}
+
+
+class FakeConfig:
+    def get_default_model(self):
+        return "llama2"
+
+
+class FakeManager:
+    config = FakeConfig()
+
+    def get_cache(self):
+        return None
+
+    def _get_async_client(self, remote=None):
+        return FakeClient()
+
+
+def run_batch(lines, **kwargs):
+    output = io.StringIO()
+    runner = BatchRunner(FakeManager(), concurrency=5, use_cache=False, **kwargs)
+    summary = runner.run(io.StringIO("".join(lines)), output)
+    return summary, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_parse_item():
+    assert parse_item('"hello"\n', 2) == {"prompt": "hello", "index": 2, "id": "2"}
+    assert parse_item('{"id": 7, "prompt": "hi", "model": "m"}', 0)["id"] == "7"
+    assert parse_item("   \n", 0) is None
+    try:
+        parse_item('{"text": "hi"}', 4)
+        assert False, "missing prompt should be rejected"
+    except ValueError as e:
+        assert "line 5" in str(e)
+
+
+def test_ordered_output_and_resume(tmp_path):
+    lines = [json.dumps({"prompt": f"p{i}"}) + "\n" for i in range(5)]
+    checkpoint = str(tmp_path / "progress")
+
+    summary, results = run_batch(lines, ordered=True, checkpoint=checkpoint)
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]["response"] == "P0!" and results[0]["finish_reason"] == "stop"
+    assert "error" in results[3]
+    assert summary["completed"] == 4 and summary["failed"] == 1
+
+    # Only the failed prompt is retried on resume
+    summary, results = run_batch(lines, ordered=True, checkpoint=checkpoint)
+    assert [r["id"] for r in results] == ["3"]
+    assert summary["skipped"] == 4
+
+
+def test_completion_order():
+    lines = [json.dumps({"prompt": f"p{i}"}) + "\n" for i in range(5)]
+    _, results = run_batch(lines)
+    assert [r["index"] for r in results] == [4, 3, 2, 1, 0]
+
+
+def test_only_deterministic_items_are_cached(tmp_path):
+    from rollama.response_cache import ResponseCache
+
+    class CachingManager(FakeManager):
+        cache = ResponseCache(cache_dir=tmp_path)
+
+        def get_cache(self):
+            return self.cache
+
+        def _cache_key(self, client, model, prompt, options):
+            return ResponseCache.make_key(client.server_id, model, [{"role": "user", "content": prompt}], options)
+
+    lines = [json.dumps({"prompt": "p0", "options": {"temperature": 0}}) + "\n",
+             json.dumps({"prompt": "p1", "options": {"temperature": 0.8}}) + "\n",
+             json.dumps({"prompt": "p2", "options": {"seed": 42}}) + "\n"]
+    runner = BatchRunner(CachingManager(), ordered=True)
+    runner.run(io.StringIO("".join(lines)), io.StringIO())
+    assert runner.cache.stats()["entries"] == 2
+
+    output = io.StringIO()
+    runner.run(io.StringIO("".join(lines)), output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [bool(result.get("cached")) for result in results] == [True, False, True]
@@ -83,6 +83,50 @@ def multiply(a, b):
     with open(calc_path, 'r') as f:
         assert "multiply" in f.read()
 
+def token_manager(tmp_path, monkeypatch, replies):
+    """CodeManager in a fresh home whose model streams replies as sub-word tokens"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    code_manager = CodeManager()
+    code_manager.create_workspace("tokens")
+    code_manager.switch_workspace("tokens")
+    replies = list(replies)
+
+    def run_code_model(prompt, remote=None, split_words=True):
+        reply = replies.pop(0)
+        for start in range(0, len(reply), 3):
+            yield reply[start:start + 3]
+
+    monkeypatch.setattr(code_manager.model_manager, "run_code_model", run_code_model)
+    return code_manager
+
+
+def test_files_are_written_from_the_raw_tokens(tmp_path, monkeypatch, capsys):
+    code_manager = token_manager(tmp_path, monkeypatch, [
+        "CREATE FILE: calc.py\n```python\ndef calculate(x):\n    return x * 2\n```\n"
+    ])
+
+    response = code_manager.execute_ai_command("write calc.py", progress=lambda message: None)
+
+    assert code_manager.read_file("calc.py") == "def calculate(x):\n    return x * 2\n"
+    assert "def calculate(x):" in response
+    assert "def calculate(x):" in capsys.readouterr().out
+
+
+
+def test_failed_patch_is_rewritten_from_the_raw_tokens(tmp_path, monkeypatch):
+    code_manager = token_manager(tmp_path, monkeypatch, [
+        "PATCH FILE: calc.py\n<<<<<<< SEARCH\nnothing like this\n=======\nx\n>>>>>>> REPLACE\n",
+        "```python\ndef calculate(x):\n    return x * 3\n```\n",
+    ])
+    code_manager.create_file("calc.py", "def calculate(x):\n    return x * 2\n")
+    messages = []
+
+    code_manager.execute_ai_command("triple it", progress=messages.append)
+
+    assert code_manager.read_file("calc.py") == "def calculate(x):\n    return x * 3\n"
+    assert messages[-1] == "Rewrote file: calc.py"
+
+
 if __name__ == "__main__":
     test_file_operations()
     print("All tests passed!")
\ No newline at end of file
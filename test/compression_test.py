@@ -0,0 +1,31 @@
+import gzip
+import json
+import zlib
+from rollama.compression import compress_threshold, decode_body, encode_json
+
+
+def test_only_large_bodies_are_compressed():
+    small, headers = encode_json({"prompt": "hi"}, threshold=1024)
+    assert "Content-Encoding" not in headers and json.loads(small) == {"prompt": "hi"}
+
+    payload = {"prompt": "print('hello')\n" * 1000}
+    body, headers = encode_json(payload, threshold=1024)
+    assert headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == payload
+    assert len(body) < len(json.dumps(payload)) / 10
+
+    uncompressed, headers = encode_json(payload)
+    assert "Content-Encoding" not in headers
+
+
+def test_compression_is_opt_in_per_remote():
+    assert compress_threshold({"url": "http://a"}) is None
+    assert compress_threshold({"url": "http://a", "compress": True}) == 32 * 1024
+    assert compress_threshold({"url": "http://a", "compress": True, "compress_threshold": 0}) == 0
+
+
+def test_decode_body():
+    data = b'{"ok": true}'
+    assert decode_body(gzip.compress(data), "gzip") == data
+    assert decode_body(zlib.compress(data), "deflate") == data
+    assert decode_body(data, None) == data
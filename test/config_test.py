@@ -0,0 +1,54 @@
+import json
+import os
+import threading
+
+from rollama.config import Config, get_config
+
+
+def test_concurrent_writers_do_not_lose_changes(tmp_path):
+    # Separate instances stand in for separate processes sharing the file
+    configs = [Config(tmp_path) for _ in range(4)]
+
+    def add_remotes(index, config):
+        for i in range(10):
+            config.add_remote(f"server-{index}-{i}", f"http://host{index}:{11434 + i}")
+
+    threads = [threading.Thread(target=add_remotes, args=item) for item in enumerate(configs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(tmp_path / "config.json") as f:
+        saved = json.load(f)
+    assert len(saved["remotes"]) == 40
+    assert len(Config(tmp_path).list_remotes()) == 40
+    # Writes go through a temporary file that is renamed into place
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_changes_from_other_processes_are_picked_up(tmp_path):
+    gui = Config(tmp_path)
+    cli = Config(tmp_path)
+    assert gui.get_remote("box") is None
+
+    cli.add_remote("box", "http://box:11434")
+    cli.set_default_remote("box")
+    assert gui.get_remote()["url"] == "http://box:11434"
+
+    # Unchanged files are not parsed again
+    loaded = gui.config
+    assert gui.config is loaded
+
+
+def test_unreadable_update_keeps_the_last_good_copy(tmp_path):
+    config = Config(tmp_path)
+    config.set_default_model("mistral")
+    with open(tmp_path / "config.json", "w") as f:
+        f.write('{"remotes": ')
+    assert config.get_default_model() == "mistral"
+
+
+def test_shared_instance_per_directory(tmp_path):
+    assert get_config(tmp_path) is get_config(tmp_path)
+    assert get_config(tmp_path) is not get_config(tmp_path / "other")
@@ -0,0 +1,84 @@
+import os
+
+from rollama.context_builder import ContextBuilder, words
+from rollama.workspace_index import WorkspaceIndex
+
+FILLER = "".join(f"def helper_{i}(value):\n    return value * {i}\n\n" for i in range(200))
+
+
+def make_workspace(root):
+    (root / "billing").mkdir()
+    (root / "billing" / "invoice.py").write_text(
+        "class Invoice:\n    def total(self):\n        return sum(line.amount for line in self.lines)\n"
+    )
+    (root / "billing" / "tax.py").write_text("def vat(amount):\n    return amount * 0.2\n")
+    (root / "auth.py").write_text("def login(user, password):\n    return check_password(user, password)\n")
+    (root / "big_helpers.py").write_text(FILLER)
+    (root / "logo.png").write_bytes(b"\0PNG")
+    # Oldest first, so auth.py is the most recently modified
+    for age, name in enumerate(["auth.py", "billing/tax.py", "billing/invoice.py", "big_helpers.py"]):
+        os.utime(root / name, ns=(10**18 - age * 10**9,) * 2)
+    index = WorkspaceIndex(root)
+    index.refresh()
+    return index
+
+
+def test_words_split_identifiers():
+    assert words("Fix the InvoiceTotal in get_tax_rate for HTTPServer") == [
+        "fix", "invoice", "total", "get", "tax", "rate", "http", "server"
+    ]
+
+
+def test_ranking_prefers_mentions_names_and_content(tmp_path):
+    builder = ContextBuilder(make_workspace(tmp_path))
+    paths = builder.index.paths(text_only=True)
+
+    ranked = [path for _, path in builder.rank("the invoice total is wrong", paths)]
+    assert ranked[0] == "billing/invoice.py"
+
+    ranked = [path for _, path in builder.rank("password checks", paths)]
+    assert ranked[0] == "auth.py"
+
+    ranked = [path for _, path in builder.rank("look at tax.py", paths)]
+    assert ranked[0] == "billing/tax.py"
+
+
+def test_build_packs_within_the_budget(tmp_path):
+    builder = ContextBuilder(make_workspace(tmp_path))
+
+    context = builder.build("change helper_7 in big_helpers", 400)
+    assert builder.counter.count(context) <= 400
+    # Too big to include whole, so its definitions stand in for it
+    assert "=== big_helpers.py (outline) ===" in context
+    assert "def helper_7(value):" in context
+    assert "return value * 7" not in context
+    assert "logo.png" in context
+
+    context = builder.build("the invoice total is wrong", 10000)
+    assert "=== billing/invoice.py ===\nclass Invoice:" in context
+
+    for budget in (20, 45, 60, 90):
+        context = builder.build("the invoice total is wrong", budget)
+        assert builder.counter.count(context) <= budget
+    assert context.startswith("=== billing/invoice.py ===")
+
+
+def test_build_limited_to_a_directory(tmp_path):
+    builder = ContextBuilder(make_workspace(tmp_path))
+    context = builder.build("password", 10000, prefix="billing")
+    assert "auth.py" not in context
+    assert "=== billing/tax.py ===" in context
+
+
+def test_named_files_are_sent_whole_and_the_rest_outlined(tmp_path):
+    builder = ContextBuilder(make_workspace(tmp_path))
+
+    context = builder.build("add a discount to billing/invoice.py using the tax helpers", 10000)
+    assert context.startswith("=== billing/invoice.py ===\nclass Invoice:")
+    assert "=== billing/tax.py (outline) ===\ndef vat(amount):\n" in context
+    assert "return amount * 0.2" not in context
+
+    context = builder.build("tidy up", 10000, focus=["billing"])
+    assert "=== billing/invoice.py ===" in context
+    assert "=== billing/tax.py ===" in context
+    assert "=== auth.py (outline) ===" in context
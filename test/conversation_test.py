@@ -0,0 +1,71 @@
+from rollama.api_client import as_messages, flatten_messages
+from rollama.conversation import Conversation
+
+
+def test_context_belongs_to_one_server_and_model():
+    conversation = Conversation()
+    conversation.add("user", "hi")
+    conversation.add("assistant", "hello")
+    conversation.set_context("local:http://localhost:11434", "llama2", [1, 2, 3])
+
+    assert conversation.context_for("local:http://localhost:11434", "llama2") == [1, 2, 3]
+    assert conversation.context_for("local:http://localhost:11434", "mistral") is None
+    assert conversation.context_for("http://remote:11434", "llama2") is None
+
+    conversation.clear()
+    assert len(conversation) == 0
+    assert conversation.context_for("local:http://localhost:11434", "llama2") is None
+
+
+def test_prompts_and_messages_convert_both_ways():
+    assert as_messages("hi") == [{"role": "user", "content": "hi"}]
+    assert flatten_messages("hi") == "hi"
+    assert flatten_messages(as_messages("hi")) == "hi"
+
+    messages = [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "user", "content": "how are you?"},
+    ]
+    assert flatten_messages(messages) == "[USER]: hi\n[ASSISTANT]: hello\n[USER]: how are you?\n[ASSISTANT]: "
+
+
+def test_turns_over_budget_are_summarized_in_the_background():
+    calls = []
+
+    def summarize(summary, messages):
+        calls.append((summary, [m["content"] for m in messages]))
+        return f"{summary or ''}+{len(messages)}"
+
+    conversation = Conversation(budget=60, summarize=summarize)
+    for i in range(4):
+        conversation.add("user", f"question {i} " * 4)
+        conversation.add("assistant", f"answer {i} " * 4)
+        conversation.set_context("local:http://localhost:11434", "llama2", [i])
+        conversation.compact()
+        conversation.wait()
+
+    assert calls
+    assert conversation.tokens <= 60
+    messages = conversation.messages
+    assert messages[0]["role"] == "system" and conversation.summary in messages[0]["content"]
+    # The latest exchange is always kept verbatim, starting on a user turn
+    assert messages[1]["role"] == "user"
+    assert messages[-1]["content"] == "answer 3 " * 4
+    # Compaction changed the prefix, so the server's token state was dropped
+    assert conversation.context_for("local:http://localhost:11434", "llama2") is None
+
+
+def test_failed_summary_still_bounds_the_history():
+    def summarize(summary, messages):
+        raise RuntimeError("model unavailable")
+
+    conversation = Conversation(budget=40, summarize=summarize)
+    for i in range(5):
+        conversation.add("user", f"question {i} " * 10)
+        conversation.add("assistant", f"answer {i} " * 10)
+        conversation.compact()
+    conversation.wait()
+
+    assert conversation.summary is None
+    assert len(conversation) == 2
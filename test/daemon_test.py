@@ -0,0 +1,54 @@
+import io
+import threading
+import time
+
+import pytest
+
+from rollama import daemon
+
+
+class _StubModelManager:
+    def run_model(self, model_name, prompt, out=None, err=None, **kwargs):
+        err.write("Warning: long prompt\n")
+        out.write(f"\n{model_name} says {prompt}\n")
+        return f"{model_name} says {prompt}"
+
+
+@pytest.fixture
+def rollamad(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv(daemon.NO_DAEMON_ENV, raising=False)
+    server = daemon.RollamaDaemon(tmp_path / "rollamad.sock")
+    server.model_manager = _StubModelManager()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if daemon.is_running(server.socket_path):
+            break
+        time.sleep(0.01)
+    yield server
+    server.shutdown()
+    thread.join(timeout=5)
+
+
+def test_requests_are_relayed_through_the_socket(rollamad):
+    out, err = io.StringIO(), io.StringIO()
+    payload = {"op": "run", "model": "llama2", "prompt": "hi"}
+    assert daemon.request(payload, out, err, socket_path=rollamad.socket_path) == 0
+    assert out.getvalue() == "\nllama2 says hi\n"
+    assert err.getvalue() == "Warning: long prompt\n"
+
+    with pytest.raises(daemon.RollamaError, match="Unknown daemon request"):
+        daemon.request({"op": "nonsense"}, out, err, socket_path=rollamad.socket_path)
+
+
+def test_missing_or_stale_socket_means_run_in_process(tmp_path):
+    with pytest.raises(daemon.DaemonUnavailable):
+        daemon.request({"op": "ping"}, socket_path=tmp_path / "missing.sock")
+
+    # A socket file nobody listens on, as left by a crashed daemon
+    import socket
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(tmp_path / "stale.sock"))
+    stale.close()
+    assert not daemon.is_running(tmp_path / "stale.sock")
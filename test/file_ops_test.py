@@ -0,0 +1,104 @@
+from rollama.code_manager import CodeManager
+from rollama.file_ops import FileOperationParser
+
+RESPONSE = """Here is the package:
+
+CREATE DIR: pkg
+
+CREATE FILE: pkg/__init__.py
+```python
+from .calc import add
+```
+
+```python
+// filepath: pkg/calc.py
+def add(a, b):
+    return a + b
+```
+
+EDIT FILE: notes.txt
+first line
+second line
+
+DELETE FILE: old.py
+```bash
+pip install pytest
+```
+Done.
+"""
+
+
+def parse_in_pieces(text, size):
+    parser = FileOperationParser()
+    completed = []
+    for i in range(0, len(text), size):
+        for operation in parser.feed(text[i:i + size]):
+            completed.append((i + size, operation))
+    for operation in parser.close():
+        completed.append((len(text), operation))
+    return completed
+
+
+def test_operations_complete_as_their_blocks_close():
+    completed = parse_in_pieces(RESPONSE, 3)
+    operations = [operation for _, operation in completed]
+    assert operations == [
+        {"action": "mkdir", "path": "pkg"},
+        {"action": "create", "path": "pkg/__init__.py", "content": "from .calc import add\n"},
+        {"action": "write", "path": "pkg/calc.py", "content": "def add(a, b):\n    return a + b\n"},
+        {"action": "edit", "path": "notes.txt", "content": "first line\nsecond line\n"},
+        {"action": "delete", "path": "old.py"},
+    ]
+    # Each file is ready as soon as its closing fence arrives, long before the end
+    offsets = [offset for offset, _ in completed]
+    assert offsets[1] < RESPONSE.index("// filepath") + 3
+    assert offsets[2] < RESPONSE.index("EDIT FILE") + 3
+    assert offsets == sorted(offsets)
+
+
+def test_piece_boundaries_do_not_matter():
+    expected = [operation for _, operation in parse_in_pieces(RESPONSE, len(RESPONSE))]
+    for size in (1, 2, 7, 64):
+        assert [operation for _, operation in parse_in_pieces(RESPONSE, size)] == expected
+
+
+def test_unclosed_code_block_is_not_written():
+    parser = FileOperationParser()
+    assert parser.feed("```python/filepath: a.py\nprint(") == []
+    assert parser.close() == []
+
+
+def test_raw_content_runs_to_the_end():
+    parser = FileOperationParser()
+    assert parser.feed("CREATE FILE: a.txt\nhello\n") == []
+    assert parser.close() == [{"action": "create", "path": "a.txt", "content": "hello\n"}]
+
+
+def test_apply_ai_stream_writes_files_while_streaming(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    code_manager = CodeManager()
+    code_manager.create_workspace("stream")
+    (code_manager.current_workspace / "notes.txt").write_text("old\n")
+    (code_manager.current_workspace / "old.py").write_text("")
+    workspace = code_manager.current_workspace
+    messages = []
+
+    def pieces():
+        for i in range(0, len(RESPONSE), 5):
+            if i >= RESPONSE.index("EDIT FILE"):
+                # The files before this point are already on disk
+                assert (workspace / "pkg" / "calc.py").read_text() == "def add(a, b):\n    return a + b\n"
+            yield RESPONSE[i:i + 5]
+
+    streamed = "".join(code_manager.apply_ai_stream(pieces(), messages.append))
+    assert streamed == RESPONSE
+    assert (workspace / "pkg" / "__init__.py").read_text() == "from .calc import add\n"
+    assert (workspace / "notes.txt").read_text() == "first line\nsecond line\n"
+    assert not (workspace / "old.py").exists()
+    assert messages == [
+        "Created directory: pkg",
+        "Created file: pkg/__init__.py",
+        "Created file: pkg/calc.py",
+        "Updated file: notes.txt",
+        "Deleted: old.py",
+    ]
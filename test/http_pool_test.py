@@ -0,0 +1,77 @@
+import pytest
+
+from rollama import http_pool
+from rollama.api_client import ApiClient
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools():
+    http_pool.close_all()
+    yield
+    http_pool.close_all()
+
+
+def pool_size(session, url):
+    return session.get_adapter(url)._pool_maxsize
+
+
+def test_clients_share_one_session_per_remote():
+    first = ApiClient({"url": "http://gpu:11434"}).session
+    # Same scheme, host and port, however the URL is spelled
+    assert ApiClient({"url": "http://GPU:11434/"}).session is first
+    assert http_pool.get_session("http://gpu:11434/v1/chat/completions") is first
+
+    assert http_pool.get_session("http://gpu:8080") is not first
+    assert http_pool.get_session("https://gpu:11434") is not first
+
+
+def test_pool_is_sized_per_remote_and_only_grows():
+    session = ApiClient({"url": "http://big:11434", "pool_size": 32}).session
+    assert pool_size(session, "http://big:11434") == 32
+    assert pool_size(http_pool.get_session("http://small:11434"), "http://small:11434") == http_pool.DEFAULT_POOL_SIZE
+
+    # A later client asking for fewer connections keeps the larger pool
+    assert http_pool.get_session("http://big:11434", 4) is session
+    assert pool_size(session, "http://big:11434") == 32
+    old_adapter = session.get_adapter("http://big:11434")
+    closed = []
+    old_adapter.close = lambda: closed.append(old_adapter)
+    assert http_pool.get_session("http://big:11434", 64) is session
+    assert pool_size(session, "http://big:11434") == 64
+    # The smaller pool's keep-alive sockets are not left open
+    assert closed == [old_adapter]
+    assert session.get_adapter("https://big:11434") is session.get_adapter("http://big:11434")
+
+
+def test_connections_are_reused_between_requests():
+    import http.server
+    import threading
+
+    connections = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            connections.append(self.client_address)
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        for _ in range(3):
+            assert http_pool.get_session(url).get(url, timeout=5).text == "ok"
+        assert len(connections) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
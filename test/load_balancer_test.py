@@ -0,0 +1,73 @@
+import threading
+import time
+
+from rollama import load_balancer
+from rollama.load_balancer import RemoteGroup, get_group
+
+
+def health_threads(name):
+    return [thread for thread in threading.enumerate() if thread.name == f"rollama-health-{name}"]
+
+
+def test_one_shot_lookups_do_not_probe_members(monkeypatch):
+    monkeypatch.setattr(load_balancer, "_groups", {})
+    probed = []
+    monkeypatch.setattr(RemoteGroup, "probe", lambda self, state: probed.append(state.name))
+
+    group = get_group("farm", {"a": {"url": "http://a"}, "b": {"url": "http://b"}})
+    assert get_group("farm", {"a": {"url": "http://a"}}) is group
+    time.sleep(0.05)
+    assert probed == [] and health_threads("farm") == []
+
+
+def test_health_checks_stop_when_groups_are_closed(monkeypatch):
+    monkeypatch.setattr(load_balancer, "_groups", {})
+    probed = threading.Event()
+    monkeypatch.setattr(RemoteGroup, "probe", lambda self, state: probed.set())
+
+    get_group("busy", {"a": {"url": "http://a"}}, health_interval=0.01, health_checks=True)
+    assert probed.wait(1)
+    assert len(health_threads("busy")) == 1
+
+    load_balancer.close_groups()
+    deadline = time.monotonic() + 1
+    while health_threads("busy") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert health_threads("busy") == []
+
+
+def test_a_failover_is_not_hedged_straight_away(monkeypatch):
+    from rollama.errors import ConnectError, error_chunk
+    from rollama.load_balancer import GroupClient
+
+    launched = []
+
+    class FakeClient:
+        cancelled = False
+
+        def __init__(self, first):
+            self.first = first
+
+        def cancel(self):
+            self.cancelled = True
+
+        def run_stream(self, model, prompt, options=None):
+            if self.first:
+                # Fails shortly before the hedging delay is up
+                time.sleep(0.25)
+                yield error_chunk(ConnectError("refused"))
+                return
+            time.sleep(0.15)
+            yield {"response": "hello"}
+
+    def client(self, state):
+        launched.append(state.name)
+        return FakeClient(first=len(launched) == 1)
+
+    monkeypatch.setattr(GroupClient, "_client", client)
+    group = RemoteGroup("hedged", {name: {"url": f"http://{name}"} for name in "abc"}, health_interval=0)
+    stream = GroupClient(group, hedge={"default_delay_ms": 300}).run_stream("llama2", "hi")
+
+    assert [chunk["response"] for chunk in stream] == ["hello"]
+    # The replacement answered within its own delay, so no hedge was sent
+    assert len(launched) == 2
@@ -0,0 +1,57 @@
+import threading
+import time
+from rollama.model_catalog import ModelCatalog
+
+
+def test_fresh_entries_are_served_from_disk(tmp_path):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return [{"name": "llama2:latest", "loaded": True}]
+
+    catalog = ModelCatalog(path=tmp_path / "models.json", ttl=60)
+    assert catalog.get("http://a", fetch) == [{"name": "llama2:latest", "loaded": True}]
+    # A new process reads the persisted entry instead of asking the server
+    assert ModelCatalog(path=tmp_path / "models.json", ttl=60).get("http://a", fetch)[0]["loaded"]
+    assert len(calls) == 1
+
+    catalog.get("http://a", fetch, refresh=True)
+    assert len(calls) == 2
+
+
+def test_stale_entry_returned_while_refreshing(tmp_path):
+    release = threading.Event()
+    versions = iter(["old", "new"])
+
+    def fetch():
+        name = next(versions)
+        if name == "new":
+            release.wait(1)
+        return [{"name": name, "loaded": False}]
+
+    catalog = ModelCatalog(path=tmp_path / "models.json", ttl=0)
+    catalog.get("http://a", fetch)
+    time.sleep(0.01)
+
+    started = time.monotonic()
+    assert catalog.get("http://a", fetch)[0]["name"] == "old"
+    assert time.monotonic() - started < 0.5
+
+    release.set()
+    catalog._refreshing["http://a"].join()
+    catalog.ttl = 60
+    assert catalog.get("http://a", fetch)[0]["name"] == "new"
+
+
+def test_failed_refresh_keeps_stale_entry(tmp_path):
+    catalog = ModelCatalog(path=tmp_path / "models.json", ttl=0)
+    catalog.get("local", lambda: [{"name": "m", "loaded": False}])
+
+    def broken():
+        raise OSError("down")
+
+    time.sleep(0.01)
+    catalog.get("local", broken)
+    catalog._refreshing["local"].join()
+    assert catalog.get("local", broken)[0]["name"] == "m"
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from rollama.config import Config
+from rollama.model_manager import ModelManager
+
+
+class FakeClient:
+    server_id = "fake"
+    remote = None
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def run_stream(self, model, prompt, options=None):
+        yield from self.chunks
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return ModelManager(Config(tmp_path / "config"))
+
+
+def use_client(manager, monkeypatch, chunks):
+    monkeypatch.setattr(manager, "_get_client", lambda remote=None, hedge=None: FakeClient(chunks))
+
+
+def test_stream_is_written_verbatim(manager, monkeypatch):
+    # Tokens as Ollama streams them: parts of words, with their own spaces
+    use_client(manager, monkeypatch, [{"response": "def"}, {"response": " calcul"},
+                                      {"response": "ate"}, {"response": "(x):"}])
+    out = io.StringIO()
+
+    assert manager.run_model("llama2", "hi", out=out) == "def calculate(x):"
+    assert out.getvalue() == "\ndef calculate(x):\n"
+
+
+def test_failures_raise_instead_of_returning_text(manager, monkeypatch):
+    from rollama.errors import ConnectError, RollamaError, error_chunk
+
+    use_client(manager, monkeypatch, [{"response": "Hal"},
+                                      error_chunk(ConnectError("server went away"), "\nError")])
+    out = io.StringIO()
+    with pytest.raises(ConnectError, match="server went away"):
+        manager.run_model("llama2", "hi", out=out)
+    # What arrived before the failure was shown; the error was not
+    assert out.getvalue() == "\nHal\n"
+
+    with pytest.raises(ConnectError):
+        list(manager.run_code_model("hi", split_words=False))
+
+    def broken(remote=None, hedge=None):
+        class Client(FakeClient):
+            def run_remote_model(self, model, prompt, options=None):
+                raise KeyError("response")
+        client = Client([])
+        client.remote = {"url": "http://gpu"}
+        return client
+
+    monkeypatch.setattr(manager, "_get_client", broken)
+    with pytest.raises(RollamaError, match="Error running model"):
+        manager.run_model("llama2", "hi", stream=False)
@@ -0,0 +1,80 @@
+from rollama.outline import file_outline, python_outline
+from rollama.workspace_index import WorkspaceIndex
+
+SOURCE = '''"""Calculator module.
+
+Supports the four basic operations.
+"""
+import math
+from typing import List
+
+PRECISION = 2
+counter = 0
+
+
+class Calculator(object):
+    """Keeps a running total"""
+
+    total: float = 0.0
+
+    def add(self, value: float, *values, round_to=PRECISION) -> float:
+        """Add values to the total.
+
+        Longer explanation.
+        """
+        for v in (value,) + values:
+            self.total += v
+        return round(self.total, round_to)
+
+    @staticmethod
+    def parse(text, /, *, strict=False):
+        def helper():
+            pass
+        return float(text)
+
+
+async def fetch(url):
+    return url
+'''
+
+
+def test_python_outline():
+    assert python_outline(SOURCE) == '''"""Calculator module."""
+import math
+from typing import List
+PRECISION = ...
+class Calculator(object):
+    """Keeps a running total"""
+    total: float = ...
+    def add(self, value: float, *values, round_to=PRECISION) -> float:
+        """Add values to the total."""
+    @staticmethod
+    def parse(text, /, *, strict=False):
+async def fetch(url):'''
+
+
+def test_unparsable_python_falls_back_to_definition_lines():
+    assert file_outline("class A:\n    def run(self:\n", "python") == "class A:\n    def run(self:"
+    assert file_outline("function go() {\n  return 1;\n}\n", "javascript") == "function go() {"
+
+
+def test_outlines_are_cached_by_content_hash(tmp_path, monkeypatch):
+    (tmp_path / "calc.py").write_text(SOURCE)
+    index = WorkspaceIndex(tmp_path)
+    index.refresh()
+    assert index.outline("calc.py").startswith('"""Calculator module."""')
+    index.save_outlines()
+
+    calls = []
+    monkeypatch.setattr("rollama.workspace_index.file_outline", lambda text, language: calls.append(text) or "")
+    # A new instance reads the saved outline instead of parsing again
+    index = WorkspaceIndex(tmp_path)
+    index.refresh()
+    assert index.outline("calc.py").startswith('"""Calculator module."""')
+    assert calls == []
+
+    (tmp_path / "calc.py").write_text("def changed():\n    pass\n")
+    index.refresh(force=True)
+    index.outline("calc.py")
+    assert len(calls) == 1
+    assert index.outline("missing.py") is None
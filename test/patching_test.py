@@ -0,0 +1,143 @@
+import pytest
+
+from rollama.code_manager import CodeManager
+from rollama.file_ops import FileOperationParser
+from rollama.patching import PatchError, apply_patch, is_patch, split_diff
+
+SOURCE = "".join(f"def f{i}(x):\n    return x + {i}\n\n" for i in range(300))
+
+
+def test_search_replace_changes_only_the_matched_lines():
+    patch = """<<<<<<< SEARCH
+def f150(x):
+    return x + 150
+=======
+def f150(x):
+    return x * 150
+>>>>>>> REPLACE
+"""
+    patched = apply_patch(SOURCE, patch)
+    assert patched == SOURCE.replace("return x + 150\n", "return x * 150\n")
+
+
+def test_unified_diff_with_wrong_line_numbers():
+    patch = """--- a/mod.py
++++ b/mod.py
+@@ -10,4 +10,4 @@
+ def f200(x):
+-    return x + 200
++    return x - 200
+ 
+"""
+    patched = apply_patch(SOURCE, patch)
+    assert "return x - 200\n" in patched
+    assert len(patched.splitlines()) == len(SOURCE.splitlines())
+
+
+def test_hunk_with_lost_indentation_is_reindented():
+    content = "class A:\n    def run(self):\n        return 1\n"
+    patch = """<<<<<<< SEARCH
+def run(self):
+    return 1
+=======
+def run(self):
+    return 2
+>>>>>>> REPLACE
+"""
+    assert apply_patch(content, patch) == "class A:\n    def run(self):\n        return 2\n"
+
+
+def test_fuzzy_match_tolerates_small_copy_errors():
+    content = 'def greet(name):\n    message = "Hello, " + name\n    print(message)\n    return message\n'
+    patch = """<<<<<<< SEARCH
+def greet(name):
+    message = "Hello " + name
+    print(message)
+=======
+def greet(name):
+    message = f"Hello, {name}"
+    print(message)
+>>>>>>> REPLACE
+"""
+    assert apply_patch(content, patch).splitlines()[1] == '    message = f"Hello, {name}"'
+
+
+def test_unmatched_hunk_applies_nothing():
+    patch = """<<<<<<< SEARCH
+def f1(x):
+    return x + 1
+=======
+def f1(x):
+    return -x
+>>>>>>> REPLACE
+<<<<<<< SEARCH
+completely different text
+that is nowhere in the file
+=======
+replacement
+>>>>>>> REPLACE
+"""
+    with pytest.raises(PatchError, match="hunk 2 of 2"):
+        apply_patch(SOURCE, patch)
+
+
+def test_later_hunks_match_after_earlier_ones():
+    content = "x = 1\ny = 2\nx = 1\n"
+    patch = "@@\n-x = 1\n+x = 10\n@@\n-x = 1\n+x = 20\n"
+    assert apply_patch(content, patch) == "x = 10\ny = 2\nx = 20\n"
+
+
+def test_split_diff_and_detection():
+    diff = """diff --git a/a.py b/a.py
+--- a/a.py
++++ b/a.py
+@@ -1 +1 @@
+-a = 1
++a = 2
+--- a/gone.py
++++ /dev/null
+@@ -1 +0,0 @@
+-print("bye")
+"""
+    assert is_patch(diff)
+    assert not is_patch("import os\n")
+    assert split_diff(diff) == [("a.py", "@@ -1 +1 @@\n-a = 1\n+a = 2\n"), ("gone.py", None)]
+
+
+def test_parser_turns_edits_with_patches_into_patch_operations():
+    parser = FileOperationParser()
+    operations = parser.feed("EDIT FILE: a.py\n<<<<<<< SEARCH\na = 1\n=======\na = 2\n>>>>>>> REPLACE\n\n")
+    operations += parser.feed("PATCH FILE: b.py\n```\n@@\n-b = 1\n+b = 2\n```\n")
+    operations += parser.close()
+    assert [(operation["action"], operation["path"]) for operation in operations] == [
+        ("patch", "a.py"), ("patch", "b.py")
+    ]
+    assert apply_patch("a = 1\n", operations[0]["content"]) == "a = 2\n"
+
+
+def test_code_manager_rewrites_files_whose_patch_did_not_apply(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    code_manager = CodeManager()
+    code_manager.create_workspace("patching")
+    code_manager.create_file("a.py", "a = 1\n")
+    code_manager.create_file("b.py", "b = 1\n")
+    prompts = []
+
+    def run_code_model(prompt, remote=None, split_words=True):
+        prompts.append(prompt)
+        yield "```python\nb = 3\n```\n"
+
+    monkeypatch.setattr(code_manager.model_manager, "run_code_model", run_code_model)
+    messages = []
+    response = (
+        "PATCH FILE: a.py\n<<<<<<< SEARCH\na = 1\n=======\na = 2\n>>>>>>> REPLACE\n"
+        "PATCH FILE: b.py\n<<<<<<< SEARCH\nnot in the file\n=======\nb = 3\n>>>>>>> REPLACE\n"
+    )
+    code_manager._process_ai_response(response, messages.append)
+
+    assert code_manager.read_file("a.py") == "a = 2\n"
+    assert code_manager.read_file("b.py") == "b = 3\n"
+    # Only the file whose patch failed cost a second request
+    assert len(prompts) == 1 and "b = 1" in prompts[0]
+    assert messages[0] == "Patched file: a.py"
+    assert messages[-1] == "Rewrote file: b.py"
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from rollama.rate_limit import RemoteLimiter, TokenBucket, count_tokens, get_limiter
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=100, burst=1)
+    assert bucket.reserve() == 0
+    assert 0.009 <= bucket.reserve() <= 0.011
+    bucket.charge(100)
+    # Waiting for debt to clear does not take more tokens
+    first = bucket.reserve(0)
+    assert first > 0.9
+    assert abs(bucket.reserve(0) - first) < 0.005
+
+
+def test_concurrency_limit_queues_threads():
+    limiter = RemoteLimiter(max_concurrency=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with limiter.slot():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2 and len(peak) == 6
+
+
+def test_async_slot_shares_limit_with_threads():
+    limiter = RemoteLimiter(max_concurrency=1)
+    order = []
+
+    async def work(name):
+        async with limiter.async_slot():
+            order.append(name)
+            await asyncio.sleep(0.01)
+            order.append(name)
+
+    async def main():
+        with limiter.slot():
+            task = asyncio.ensure_future(work("async"))
+            await asyncio.sleep(0.03)
+            order.append("thread")
+        await task
+
+    asyncio.run(main())
+    assert order == ["thread", "async", "async"]
+
+
+def test_get_limiter_is_shared_and_optional():
+    assert get_limiter({"url": "http://a"}) is None
+    limiter = get_limiter({"url": "http://limited", "max_concurrency": 2})
+    assert get_limiter({"url": "http://limited", "max_concurrency": 3}) is limiter
+    assert limiter.max_concurrency == 3
+    assert count_tokens(5, {"prompt_tokens": 3, "completion_tokens": 4}) == 7
+    assert count_tokens(0, None, "x" * 40) == 10
@@ -0,0 +1,68 @@
+import os
+import time
+from rollama.response_cache import ResponseCache, is_deterministic
+
+
+def test_key_normalizes_messages_and_includes_options():
+    key = ResponseCache.make_key("http://a", "llama2", [{"role": "user", "content": "hi  \r\nthere"}])
+    same = ResponseCache.make_key("http://a", "llama2", [{"role": "user", "content": "hi\nthere"}])
+    assert key == same
+    assert key != ResponseCache.make_key("http://b", "llama2", [{"role": "user", "content": "hi\nthere"}])
+    assert key != ResponseCache.make_key("http://a", "llama2", [{"role": "user", "content": "hi\nthere"}],
+                                         {"temperature": 0})
+
+
+def test_only_repeatable_sampling_is_deterministic():
+    assert is_deterministic({"temperature": 0})
+    assert is_deterministic({"temperature": 0.7, "seed": 1})
+    assert not is_deterministic({"temperature": 0.7})
+    assert not is_deterministic(None)
+
+
+def test_round_trip_and_expiry(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path, max_age_days=1)
+    cache.put("ab" * 32, ["Hel", "lo"], model="llama2")
+    assert cache.get("ab" * 32) == ["Hel", "lo"]
+    assert cache.get("cd" * 32) is None
+
+    cache.max_age = 0
+    time.sleep(0.01)
+    assert cache.get("ab" * 32) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path)
+    keys = [str(i) * 64 for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, ["x" * 1000])
+        # Make older keys look less recently used
+        path = cache._path(key)
+        os.utime(path, (time.time() - 100 + age, time.time() - 100 + age))
+
+    cache.get(keys[0])
+    # Entry sizes differ by a byte or two with the timestamp's repr
+    entry_size = max(cache._path(key).stat().st_size for key in keys)
+    cache.max_size = entry_size * 2
+    cache.evict()
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_writes_scan_the_cache_only_when_needed(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path)
+    scans = []
+    entries = cache._entries
+    cache._entries = lambda: scans.append(1) or entries()
+
+    for i in range(20):
+        cache.put(f"{i:02}" * 32, ["x" * 100])
+    # Once to learn the size; after that it is tracked in memory
+    assert len(scans) == 1
+
+    cache.max_size = cache._size // 2
+    cache.put("ff" * 32, ["x" * 100])
+    assert len(scans) == 2
+    assert cache.stats()["size"] <= cache.max_size
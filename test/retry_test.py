@@ -0,0 +1,74 @@
+import time
+import pytest
+from rollama.errors import CircuitOpenError, ConnectError, HTTPStatusError
+from rollama.retry import CircuitBreaker, RetryPolicy, call_with_retry
+
+
+def test_retries_transient_failures_then_succeeds():
+    failures = [ConnectError("refused"), HTTPStatusError(503, "busy", retry_after=0)]
+
+    def send():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    policy = RetryPolicy(retries=2, backoff_base=0.001)
+    assert call_with_retry(send, policy, CircuitBreaker("http://a")) == "ok"
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise HTTPStatusError(404, "no such model")
+
+    breaker = CircuitBreaker("http://a", threshold=1)
+    with pytest.raises(HTTPStatusError):
+        call_with_retry(send, RetryPolicy(retries=3, backoff_base=0.001), breaker)
+    assert len(calls) == 1
+    # A bad request says nothing about the server's health
+    assert breaker.state == "closed"
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    breaker = CircuitBreaker("http://a", threshold=2, cooldown=0.05)
+
+    def dead():
+        raise ConnectError("refused")
+
+    with pytest.raises(ConnectError):
+        call_with_retry(dead, RetryPolicy(retries=1, backoff_base=0.001), breaker)
+    assert breaker.state == "open"
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(lambda: calls.append(1), RetryPolicy(), breaker)
+    assert not calls
+
+    time.sleep(0.06)
+    assert call_with_retry(lambda: "back", RetryPolicy(), breaker) == "back"
+    assert breaker.state == "closed"
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(backoff_base=1, backoff_max=3)
+    delays = [policy.delay(5) for _ in range(50)]
+    assert all(0 <= delay <= 3 for delay in delays)
+    assert len(set(delays)) > 1
+    assert policy.delay(0, HTTPStatusError(429, retry_after=2.5)) >= 2.5
+
+
+def test_a_trial_that_crashes_does_not_wedge_the_breaker():
+    breaker = CircuitBreaker("http://a", threshold=1, cooldown=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    def broken():
+        raise KeyError("not a RemoteError")
+
+    with pytest.raises(KeyError):
+        call_with_retry(broken, RetryPolicy(), breaker)
+    # The next request is let through as a new trial
+    assert call_with_retry(lambda: "back", RetryPolicy(), breaker) == "back"
+    assert breaker.state == "closed"
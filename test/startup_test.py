@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _modules_after(args, home):
+    """Run the CLI in a fresh interpreter and return the modules it imported"""
+    code = (
+        "import sys\n"
+        "from rollama.cli import main\n"
+        f"sys.argv = ['rollama'] + {args!r}\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(' '.join(sys.modules))\n"
+    )
+    env = dict(os.environ, HOME=str(home), PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return set(result.stdout.splitlines()[-1].split())
+
+
+def test_config_commands_do_not_load_the_http_stack(tmp_path):
+    for args in (["--help"], ["remote", "list"], ["remote", "group", "list"]):
+        modules = _modules_after(args, tmp_path)
+        assert "requests" not in modules, args
+        assert "rollama.model_manager" not in modules, args
+        assert "readline" not in modules, args
+
+
+def test_help_does_not_create_the_config_directory(tmp_path):
+    _modules_after(["--help"], tmp_path)
+    assert not (tmp_path / ".rollama").exists()
@@ -0,0 +1,58 @@
+import json
+from rollama.stream_parser import (
+    SSEParser, NDJSONParser, iter_sse_chunks, iter_ndjson_chunks, openai_chunk
+)
+
+
+def _sse_event(content, finish_reason=None):
+    data = {"choices": [{"delta": {"content": content}, "finish_reason": finish_reason}]}
+    return b"data: " + json.dumps(data).encode() + b"\n\n"
+
+
+def test_sse_frames_split_across_reads():
+    body = _sse_event("Hel") + _sse_event("lo") + b"data: [DONE]\n\n"
+    # Feed one byte at a time so every frame is split
+    chunks = list(iter_sse_chunks(body[i:i + 1] for i in range(len(body))))
+    assert [chunk["response"] for chunk in chunks] == ["Hel", "lo"]
+
+
+def test_sse_multiline_data_comments_and_crlf():
+    parser = SSEParser()
+    events = parser.feed(b": keep-alive\r\ndata: line one\r\ndata: line two\r")
+    assert events == []
+    events = parser.feed(b"\n\r\nid: 7\n")
+    assert events == [b"line one\nline two"]
+    assert parser.close() == []
+    assert parser.last_event_id == b"7"
+
+
+def test_sse_exposes_finish_reason_and_usage():
+    data = {"choices": [{"delta": {}, "finish_reason": "stop"}], "usage": {"total_tokens": 12}}
+    chunk = openai_chunk(json.dumps(data).encode())
+    assert chunk["response"] == ""
+    assert chunk["finish_reason"] == "stop"
+    assert chunk["usage"] == {"total_tokens": 12}
+
+
+def test_sse_bare_json_lines_and_text():
+    body = b'{"choices": [{"delta": {"content": "a"}}]}\n' + b"data: not json\n\n"
+    chunks = list(iter_sse_chunks([body]))
+    assert [chunk["response"] for chunk in chunks] == ["a", "not json"]
+
+
+def test_ndjson_split_records_and_final_stats():
+    records = [
+        {"message": {"content": "Hi"}, "done": False},
+        {"message": {"content": ""}, "done": True, "eval_count": 3, "done_reason": "stop"},
+    ]
+    body = b"\n".join(json.dumps(record).encode() for record in records)
+    chunks = list(iter_ndjson_chunks([body[:7], body[7:30], body[30:]]))
+    assert chunks[0] == {"response": "Hi", "done": False}
+    assert chunks[1]["eval_count"] == 3
+    assert chunks[1]["finish_reason"] == "stop"
+
+
+def test_ndjson_parser_skips_blank_lines():
+    parser = NDJSONParser()
+    assert parser.feed(b'{"a": 1}\n\n{"b"') == [{"a": 1}]
+    assert parser.feed(b': 2}\n') == [{"b": 2}]
@@ -0,0 +1,43 @@
+import json
+from rollama.tokens import (
+    HeuristicCounter, TRUNCATION_MARKER, count_messages, estimate_tokens, get_counter, prompt_budget,
+    tokenizer_path, trim_text
+)
+
+
+def test_estimate_is_close_to_bpe_counts():
+    assert estimate_tokens("") == 0
+    # Short words are one token each, punctuation is separate
+    assert estimate_tokens("The quick brown fox jumps.") == 6
+    # Long words split into several tokens, numbers into groups of three digits
+    assert estimate_tokens("internationalization") == 4
+    assert estimate_tokens("1234567") == 3
+    assert count_messages([{"role": "user", "content": "hi"}]) == 5
+
+
+def test_trim_keeps_the_start_within_budget():
+    text = "def handler(event):\n    return event\n" * 200
+    counter = HeuristicCounter()
+    trimmed = trim_text(text, 100, counter)
+    assert trimmed.endswith(TRUNCATION_MARKER)
+    assert text.startswith(trimmed[:-len(TRUNCATION_MARKER)])
+    assert counter.count(trimmed) <= 100
+    assert trim_text("short", 100) == "short"
+
+
+def test_prompt_budget_leaves_room_for_the_reply():
+    assert prompt_budget(4096) == 3584
+    assert prompt_budget(None) == prompt_budget(4096)
+    # Tiny windows still leave half for the prompt
+    assert prompt_budget(512) == 256
+
+
+def test_tokenizer_lookup_falls_back_to_the_estimator(tmp_path):
+    vocab = tmp_path / "llama3.json"
+    vocab.write_text(json.dumps({"not": "a tokenizer"}))
+
+    assert tokenizer_path("llama3:8b", tokenizer_dir=tmp_path) == vocab
+    assert tokenizer_path("mistral", tokenizer_dir=tmp_path) is None
+    assert tokenizer_path("mistral", {"mistral": str(vocab)}, tmp_path) == vocab
+    # Unloadable files (or no tokenizers package) mean estimates, not errors
+    assert not get_counter("llama3", tokenizer_dir=tmp_path).exact
@@ -0,0 +1,87 @@
+import os
+
+from rollama import workspace_index
+from rollama.code_manager import CodeManager
+from rollama.workspace_index import WorkspaceIndex
+
+
+def make_tree(root):
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "pkg" / "main.py").write_text("import os\n\nprint(os.name)\n")
+    (root / "README.md").write_text("# Demo")
+    (root / "logo.png").write_bytes(b"\x89PNG\0\0\0")
+    (root / "node_modules" / "dep").mkdir(parents=True)
+    (root / "node_modules" / "dep" / "index.js").write_text("module.exports = 1\n")
+
+
+def test_refresh_records_file_details(tmp_path):
+    make_tree(tmp_path)
+    index = WorkspaceIndex(tmp_path)
+    changed = index.refresh()
+
+    assert sorted(changed) == ["README.md", "logo.png", "src", "src/pkg", "src/pkg/main.py"]
+    entry = index.get("src/pkg/main.py")
+    assert entry["language"] == "python"
+    assert entry["lines"] == 3
+    assert entry["size"] == len("import os\n\nprint(os.name)\n")
+    assert index.get("README.md")["lines"] == 1
+    assert index.get("logo.png")["binary"]
+    assert index.paths(text_only=True) == ["README.md", "src/pkg/main.py"]
+    assert index.children() == (["src"], ["README.md", "logo.png"])
+    assert index.paths("src") == ["src/pkg/main.py"]
+
+
+def test_only_changed_files_are_read_again(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    WorkspaceIndex(tmp_path).refresh()
+
+    read = []
+    describe = workspace_index._describe
+    monkeypatch.setattr(workspace_index, "_describe", lambda path, stat: read.append(path) or describe(path, stat))
+
+    # A new instance starts from the saved index
+    index = WorkspaceIndex(tmp_path)
+    assert index.refresh() == []
+    assert read == []
+
+    main = tmp_path / "src" / "pkg" / "main.py"
+    main.write_text("print('changed')\n")
+    os.utime(main, ns=(1, 1))
+    (tmp_path / "README.md").unlink()
+    assert index.refresh() == []  # refreshed moments ago
+    assert sorted(index.refresh(force=True)) == ["README.md", "src/pkg/main.py"]
+    assert read == [str(main)]
+    assert index.get("README.md") is None
+    assert index.get("src/pkg/main.py")["lines"] == 1
+
+
+def test_update_handles_renames_and_deleted_directories(tmp_path):
+    make_tree(tmp_path)
+    index = WorkspaceIndex(tmp_path)
+    index.refresh()
+
+    os.rename(tmp_path / "src", tmp_path / "lib")
+    assert sorted(index.update("src", "lib")) == ["lib", "lib/pkg", "lib/pkg/main.py", "src", "src/pkg",
+                                                  "src/pkg/main.py"]
+    assert index.paths() == ["README.md", "lib/pkg/main.py", "logo.png"]
+    assert WorkspaceIndex(tmp_path).paths() == index.paths()
+
+
+def test_code_manager_lists_from_the_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    code_manager = CodeManager()
+    code_manager.create_workspace("indexed")
+    code_manager.create_directory("docs")
+    code_manager.create_file("app/models/user.py", "class User:\n    pass\n")
+    code_manager.create_file("app/views.py", "")
+
+    assert code_manager.list_files() == ["📁 app", "📁 docs"]
+    assert code_manager.list_files("app") == ["📁 app/models", "📄 app/views.py"]
+    assert code_manager.list_files("docs") == ["Directory is empty"]
+    assert code_manager.indexed_files() == ["app/models/user.py", "app/views.py"]
+    assert code_manager.index.get("app/models/user.py")["lines"] == 2
+
+    code_manager.rename("app/views.py", "app/routes.py")
+    code_manager.delete_file("app/models")
+    assert code_manager.indexed_files("app") == ["app/routes.py"]
+    assert (code_manager.current_workspace / ".rollama" / "index.json").exists()